@@ -15,7 +15,6 @@ from .botplugin import (  # noqa
     ShlexArgParser,
     ValidationException,
 )
-from .core_plugins.wsview import route
 from .flow import FLOW_END, BotFlow, Flow, FlowRoot
 
 __all__ = [
@@ -38,9 +37,16 @@ __all__ = [
 
 log = logging.getLogger(__name__)
 
-webroute = (
-    route  # this allows plugins to expose dynamic webpages on Errbot embedded webserver
-)
+
+def __getattr__(name: str) -> Any:
+    # webroute pulls in Flask, it is only imported when a plugin asks for it.
+    if name == "webroute":
+        from .core_plugins.wsview import route
+
+        # this allows plugins to expose dynamic webpages on Errbot embedded webserver
+        return route
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Some clients automatically convert consecutive dashes into a fancy
 # hyphen, which breaks long-form arguments. Undo this conversion to
@@ -584,16 +590,22 @@ def cmdfilter(*args, **kwargs):
     return lambda func: decorate(func)
 
 
-def botflow(*args, **kwargs):
+def botflow(*args, timeout: float = None, timeout_notify: bool = False):
     """
     Decorator for flow of commands.
 
+    :param timeout: in seconds, the flows waiting longer than that for their requestor are stopped.
+                    Defaults to BOT_FLOWS_TIMEOUT.
+    :param timeout_notify: tells the requestor when their flow has been stopped for inactivity.
+
     TODO(gbin): example / docs
     """
 
     def decorate(func):
         if not hasattr(func, "_err_flow"):  # don't override generated functions
             func._err_flow = True
+            func._err_flow_timeout = timeout
+            func._err_flow_timeout_notify = timeout_notify
         return func
 
     if len(args):
@@ -3,8 +3,20 @@ import logging
 import random
 import time
 from abc import ABC, abstractmethod
-from collections import defaultdict, deque
-from typing import Any, BinaryIO, List, Mapping, Optional, Sequence, Tuple, Type
+from collections import OrderedDict, defaultdict, deque
+from functools import wraps
+from threading import Lock
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 log = logging.getLogger(__name__)
 
@@ -17,9 +29,12 @@ class Identifier(ABC):
     to make an identifier from a String.
 
     The semantics is anything you can talk to: Person, Room, RoomOccupant etc.
+
+    Identifiers are created for every incoming message, the base classes of the hierarchy
+    declare empty ``__slots__`` so backends can declare theirs and keep their identifiers compact.
     """
 
-    pass
+    __slots__ = ()
 
 
 class Person(Identifier):
@@ -30,6 +45,8 @@ class Person(Identifier):
     to make an identifier from a String.
     """
 
+    __slots__ = ()
+
     @property
     @abstractmethod
     def person(self) -> str:
@@ -83,6 +100,8 @@ class Person(Identifier):
 
 
 class RoomOccupant(Identifier):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def room(self) -> Any:  # this is oom defined below
@@ -99,6 +118,8 @@ class Room(Identifier):
     This class represents a Multi-User Chatroom.
     """
 
+    __slots__ = ()
+
     def join(self, username: str = None, password: str = None) -> None:
         """
         Join the room.
@@ -264,6 +285,21 @@ class Message:
     the bot.
     """
 
+    # "__dict__" keeps the possibility for backends to attach extra attributes to the
+    # messages, it is only allocated if they do.
+    __slots__ = (
+        "_body",
+        "_from",
+        "_to",
+        "_parent",
+        "_delayed",
+        "_extras",
+        "_flow",
+        "_partial",
+        "ctx",
+        "__dict__",
+    )
+
     def __init__(
         self,
         body: str = "",
@@ -431,6 +467,16 @@ class Card(Message):
     the card.md template.
     """
 
+    __slots__ = (
+        "_summary",
+        "_title",
+        "_link",
+        "_image",
+        "_thumbnail",
+        "_color",
+        "_fields",
+    )
+
     def __init__(
         self,
         body: str = "",
@@ -517,6 +563,8 @@ class Presence:
     when the presence of people changes.
     """
 
+    __slots__ = ("_identifier", "_status", "_message")
+
     def __init__(self, identifier: Identifier, status: str = None, message: str = None):
         if identifier is None:
             raise ValueError("Presence: identifiers is None")
@@ -583,6 +631,15 @@ class Reaction:
     Slack backend. This class is largely based on the Slack reaction event data.
     """
 
+    __slots__ = (
+        "_reactor",
+        "_reacted_to_owner",
+        "_action",
+        "_timestamp",
+        "_reaction_name",
+        "_reacted_to",
+    )
+
     def __init__(
         self,
         reactor: Identifier = None,
@@ -790,12 +847,36 @@ class Stream(io.BufferedReader):
         self._transfered = length
 
 
+def cached_identifier(build_identifier: Callable) -> Callable:
+    """
+    Decorator for the backends' build_identifier.
+
+    Identifiers built from the same text representation are interned in a bounded LRU
+    cache held by the :class:`~errbot.backends.base.Backend` so repeated calls return the
+    same canonical identifier instead of reparsing it. Rooms are live objects bound to the
+    connection, they are never cached.
+
+    The identifiers returned must be treated as immutable, if the backend learns that a text
+    representation points to something else (nick change, occupant leaving a room...) it needs
+    to call :meth:`~errbot.backends.base.Backend.invalidate_identifiers`.
+    """
+
+    @wraps(build_identifier)
+    def wrapper(self, text_representation: str) -> Identifier:
+        return self._cached_identifier(text_representation, build_identifier)
+
+    return wrapper
+
+
 class Backend(ABC):
     """
     Implements the basic Bot logic (logic independent from the backend) and leaves
     you to implement the missing parts.
     """
 
+    # Maximum number of identifiers kept by the build_identifier decorated with cached_identifier.
+    IDENTIFIERS_CACHE_SIZE = 1024
+
     cmd_history = defaultdict(
         lambda: deque(maxlen=10)
     )  # this will be a per user history
@@ -815,6 +896,8 @@ class Backend(ABC):
         )
         self._reconnection_multiplier = 1.75  # Delay multiplier
         self._reconnection_jitter = (0, 3)  # Random jitter added to delay (min, max)
+        self._identifiers_cache = OrderedDict()
+        self._identifiers_cache_lock = Lock()
 
     @abstractmethod
     def send_message(self, msg: Message) -> None:
@@ -923,6 +1006,62 @@ class Backend(ABC):
     def build_identifier(self, text_representation: str) -> Identifier:
         pass
 
+    def _cached_identifier(
+        self, text_representation: str, build_identifier: Callable
+    ) -> Identifier:
+        if not hasattr(self, "_identifiers_cache"):
+            # some backends build their own identity before initializing the Backend.
+            return build_identifier(self, text_representation)
+
+        with self._identifiers_cache_lock:
+            identifier = self._identifiers_cache.get(text_representation)
+            if identifier is not None:
+                self._identifiers_cache.move_to_end(text_representation)
+                return identifier
+
+        identifier = build_identifier(self, text_representation)
+        if isinstance(identifier, Room) or self.IDENTIFIERS_CACHE_SIZE <= 0:
+            return identifier
+
+        with self._identifiers_cache_lock:
+            # another thread may have built the same identifier in the meantime, keep the first one.
+            identifier = self._identifiers_cache.setdefault(
+                text_representation, identifier
+            )
+            while len(self._identifiers_cache) > self.IDENTIFIERS_CACHE_SIZE:
+                self._identifiers_cache.popitem(last=False)
+        return identifier
+
+    def invalidate_identifiers(
+        self,
+        text_representation: Optional[str] = None,
+        identifier: Optional[Identifier] = None,
+        prefix: Optional[str] = None,
+    ) -> None:
+        """
+        Forget identifiers cached by :func:`~errbot.backends.base.cached_identifier`.
+
+        Without any parameter the whole cache is dropped.
+
+        :param text_representation: forget the identifier built from this text representation.
+        :param identifier: forget every text representation pointing to this identifier.
+        :param prefix: forget every text representation starting with this prefix, for example
+            the ones of a person in all the rooms.
+        """
+        with self._identifiers_cache_lock:
+            if text_representation is None and identifier is None and prefix is None:
+                self._identifiers_cache.clear()
+                return
+            self._identifiers_cache.pop(text_representation, None)
+            if identifier is not None or prefix is not None:
+                for txtrep in [
+                    txtrep
+                    for txtrep, cached in self._identifiers_cache.items()
+                    if cached is identifier
+                    or (prefix is not None and txtrep.startswith(prefix))
+                ]:
+                    del self._identifiers_cache[txtrep]
+
     def is_from_self(self, msg: Message) -> bool:
         """
         Needs to be overridden to check if the incoming message is from the bot itself.
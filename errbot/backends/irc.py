@@ -21,6 +21,7 @@ from errbot.backends.base import (
     RoomNotJoinedError,
     RoomOccupant,
     Stream,
+    cached_identifier,
 )
 from errbot.core import ErrBot
 from errbot.rendering.ansiext import NSC, AnsiExtension, CharacterTable, enable_format
@@ -83,6 +84,8 @@ def irc_md() -> Markdown:
 
 
 class IRCPerson(Person):
+    __slots__ = ("_nickmask", "_email")
+
     def __init__(self, mask):
         self._nickmask = NickMask(mask)
         self._email = ""
@@ -135,6 +138,8 @@ class IRCPerson(Person):
 
 
 class IRCRoomOccupant(IRCPerson, RoomOccupant):
+    __slots__ = ("_room",)
+
     def __init__(self, mask, room):
         super().__init__(mask)
         self._room = room
@@ -450,6 +455,12 @@ class IRCConnection(SingleServerIRCBot):
     def on_privnotice(self, _, e) -> None:
         self._privmsg(e, True)
 
+    def on_nick(self, _, e) -> None:
+        # the identifiers built from the previous nick are stale, including the room occupants
+        # represented as "mask\n#room".
+        for txtrep in (str(e.source), e.source.nick):
+            self.bot.invalidate_identifiers(txtrep, prefix=txtrep + "\n")
+
     def on_kick(self, _, e) -> None:
         if not self._reconnect_on_kick:
             log.info("RECONNECT_ON_KICK is 0 or None, won't try to reconnect")
@@ -823,6 +834,7 @@ class IRCBackend(ErrBot):
         )  # there is a weird chr IRC is sending that we need to filter out
         return super().build_message(text)
 
+    @cached_identifier
     def build_identifier(
         self, txtrep: str
     ) -> Union[IRCRoom, IRCRoomOccupant, IRCPerson]:
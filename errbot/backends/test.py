@@ -20,6 +20,7 @@ from errbot.backends.base import (
     Presence,
     Room,
     RoomOccupant,
+    cached_identifier,
 )
 from errbot.bootstrap import setup_bot
 from errbot.core import ErrBot
@@ -51,6 +52,7 @@ class TestPerson(Person):
     """
 
     __test__ = False
+    __slots__ = ("_person", "_client", "_nick", "_fullname", "_email")
 
     def __init__(self, person, client=None, nick=None, fullname=None, email=None):
         self._person = person
@@ -111,6 +113,7 @@ class TestOccupant(TestPerson, RoomOccupant):
     """
 
     __test__ = False
+    __slots__ = ("_room",)
 
     def __init__(self, person, room):
         super().__init__(person)
@@ -350,6 +353,7 @@ class TestBackend(ErrBot):
     def connect(self) -> None:
         return
 
+    @cached_identifier
     def build_identifier(self, text_representation) -> TestPerson:
         return TestPerson(text_representation)
 
@@ -2,15 +2,13 @@ import copyreg
 import logging
 import re
 import sys
+from functools import cached_property
 from time import sleep
 from typing import BinaryIO, List, Optional, Union
 
 from ansi.color import fg, fx
 from markdown import Markdown
 from markdown.extensions.extra import ExtraExtension
-from pygments import highlight
-from pygments.formatters import Terminal256Formatter
-from pygments.lexers import get_lexer_by_name
 
 from errbot.backends.base import (
     OFFLINE,
@@ -22,6 +20,7 @@ from errbot.backends.base import (
     Room,
     RoomOccupant,
     Stream,
+    cached_identifier,
 )
 from errbot.core import ErrBot
 from errbot.logs import console_hdlr
@@ -56,6 +55,8 @@ class TextPerson(Person):
     Simple Person implementation which represents users as simple text strings.
     """
 
+    __slots__ = ("_person", "_client", "_nick", "_fullname", "_email")
+
     def __init__(self, person, client=None, nick=None, fullname=None):
         self._person = person
         self._client = client
@@ -169,6 +170,8 @@ class TextRoom(Room):
 
 
 class TextOccupant(TextPerson, RoomOccupant):
+    __slots__ = ("_room",)
+
     def __init__(self, person, room):
         super().__init__(person)
         self._room = room
@@ -237,14 +240,35 @@ class TextBackend(ErrBot):
             self.md_text = text()  # for more debug feedback on md
             self.md_borderless_ansi = borderless_ansi()
             self.md_im = imtext()
-            self.md_lexer = get_lexer_by_name("md", stripall=True)
 
         self.md_ansi = ansi()
-        self.html_lexer = get_lexer_by_name("html", stripall=True)
-        self.terminal_formatter = Terminal256Formatter(style="paraiso-dark")
         self.user = self.build_identifier(self.bot_config.BOT_ADMINS[0])
         self._register_identifiers_pickling()
 
+    # pygments is only needed to highlight the messages on a terminal, it is imported on first use.
+    @cached_property
+    def md_lexer(self):
+        from pygments.lexers import get_lexer_by_name
+
+        return get_lexer_by_name("md", stripall=True)
+
+    @cached_property
+    def html_lexer(self):
+        from pygments.lexers import get_lexer_by_name
+
+        return get_lexer_by_name("html", stripall=True)
+
+    @cached_property
+    def terminal_formatter(self):
+        from pygments.formatters import Terminal256Formatter
+
+        return Terminal256Formatter(style="paraiso-dark")
+
+    def highlight(self, code: str, lexer) -> str:
+        from pygments import highlight
+
+        return highlight(code, lexer, self.terminal_formatter)
+
     @staticmethod
     def _unpickle_identifier(identifier_str):
         return TextBackend.__build_identifier(identifier_str)
@@ -369,13 +393,13 @@ class TextBackend(ErrBot):
             super().send_message(msg)
             print(bar.format(mode="MD  "))
             if ANSI:
-                print(highlight(msg.body, self.md_lexer, self.terminal_formatter))
+                print(self.highlight(msg.body, self.md_lexer))
             else:
                 print(msg.body)
             print(bar.format(mode="HTML"))
             html = self.md_html.convert(msg.body)
             if ANSI:
-                print(highlight(html, self.html_lexer, self.terminal_formatter))
+                print(self.highlight(html, self.html_lexer))
             else:
                 print(html)
             print(bar.format(mode="TEXT"))
@@ -402,6 +426,7 @@ class TextBackend(ErrBot):
     def change_presence(self, status: str = ONLINE, message: str = "") -> None:
         log.debug("*** Changed presence to [%s] %s", status, message)
 
+    @cached_identifier
     def build_identifier(
         self, text_representation: str
     ) -> Union[TextOccupant, TextRoom, TextPerson]:
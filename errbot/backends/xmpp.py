@@ -4,7 +4,6 @@ import asyncio
 import logging
 import sys
 from datetime import datetime
-from functools import lru_cache
 from time import sleep
 from typing import Callable, List, Optional, Tuple, Union
 
@@ -20,6 +19,7 @@ from errbot.backends.base import (
     Room,
     RoomNotJoinedError,
     RoomOccupant,
+    cached_identifier,
 )
 from errbot.core import ErrBot
 from errbot.rendering import text, xhtml, xhtmlim
@@ -50,6 +50,8 @@ class XMPPIdentifier(Identifier):
     are identifying a person on their system.
     """
 
+    __slots__ = ("_node", "_domain", "_resource", "_email")
+
     def __init__(self, node, domain, resource):
         if not node:
             raise Exception("An XMPPIdentifier needs to have a node.")
@@ -113,6 +115,8 @@ class XMPPIdentifier(Identifier):
 
 
 class XMPPPerson(XMPPIdentifier, Person):
+    __slots__ = ()
+
     aclattr = XMPPIdentifier.person
 
     def __eq__(self, other):
@@ -311,6 +315,8 @@ class XMPPRoom(XMPPIdentifier, Room):
 
 
 class XMPPRoomOccupant(XMPPPerson, RoomOccupant):
+    __slots__ = ("_room",)
+
     def __init__(self, node, domain, resource, room):
         super().__init__(node, domain, resource)
         self._room = room
@@ -428,6 +434,7 @@ def split_identifier(txtrep: str) -> Tuple[str, str, str]:
 class XMPPBackend(ErrBot):
     room_factory = XMPPRoom
     roomoccupant_factory = XMPPRoomOccupant
+    IDENTIFIERS_CACHE_SIZE = IDENTIFIERS_LRU
 
     def __init__(self, config):
         super().__init__(config)
@@ -537,6 +544,8 @@ class XMPPBackend(ErrBot):
 
     def user_left_chat(self, event) -> None:
         log.debug("user_left_chat %s", event)
+        # the nick can be taken by somebody else from now on.
+        self.invalidate_identifiers(event["from"].full)
         self.callback_presence(
             Presence(identifier=self._idd_from_event(event), status=OFFLINE)
         )
@@ -605,7 +614,7 @@ class XMPPBackend(ErrBot):
             log.debug("Trigger shutdown")
             self.shutdown()
 
-    @lru_cache(IDENTIFIERS_LRU)
+    @cached_identifier
     def build_identifier(
         self, txtrep: str
     ) -> Union[XMPPRoomOccupant, XMPPRoom, XMPPPerson]:
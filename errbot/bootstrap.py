@@ -57,6 +57,34 @@ def bot_config_defaults(config: object) -> None:
         config.BOT_ASYNC = True
     if not hasattr(config, "BOT_ASYNC_POOLSIZE"):
         config.BOT_ASYNC_POOLSIZE = 10
+    if not hasattr(config, "BOT_ASYNC_CALLBACKS"):
+        config.BOT_ASYNC_CALLBACKS = False
+    if not hasattr(config, "BOT_ASYNC_CALLBACKS_POOLSIZE"):
+        config.BOT_ASYNC_CALLBACKS_POOLSIZE = 10
+    if not hasattr(config, "BOT_ASYNC_CALLBACKS_TIMEOUT"):
+        config.BOT_ASYNC_CALLBACKS_TIMEOUT = None
+    if not hasattr(config, "BOT_SCHEDULER_POOLSIZE"):
+        config.BOT_SCHEDULER_POOLSIZE = 10
+    if not hasattr(config, "BOT_PLUGINS_STARTUP_POOLSIZE"):
+        config.BOT_PLUGINS_STARTUP_POOLSIZE = 1
+    if not hasattr(config, "BOT_PLUGINS_DISCOVERY_CACHE"):
+        config.BOT_PLUGINS_DISCOVERY_CACHE = False
+    if not hasattr(config, "BOT_PLUGINS_LAZY"):
+        config.BOT_PLUGINS_LAZY = ()
+    if not hasattr(config, "BOT_PLUGINS_LAZY_IDLE"):
+        config.BOT_PLUGINS_LAZY_IDLE = None
+    if not hasattr(config, "BOT_TEMPLATES_PRECOMPILE"):
+        config.BOT_TEMPLATES_PRECOMPILE = False
+    if not hasattr(config, "BOT_STREAM_CHUNK_SIZE"):
+        config.BOT_STREAM_CHUNK_SIZE = 64 * 1024
+    if not hasattr(config, "BOT_STREAM_SPOOL"):
+        config.BOT_STREAM_SPOOL = False
+    if not hasattr(config, "BOT_FLOWS_TIMEOUT"):
+        config.BOT_FLOWS_TIMEOUT = None
+    if not hasattr(config, "BOT_FLOWS_PERSISTENCE"):
+        config.BOT_FLOWS_PERSISTENCE = False
+    if not hasattr(config, "BOT_FLOWS_PERSISTENCE_TTL"):
+        config.BOT_FLOWS_PERSISTENCE_TTL = 24 * 60 * 60
     if not hasattr(config, "CHATROOM_PRESENCE"):
         config.CHATROOM_PRESENCE = ()
     if not hasattr(config, "CHATROOM_RELAY"):
@@ -191,6 +219,11 @@ def setup_bot(
             getattr(config, "CORE_PLUGINS", None),
             lambda name, clazz: clazz(bot, name),
             getattr(config, "PLUGINS_CALLBACK_ORDER", (None,)),
+            config.BOT_TEMPLATES_PRECOMPILE,
+            config.BOT_PLUGINS_STARTUP_POOLSIZE,
+            config.BOT_PLUGINS_DISCOVERY_CACHE,
+            config.BOT_PLUGINS_LAZY,
+            config.BOT_PLUGINS_LAZY_IDLE,
         )
         bot.attach_storage_plugin(storage_plugin)
         bot.attach_repo_manager(repo_manager)
@@ -1,10 +1,12 @@
 import logging
 import re
 import shlex
+import time
+from datetime import datetime
 from io import IOBase
-from threading import Timer, current_thread
+from threading import RLock
 from types import ModuleType
-from typing import Any, Callable, List, Mapping, Optional, Sequence, Tuple
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Tuple, Union
 
 from errbot.backends.base import (
     ONLINE,
@@ -17,10 +19,15 @@ from errbot.backends.base import (
     Stream,
 )
 
+from .scheduler import CronExpression, Job, Scheduler
 from .storage import StoreMixin, StoreNotOpenError
+from .utils import deprecated
 
 log = logging.getLogger(__name__)
 
+# protects the storage of the scheduled jobs, shared by all the plugins.
+_scheduled_jobs_lock = RLock()
+
 
 class ValidationException(Exception):
     pass
@@ -147,10 +154,14 @@ class BotPluginBase(StoreMixin):
 
     def __init__(self, bot, name=None):
         self.is_activated = False
-        self.current_pollers = []
-        self.current_timers = []
+        self.current_pollers = []  # (method, args, kwargs) of the pollers
+        self._poller_jobs = {}  # scheduler job -> (method, args, kwargs)
+        self._scheduled_jobs = {}  # name -> scheduler job of the next run
         self.dependencies = []
         self._dynamic_plugins = {}
+        # set while the plugin manager reloads the plugin: the storage stays open and the manager
+        # swaps the commands and command filters itself.
+        self._reloading = False
         self.log = logging.getLogger(f"errbot.plugins.{name}")
         self.log.debug("Logger for plugin %s initialized...", name)
         self._bot = bot
@@ -198,6 +209,15 @@ class BotPluginBase(StoreMixin):
         """
         return self._bot.bot_identifier
 
+    @property
+    def scheduler(self) -> Scheduler:
+        """
+        Get the scheduler shared by the bot and the plugins to run delayed or periodic jobs.
+
+        :return: the :class:`~errbot.scheduler.Scheduler`
+        """
+        return self._bot.scheduler
+
     def init_storage(self) -> None:
         log.debug(f"Init storage for {self.name}.")
         self.open_storage(self._bot.storage_plugin, self.name)
@@ -207,9 +227,10 @@ class BotPluginBase(StoreMixin):
         Override if you want to do something at initialization phase (don't forget to
         super(Gnagna, self).activate())
         """
-        self.init_storage()
-        self._bot.inject_commands_from(self)
-        self._bot.inject_command_filters_from(self)
+        if not self._reloading:
+            self.init_storage()
+            self._bot.inject_commands_from(self)
+            self._bot.inject_command_filters_from(self)
         self.is_activated = True
 
     def deactivate(self) -> None:
@@ -220,16 +241,24 @@ class BotPluginBase(StoreMixin):
             log.debug(
                 "You still have active pollers at deactivation stage, I cleaned them up for you."
             )
+            for job in self._poller_jobs:
+                job.cancel()
             self.current_pollers = []
-            for timer in self.current_timers:
-                timer.cancel()
+            self._poller_jobs = {}
 
-        try:
-            self.close_storage()
-        except StoreNotOpenError:
-            pass
-        self._bot.remove_command_filters_from(self)
-        self._bot.remove_commands_from(self)
+        # the scheduled jobs are persisted, they will be back with the plugin.
+        with _scheduled_jobs_lock:
+            for job in self._scheduled_jobs.values():
+                job.cancel()
+            self._scheduled_jobs = {}
+
+        if not self._reloading:
+            try:
+                self.close_storage()
+            except StoreNotOpenError:
+                pass
+            self._bot.remove_command_filters_from(self)
+            self._bot.remove_commands_from(self)
         self.is_activated = False
 
         for plugin in self._dynamic_plugins.values():
@@ -243,7 +272,11 @@ class BotPluginBase(StoreMixin):
         times: int = None,
         args: Tuple = None,
         kwargs: Mapping = None,
-    ) -> None:
+        fixed_rate: bool = False,
+        jitter: float = 0,
+        overlap: bool = False,
+        max_runtime: float = None,
+    ) -> Optional[Job]:
         """Starts a poller that will be called at a regular interval
 
         :param interval: interval in seconds
@@ -253,6 +286,11 @@ class BotPluginBase(StoreMixin):
             causes the polling to happen indefinitely)
         :param args: args for the targetted method
         :param kwargs: kwargs for the targetting method
+        :param fixed_rate: see :meth:`~errbot.scheduler.Scheduler.schedule`
+        :param jitter: see :meth:`~errbot.scheduler.Scheduler.schedule`
+        :param overlap: see :meth:`~errbot.scheduler.Scheduler.schedule`
+        :param max_runtime: see :meth:`~errbot.scheduler.Scheduler.schedule`
+        :return: a handle to give to stop_poller.
         """
         if not kwargs:
             kwargs = {}
@@ -265,21 +303,59 @@ class BotPluginBase(StoreMixin):
         )
         # noinspection PyBroadException
         try:
+            job = self.scheduler.schedule(
+                interval,
+                method,
+                args,
+                kwargs,
+                interval=interval,
+                times=times,
+                fixed_rate=fixed_rate,
+                jitter=jitter,
+                overlap=overlap,
+                max_runtime=max_runtime,
+            )
             self.current_pollers.append((method, args, kwargs))
-            self.program_next_poll(interval, method, times, args, kwargs)
+            self._poller_jobs[job] = (method, args, kwargs)
+            return job
         except Exception:
             log.exception("Poller programming failed.")
+        return None
 
     def stop_poller(
-        self, method: Callable[..., None], args: Tuple = None, kwargs: Mapping = None
+        self,
+        method: Union[Callable[..., None], Job],
+        args: Tuple = None,
+        kwargs: Mapping = None,
     ) -> None:
+        if isinstance(method, Job):
+            log.debug(f"Stop polling of {method}")
+            # the poller may have been stopped already or be done with its runs.
+            poller = self._poller_jobs.pop(method, None)
+            if poller is not None:
+                self.current_pollers.remove(poller)
+                method.cancel()
+            return
+
         if not kwargs:
             kwargs = {}
         if not args:
             args = []
         log.debug(f"Stop polling of {method} with args {args} and kwargs {kwargs}")
-        self.current_pollers.remove((method, args, kwargs))
+        for job, poller in self._poller_jobs.items():
+            if poller == (method, args, kwargs):
+                del self._poller_jobs[job]
+                self.current_pollers.remove(poller)
+                job.cancel()
+                return
+        raise ValueError(f"No poller of {method} with args {args} and kwargs {kwargs}")
+
+    @property
+    def current_timers(self) -> List[Job]:
+        """The scheduler jobs of the current pollers, deprecated: use the handles start_poller returns."""
+        return list(self._poller_jobs)
 
+    @deprecated(start_poller)
     def program_next_poll(
         self,
         interval: float,
@@ -287,26 +363,10 @@ class BotPluginBase(StoreMixin):
         times: int = None,
         args: Tuple = None,
         kwargs: Mapping = None,
-    ) -> None:
-        if times is not None and times <= 0:
-            return
-
-        t = Timer(
-            interval=interval,
-            function=self.poller,
-            kwargs={
-                "interval": interval,
-                "method": method,
-                "times": times,
-                "args": args,
-                "kwargs": kwargs,
-            },
-        )
-        self.current_timers.append(t)  # save the timer to be able to kill it
-        t.name = f"Poller thread for {type(method.__self__).__name__}"
-        t.daemon = True  # so it is not locking on exit
-        t.start()
+    ) -> Optional[Job]:
+        pass
 
+    @deprecated()
     def poller(
         self,
         interval: float,
@@ -315,22 +375,180 @@ class BotPluginBase(StoreMixin):
         args: Tuple = None,
         kwargs: Mapping = None,
     ) -> None:
-        previous_timer = current_thread()
-        if previous_timer in self.current_timers:
-            log.debug("Previous timer found and removed")
-            self.current_timers.remove(previous_timer)
+        """Calls method now then polls it, use start_poller instead."""
+        # noinspection PyBroadException
+        try:
+            method(*(args or []), **(kwargs or {}))
+        except Exception:
+            log.exception("A poller crashed")
+        if times is not None:
+            times -= 1
+        if times is None or times > 0:
+            self.start_poller(interval, method, times, args, kwargs)
 
-        if (method, args, kwargs) in self.current_pollers:
-            # noinspection PyBroadException
-            try:
-                method(*args, **kwargs)
-            except Exception:
-                log.exception("A poller crashed")
+    def schedule_cron(
+        self,
+        cron: str,
+        method: Callable[..., None],
+        args: Tuple = None,
+        kwargs: Mapping = None,
+        name: str = None,
+        catch_up: bool = True,
+    ) -> str:
+        """Runs a method of this plugin on a cron schedule, in the local time of the bot.
+
+        The schedule is persisted: it survives restarts of the bot and the runs missed while the bot or
+        the plugin was down are caught up with a single run when the plugin is activated again.
+
+        :param cron: a cron expression like ``0 9 * * mon-fri``, see :class:`~errbot.scheduler.CronExpression`.
+        :param method: the method of this plugin to run.
+        :param args: args for the method, they need to be picklable.
+        :param kwargs: kwargs for the method, they need to be picklable.
+        :param name: the name of this job, defaults to the name of the method. Scheduling a job under an
+                     existing name replaces it.
+        :param catch_up: run once right away if runs have been missed.
+        :return: the name of the job.
+        """
+        CronExpression(cron)  # validates the expression.
+        return self._add_scheduled_job(
+            name or method.__name__, method, args, kwargs, cron=cron, catch_up=catch_up
+        )
+
+    def run_at(
+        self,
+        when: Union[datetime, float],
+        method: Callable[..., None],
+        args: Tuple = None,
+        kwargs: Mapping = None,
+        name: str = None,
+    ) -> str:
+        """Runs a method of this plugin once, at the given time.
+
+        The job is persisted: if the bot or the plugin is down at that time, the method runs as soon as the
+        plugin is activated again.
+
+        :param when: a datetime or a timestamp.
+        :param method: the method of this plugin to run.
+        :param args: args for the method, they need to be picklable.
+        :param kwargs: kwargs for the method, they need to be picklable.
+        :param name: the name of this job, defaults to the name of the method. Scheduling a job under an
+                     existing name replaces it.
+        :return: the name of the job.
+        """
+        at = when.timestamp() if isinstance(when, datetime) else when
+        return self._add_scheduled_job(
+            name or method.__name__, method, args, kwargs, at=at
+        )
+
+    def cancel_scheduled_job(self, name: str) -> None:
+        """Cancels a job scheduled with schedule_cron or run_at.
+
+        :param name: the name of the job.
+        """
+        with _scheduled_jobs_lock:
+            job = self._scheduled_jobs.pop(name, None)
+            if job:
+                job.cancel()
+            with self._bot.scheduled_jobs_storage.mutable(self.name, {}) as records:
+                records.pop(name, None)
 
-            if times is not None:
-                times -= 1
+    @property
+    def scheduled_jobs(self) -> Mapping[str, Mapping[str, Any]]:
+        """The jobs scheduled with schedule_cron or run_at, by name."""
+        try:
+            return self._bot.scheduled_jobs_storage[self.name]
+        except KeyError:
+            return {}
+
+    def _add_scheduled_job(
+        self,
+        name: str,
+        method: Callable[..., None],
+        args: Optional[Tuple],
+        kwargs: Optional[Mapping],
+        cron: str = None,
+        at: float = None,
+        catch_up: bool = True,
+    ) -> str:
+        if getattr(self, method.__name__, None) != method:
+            raise ValueError(
+                f"{method} is not a method of {self.name}, it can't be persisted."
+            )
+        with _scheduled_jobs_lock:
+            with self._bot.scheduled_jobs_storage.mutable(self.name, {}) as records:
+                previous = records.get(name)
+                record = {
+                    "method": method.__name__,
+                    "args": tuple(args or ()),
+                    "kwargs": dict(kwargs or {}),
+                    "cron": cron,
+                    "at": at,
+                    "catch_up": catch_up,
+                    "created": time.time(),
+                    "last_run": None,
+                }
+                if previous and cron is not None and previous["cron"] == cron:
+                    # keep track of the runs of the previous activations to catch up.
+                    record["created"] = previous["created"]
+                    record["last_run"] = previous["last_run"]
+                records[name] = record
+            self._plan_scheduled_job(name, record)
+        return name
+
+    def _plan_scheduled_job(self, name: str, record: Mapping[str, Any]) -> None:
+        now = time.time()
+        if record["cron"] is None:
+            due = record["at"]
+        else:
+            cron = CronExpression(record["cron"])
+            since = datetime.fromtimestamp(record["last_run"] or record["created"])
+            due = cron.next_after(since).timestamp()
+            if due < now and not record["catch_up"]:
+                due = cron.next_after(datetime.fromtimestamp(now)).timestamp()
+        previous = self._scheduled_jobs.get(name)
+        if previous:
+            previous.cancel()
+        self._scheduled_jobs[name] = self.scheduler.schedule(
+            max(due - now, 0), self._run_scheduled_job, (name,)
+        )
 
-            self.program_next_poll(interval, method, times, args, kwargs)
+    def _restore_scheduled_jobs(self) -> None:
+        with _scheduled_jobs_lock:
+            records = self.scheduled_jobs
+            for name, record in list(records.items()):
+                if getattr(self, record["method"], None) is None:
+                    log.warning(
+                        "%s has no method %s anymore, dropping the job %s.",
+                        self.name,
+                        record["method"],
+                        name,
+                    )
+                    self.cancel_scheduled_job(name)
+                    continue
+                self._plan_scheduled_job(name, record)
+
+    def _run_scheduled_job(self, name: str) -> None:
+        record = self.scheduled_jobs.get(name)
+        if record is None:
+            return
+        # noinspection PyBroadException
+        try:
+            getattr(self, record["method"])(*record["args"], **record["kwargs"])
+        except Exception:
+            log.exception("The scheduled job %s of %s crashed.", name, self.name)
+
+        with _scheduled_jobs_lock:
+            with self._bot.scheduled_jobs_storage.mutable(self.name, {}) as records:
+                record = records.get(name)
+                if record is None:  # cancelled in the meantime.
+                    return
+                if record["cron"] is None:
+                    del records[name]
+                    self._scheduled_jobs.pop(name, None)
+                    return
+                record["last_run"] = time.time()
+            if name in self._scheduled_jobs:  # the plugin has not been deactivated.
+                self._plan_scheduled_job(name, record)
 
     def create_dynamic_plugin(
         self, name: str, commands: Tuple[Command], doc: str = ""
@@ -761,7 +979,11 @@ class BotPlugin(BotPluginBase):
         times: int = None,
         args: Tuple = None,
         kwargs: Mapping = None,
-    ):
+        fixed_rate: bool = False,
+        jitter: float = 0,
+        overlap: bool = False,
+        max_runtime: float = None,
+    ) -> Optional[Job]:
         """
         Start to poll a method at specific interval in seconds.
 
@@ -779,23 +1001,49 @@ class BotPlugin(BotPluginBase):
             which causes the polling to happen indefinitely)
         :param args: args for the targetted method
         :param kwargs: kwargs for the targetting method
-
-        """
-        super().start_poller(interval, method, times, args, kwargs)
+        :param fixed_rate:
+            count the interval from the start of the polls instead of their
+            end so they don't drift by the time they take.
+        :param jitter:
+            in seconds, a random delay up to this value is added to every
+            poll so pollers with the same interval don't run all together.
+        :param overlap:
+            with fixed_rate, start a poll even if the previous one is still
+            running. By default such polls are skipped.
+        :param max_runtime:
+            in seconds, log a warning for the polls still running after this
+            delay.
+        :return: a handle you can give to stop_poller.
+
+        """
+        return super().start_poller(
+            interval,
+            method,
+            times,
+            args,
+            kwargs,
+            fixed_rate=fixed_rate,
+            jitter=jitter,
+            overlap=overlap,
+            max_runtime=max_runtime,
+        )
 
     def stop_poller(
-        self, method: Callable[..., None], args: Tuple = None, kwargs: Mapping = None
+        self,
+        method: Union[Callable[..., None], Job],
+        args: Tuple = None,
+        kwargs: Mapping = None,
     ):
         """
         stop poller(s).
 
-        If the method equals None -> it stops all the pollers you need to
-        regive the same parameters as the original start_poller to match a
-        specific poller to stop
+        The poller to stop is either given by the handle start_poller returned
+        or, more slowly, by the same parameters as the original start_poller.
 
         :param kwargs: The initial kwargs you gave to start_poller.
         :param args: The initial args you gave to start_poller.
-        :param method: The initial method you passed to start_poller.
+        :param method: The handle returned by start_poller or the initial
+            method you passed to it.
 
         """
         super().stop_poller(method, args, kwargs)
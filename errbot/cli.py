@@ -24,9 +24,7 @@ from os import W_OK, access, getcwd, path, sep
 from pathlib import Path
 from platform import system
 
-from errbot.bootstrap import CORE_BACKENDS
 from errbot.logs import root_logger
-from errbot.plugin_wizard import new_plugin_wizard
 from errbot.utils import collect_roots, entry_point_plugins
 from errbot.version import VERSION
 
@@ -54,8 +52,6 @@ if not ON_WINDOWS:
     import signal
     import traceback
 
-    from daemonize import Daemonize
-
     signal.signal(signal.SIGUSR1, debug)  # Register handler for debugging
 
 
@@ -258,6 +254,8 @@ def main() -> None:
         for handler in logging.getLogger().handlers:
             root_logger.removeHandler(handler)
         try:
+            from errbot.plugin_wizard import new_plugin_wizard
+
             new_plugin_wizard(directory)
         except KeyboardInterrupt:
             sys.exit(1)
@@ -286,6 +284,7 @@ def main() -> None:
 
     if args["list"]:
         from errbot.backend_plugin_manager import enumerate_backend_plugins
+        from errbot.bootstrap import CORE_BACKENDS
 
         print("Available backends:")
         roots = [CORE_BACKENDS] + extra_backend
@@ -377,6 +376,7 @@ def main() -> None:
 
         # noinspection PyBroadException
         try:
+            from daemonize import Daemonize
 
             def action():
                 from errbot.bootstrap import bootstrap
@@ -73,6 +73,8 @@ BOT_DATA_DIR = "/var/lib/err"
 #
 # Or a list. note: if some plugins exists in 2 lists, only the first hit will be taken into account.
 # BOT_PLUGIN_INDEXES = ("/data/repos.json", "https://my.private.tld/errbot/myrepos.json")
+# The lists are fetched concurrently and only downloaded again when they changed, if one of
+# them can't be fetched its last fetched copy is used.
 
 # Set this to a directory on your system where you want to load extra
 # plugins from, which is useful mostly if you want to develop a plugin
@@ -148,6 +150,76 @@ SENTRY_OPTIONS = {}
 # Size of the thread pool for the asynchronous mode.
 # BOT_ASYNC_POOLSIZE = 10
 
+# Run the plugin callbacks (callback_message, callback_presence,
+# callback_mention, callback_reaction and the room callbacks) on a thread
+# pool instead of the thread of the backend receiving the events. The
+# callbacks of a plugin are still called one at a time and in order, but a
+# slow plugin doesn't delay the other plugins nor the next incoming message.
+# BOT_ASYNC_CALLBACKS = False
+
+# Size of the thread pool running the plugin callbacks.
+# BOT_ASYNC_CALLBACKS_POOLSIZE = 10
+
+# In seconds, callbacks still waiting for their plugin after this delay are
+# dropped and callbacks running longer than that are logged as warnings.
+# None waits forever.
+# BOT_ASYNC_CALLBACKS_TIMEOUT = None
+
+# Size of the thread pool running the pollers and the other jobs of the
+# scheduler shared by the plugins.
+# BOT_SCHEDULER_POOLSIZE = 10
+
+# The number of plugins imported, then activated, at the same time at startup.
+# Plugins are only activated once all their dependencies are. With more than
+# one, the order of activation of independent plugins isn't fixed anymore, so
+# neither is which plugin gets its clashing commands renamed.
+# BOT_PLUGINS_STARTUP_POOLSIZE = 1
+
+# Remembers which plugins were found where, so a restart doesn't walk all the
+# plugin directories again. A directory is walked again only if something
+# was added, removed or renamed in it, and the .plug files are parsed again
+# only if they changed.
+# BOT_PLUGINS_DISCOVERY_CACHE = False
+
+# Plugins to import and activate only when one of their commands or webhooks
+# is used for the first time, on top of the ones declared with "Lazy = True"
+# in the [Core] section of their .plug file. Their commands and webhooks are
+# listed in the [Lazy] section of the .plug file or found by reading their
+# module. The core plugins and the plugins other plugins depend on are always
+# activated at startup.
+# BOT_PLUGINS_LAZY = ('Weather', 'Stats')
+
+# The lazy plugins unused for this many seconds are deactivated until their
+# next use. None keeps them activated once they have been used.
+# BOT_PLUGINS_LAZY_IDLE = None
+
+# Compiles all the templates of the plugins when they are activated instead of
+# at their first use. Broken templates are then reported right away.
+# BOT_TEMPLATES_PRECOMPILE = False
+
+# In bytes, the size of the reads of incoming file transfers. The plugins
+# receiving a transfer share a buffer of a few of those chunks, the transfer
+# progresses at the pace of the slowest of them.
+# BOT_STREAM_CHUNK_SIZE = 65536
+
+# Stores the incoming file transfers in a temporary file before handing them
+# to the plugins. Every plugin then reads the file at its own pace and can
+# seek in it, at the cost of waiting for the end of the transfer.
+# BOT_STREAM_SPOOL = False
+
+# In seconds, flows waiting for their requestor for longer than this are
+# stopped. Flows can override it with @botflow(timeout=...). None lets them
+# wait forever.
+# BOT_FLOWS_TIMEOUT = None
+
+# Checkpoint the flows in progress in the storage so they can be resumed
+# after a restart of the bot. The flow contexts need to be picklable.
+# BOT_FLOWS_PERSISTENCE = False
+
+# In seconds, checkpointed flows not advanced for longer than this are
+# dropped. None keeps them forever.
+# BOT_FLOWS_PERSISTENCE_TTL = 24 * 60 * 60
+
 ##########################################################################
 # Account and chatroom (MUC) configuration                               #
 ##########################################################################
@@ -325,9 +397,11 @@ REVERSE_CHATROOM_RELAY = {}
 # Miscellaneous configuration options                                    #
 ##########################################################################
 
-# Define the maximum length a single message may be. If a plugin tries to
-# send a message longer than this length, it will be broken up into multiple
-# shorter messages that do fit.
+# Define the maximum length in bytes (utf-8 encoded) a single message may be.
+# If a plugin tries to send a message longer than this length, it will be
+# broken up into multiple shorter messages that do fit. Messages are cut on
+# paragraph or line boundaries when possible and code blocks are kept intact
+# or closed and reopened across the parts.
 # MESSAGE_SIZE_LIMIT = 10000
 
 # XMPP TLS certificate verification. In order to validate offered certificates,
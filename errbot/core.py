@@ -27,10 +27,12 @@ from errbot import CommandError
 from errbot.flow import FlowExecutor, FlowRoot
 
 from .backends.base import Backend, Identifier, Message, Presence, Room
+from .dispatcher import CallbackDispatcher
+from .scheduler import Scheduler
 from .storage import StoreMixin
 from .streaming import Tee
-from .templating import tenv
-from .utils import split_string_after
+from .templating import get_template
+from .utils import split_markdown_after
 
 log = logging.getLogger(__name__)
 
@@ -55,9 +57,18 @@ class ErrBot(Backend, StoreMixin):
             log.debug(
                 "created a thread pool of size %d.", bot_config.BOT_ASYNC_POOLSIZE
             )
+        self.callback_dispatcher = None
+        if bot_config.BOT_ASYNC_CALLBACKS:
+            self.callback_dispatcher = CallbackDispatcher(
+                bot_config.BOT_ASYNC_CALLBACKS_POOLSIZE,
+                bot_config.BOT_ASYNC_CALLBACKS_TIMEOUT,
+            )
+            atexit.register(self.callback_dispatcher.close)
         self.commands = {}  # the dynamically populated list of commands available on the bot
         self.re_commands = {}  # the dynamically populated list of regex-based commands available on the bot
         self.command_filters = []  # the dynamically populated list of filters
+        # incremented every time commands or filters are added or removed, for the caches depending on them.
+        self.commands_generation = 0
         self.MSG_UNKNOWN_COMMAND = (
             'Unknown command: "%(command)s". '
             'Type "' + bot_config.BOT_PREFIX + 'help" for available commands.'
@@ -71,8 +82,10 @@ class ErrBot(Backend, StoreMixin):
         self.repo_manager = None
         self.plugin_manager = None
         self.storage_plugin = None
+        self.scheduled_jobs_storage = None
         self._plugin_errors_during_startup = None
-        self.flow_executor = FlowExecutor(self)
+        self.flow_executor = FlowExecutor(self, bot_config.BOT_FLOWS_TIMEOUT)
+        self.scheduler = Scheduler(bot_config.BOT_SCHEDULER_POOLSIZE)
         self._gbl = RLock()  # this protects internal structures of this class
         self.set_message_size_limit()
 
@@ -111,6 +124,12 @@ class ErrBot(Backend, StoreMixin):
     def attach_storage_plugin(self, storage_plugin) -> None:
         # the storage_plugin is needed by the plugins
         self.storage_plugin = storage_plugin
+        self.scheduled_jobs_storage = StoreMixin()
+        self.scheduled_jobs_storage.open_storage(storage_plugin, "scheduled_jobs")
+        if self.bot_config.BOT_FLOWS_PERSISTENCE:
+            self.flow_executor.open_persistence(
+                storage_plugin, self.bot_config.BOT_FLOWS_PERSISTENCE_TTL
+            )
 
     def initialize_backend_storage(self) -> None:
         """
@@ -131,15 +150,23 @@ class ErrBot(Backend, StoreMixin):
 
     def _dispatch_to_plugins(self, method: Callable, *args, **kwargs) -> None:
         """
-        Dispatch the given method to all active plugins.
+        Dispatch the given method to all active plugins overriding it.
 
         Will catch and log any exceptions that occur.
+        With ``BOT_ASYNC_CALLBACKS`` the callbacks are queued on the callback dispatcher
+        instead of being run in the caller's thread.
 
         :param method: The name of the function to dispatch.
         :param *args: Passed to the callback function.
         :param **kwargs: Passed to the callback function.
         """
-        for plugin in self.plugin_manager.get_all_active_plugins():
+        plugins = self.plugin_manager.get_active_plugins_subscribed_to(method)
+        if self.callback_dispatcher:
+            for plugin in plugins:
+                self.callback_dispatcher.dispatch(plugin, method, *args, **kwargs)
+            return
+
+        for plugin in plugins:
             plugin_name = plugin.name
             log.debug("Triggering %s on %s.", method, plugin_name)
             # noinspection PyBroadException
@@ -213,7 +240,13 @@ class ErrBot(Backend, StoreMixin):
         return self.send(identifier, text, in_reply_to, groupchat_nick_reply)
 
     def split_and_send_message(self, msg: Message) -> None:
-        for part in split_string_after(msg.body, self.message_size_limit):
+        """Sends the message in as many parts as needed to fit the ``MESSAGE_SIZE_LIMIT``.
+
+        Parts are cut on markdown block boundaries whenever possible.
+
+        :param msg: the message to send.
+        """
+        for part in split_markdown_after(msg.body, self.message_size_limit):
             partial_message = msg.clone()
             partial_message.body = part
             partial_message.partial = True
@@ -226,7 +259,9 @@ class ErrBot(Backend, StoreMixin):
         :param msg: the message to send.
         :return: None
         """
-        for bot in self.plugin_manager.get_all_active_plugins():
+        for bot in self.plugin_manager.get_active_plugins_subscribed_to(
+            "callback_botmessage"
+        ):
             # noinspection PyBroadException
             try:
                 bot.callback_botmessage(msg)
@@ -433,9 +468,35 @@ class ErrBot(Backend, StoreMixin):
             )
             return None, None, None
 
+    def _wake_plugin_of(self, msg, cmd, match) -> bool:
+        """
+        Wakes up the plugin of a command if it is a lazy one still asleep, records its use otherwise.
+
+        :return: False if the plugin failed to wake up.
+        """
+        with self._gbl:
+            f = (self.re_commands if match else self.commands).get(cmd)
+        plugin = getattr(f, "__self__", None)
+        if plugin is None:
+            return True
+        if not getattr(f, "_err_command_lazy", False):
+            self.plugin_manager.touch_plugin(plugin.name)
+            return True
+        try:
+            self.plugin_manager.wake_plugin(plugin.name)
+        except Exception as e:
+            log.exception("The lazy plugin %s failed to wake up.", plugin.name)
+            self.send_simple_reply(msg, self.MSG_ERROR_OCCURRED + f":\n{e}")
+            return False
+        return True
+
     def _process_command(self, msg, cmd, args, match):
         """Process and execute a bot command"""
 
+        # the command filters need the real command of a lazy plugin.
+        if not self._wake_plugin_of(msg, cmd, match):
+            return
+
         # first it must go through the command filters
         msg, cmd, args = self._process_command_filters(msg, cmd, args, False)
         if msg is None:
@@ -522,19 +583,7 @@ class ErrBot(Backend, StoreMixin):
         # If not just convert the answer to string.
         if template_name and isinstance(template_parameters, Mapping):
             t_name = template_name + ".md"
-            if plugin_name:
-                try:
-                    return (
-                        tenv()
-                        .get_template(f"{plugin_name}/{t_name}")
-                        .render(**template_parameters)
-                    )
-                except Exception:
-                    log.debug(
-                        f"Template {t_name} not found in plugin {plugin_name} namespace, falling back to global search."
-                    )
-
-            return tenv().get_template(t_name).render(**template_parameters)
+            return get_template(t_name, plugin_name).render(**template_parameters)
 
         # Reply should be all text at this point (See https://github.com/errbotio/errbot/issues/96)
         return str(template_parameters)
@@ -641,6 +690,7 @@ class ErrBot(Backend, StoreMixin):
 
     def inject_commands_from(self, instance_to_inject):
         with self._gbl:
+            self.commands_generation += 1
             plugin_name = instance_to_inject.name
             for name, value in inspect.getmembers(instance_to_inject, inspect.ismethod):
                 if getattr(value, "_err_command", False):
@@ -652,15 +702,8 @@ class ErrBot(Backend, StoreMixin):
                     name = getattr(value, "_err_command_name")
 
                     if name in commands:
-                        f = commands[name]
-                        new_name = (plugin_name + "-" + name).lower()
-                        self.warn_admins(
-                            f"{plugin_name}.{name} clashes with {type(f.__self__).__name__}.{f.__name__} "
-                            f"so it has been renamed {new_name}"
-                        )
-                        name = new_name
-                        value.__func__._err_command_name = (
-                            new_name  # To keep track of the renaming.
+                        name = self._rename_clashing_command(
+                            plugin_name, name, value, commands[name]
                         )
                     commands[name] = value
 
@@ -673,12 +716,85 @@ class ErrBot(Backend, StoreMixin):
                         log.debug("Adding command: %s -> %s.", name, value.__name__)
                         self.commands = commands
 
+    def _rename_clashing_command(self, plugin_name: str, name: str, value, f) -> str:
+        new_name = (plugin_name + "-" + name).lower()
+        self.warn_admins(
+            f"{plugin_name}.{name} clashes with {type(f.__self__).__name__}.{f.__name__} "
+            f"so it has been renamed {new_name}"
+        )
+        value.__func__._err_command_name = new_name  # To keep track of the renaming.
+        return new_name
+
+    def swap_commands_from(self, instance) -> None:
+        """
+        Replaces at once the commands and command filters registered for instance with the ones
+        it has now, or removes them all if it is not activated anymore.
+
+        Only the entries that changed are touched, the other plugins keep their commands and the
+        command filters keep their order, so a reloaded plugin doesn't need a full unregistration.
+        """
+        members = (
+            inspect.getmembers(instance, inspect.ismethod)
+            if instance.is_activated
+            else []
+        )
+        new_commands = [m for _, m in members if getattr(m, "_err_command", False)]
+        new_filters = [
+            m for _, m in members if getattr(m, "_err_command_filter", False)
+        ]
+        with self._gbl:
+            self.commands_generation += 1
+            tables = {False: self.commands, True: self.re_commands}
+            registered = {
+                (is_re, name)
+                for is_re, table in tables.items()
+                for name, f in table.items()
+                if getattr(f, "__self__", None) is instance
+            }
+            wanted = {}
+            for value in new_commands:
+                is_re = bool(value._err_re_command)
+                name = value._err_command_name
+                f = tables[is_re].get(name)
+                if f is not None and getattr(f, "__self__", None) is not instance:
+                    name = self._rename_clashing_command(instance.name, name, value, f)
+                wanted[(is_re, name)] = value
+            for is_re, name in registered - wanted.keys():
+                del tables[is_re][name]
+            for (is_re, name), value in wanted.items():
+                tables[is_re][name] = value
+
+            # a new list so the messages being filtered keep going through the previous one.
+            filters, position = [], None
+            for f in self.command_filters:
+                if getattr(f, "__self__", None) is instance:
+                    if position is None:
+                        position = len(filters)
+                else:
+                    filters.append(f)
+            if position is None:
+                position = len(filters)
+            filters[position:position] = new_filters
+            self.command_filters = filters
+        log.debug(
+            "Swapped the commands of %s: %d added, %d removed, %d kept.",
+            instance.name,
+            len(wanted.keys() - registered),
+            len(registered - wanted.keys()),
+            len(wanted.keys() & registered),
+        )
+
     def inject_flows_from(self, instance_to_inject) -> None:
         classname = instance_to_inject.__class__.__name__
         for name, method in inspect.getmembers(instance_to_inject, inspect.ismethod):
             if getattr(method, "_err_flow", False):
                 log.debug("Found new flow %s: %s", classname, name)
-                flow = FlowRoot(name, method.__doc__)
+                flow = FlowRoot(
+                    name,
+                    method.__doc__,
+                    timeout=getattr(method, "_err_flow_timeout", None),
+                    timeout_notify=getattr(method, "_err_flow_timeout_notify", False),
+                )
                 try:
                     method(flow)
                 except Exception:
@@ -688,6 +804,7 @@ class ErrBot(Backend, StoreMixin):
 
     def inject_command_filters_from(self, instance_to_inject) -> None:
         with self._gbl:
+            self.commands_generation += 1
             for name, method in inspect.getmembers(
                 instance_to_inject, inspect.ismethod
             ):
@@ -703,6 +820,7 @@ class ErrBot(Backend, StoreMixin):
 
     def remove_commands_from(self, instance_to_inject) -> None:
         with self._gbl:
+            self.commands_generation += 1
             for name, value in inspect.getmembers(instance_to_inject, inspect.ismethod):
                 if getattr(value, "_err_command", False):
                     name = getattr(value, "_err_command_name")
@@ -715,6 +833,7 @@ class ErrBot(Backend, StoreMixin):
 
     def remove_command_filters_from(self, instance_to_inject) -> None:
         with self._gbl:
+            self.commands_generation += 1
             for name, method in inspect.getmembers(
                 instance_to_inject, inspect.ismethod
             ):
@@ -802,7 +921,12 @@ class ErrBot(Backend, StoreMixin):
 
     def callback_stream(self, stream) -> None:
         log.info("Initiated an incoming transfer %s.", stream)
-        Tee(stream, self.plugin_manager.get_all_active_plugins()).start()
+        Tee(
+            stream,
+            self.plugin_manager.get_active_plugins_subscribed_to("callback_stream"),
+            self.bot_config.BOT_STREAM_CHUNK_SIZE,
+            self.bot_config.BOT_STREAM_SPOOL,
+        ).start()
 
     def callback_reaction(self, reaction) -> None:
         """
@@ -815,14 +939,15 @@ class ErrBot(Backend, StoreMixin):
         self._dispatch_to_plugins("callback_reaction", reaction)
 
     def signal_connect_to_all_plugins(self) -> None:
-        for bot in self.plugin_manager.get_all_active_plugins():
-            if hasattr(bot, "callback_connect"):
-                # noinspection PyBroadException
-                try:
-                    log.debug("Trigger callback_connect on %s.", bot.__class__.__name__)
-                    bot.callback_connect()
-                except Exception:
-                    log.exception(f"callback_connect failed for {bot}.")
+        for bot in self.plugin_manager.get_active_plugins_subscribed_to(
+            "callback_connect"
+        ):
+            # noinspection PyBroadException
+            try:
+                log.debug("Trigger callback_connect on %s.", bot.__class__.__name__)
+                bot.callback_connect()
+            except Exception:
+                log.exception(f"callback_connect failed for {bot}.")
 
     def connect_callback(self) -> None:
         log.info("Activate internal commands")
@@ -866,9 +991,16 @@ class ErrBot(Backend, StoreMixin):
         )
 
     def shutdown(self) -> None:
+        if self.callback_dispatcher:
+            self.callback_dispatcher.close()
+        self.flow_executor.close_persistence()
+        self.flow_executor.stop_reaper()
         self.close_storage()
         self.plugin_manager.shutdown()
         self.repo_manager.shutdown()
+        if self.scheduled_jobs_storage is not None:
+            self.scheduled_jobs_storage.close_storage()
+        self.scheduler.close()
 
     def prefix_groupchat_reply(self, message: Message, identifier: Identifier) -> None:
         if message.body.startswith("#"):
@@ -1,3 +1,17 @@
-from flask.app import Flask
+from threading import Lock
 
-flask_app = Flask(__name__)
+_flask_app_lock = Lock()
+
+
+def __getattr__(name: str):
+    # Flask is heavy to import, the app is only created when the webserver or a webhook needs it.
+    global flask_app
+    if name == "flask_app":
+        # plugins can be activated concurrently, they all need to get the same app.
+        with _flask_app_lock:
+            if "flask_app" not in globals():
+                from flask.app import Flask
+
+                flask_app = Flask(__name__)
+        return flask_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,24 @@
 import fnmatch
+import re
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
 
 from errbot import BotPlugin, cmdfilter
 from errbot.backends.base import RoomOccupant
 
 BLOCK_COMMAND = (None, None, None)
+GLOB_CHARS = re.compile(r"[*?[]")
+GLOB_RULES = (
+    "allowusers",
+    "denyusers",
+    "allowrooms",
+    "denyrooms",
+    "allowargs",
+    "denyargs",
+)
+
+ARGS_DENIED = "You're not allowed to access this command using the provided arguments"
 
 
 def get_acl_usr(msg):
@@ -46,12 +61,133 @@ def ciglob(text, patterns):
     return glob(text.lower(), [p.lower() for p in patterns])
 
 
+class GlobMatcher:
+    """
+    A list of patterns compiled once to be matched like glob does: the patterns without
+    wildcards are looked up in a set and the others are translated into a single regex.
+    """
+
+    def __init__(self, patterns, ignore_case: bool = False):
+        if isinstance(patterns, str):
+            patterns = (patterns,)
+        self._ignore_case = ignore_case
+        exact = set()
+        wildcards = []
+        for pattern in patterns:
+            pattern = str(pattern)
+            if ignore_case:
+                pattern = pattern.lower()
+            if GLOB_CHARS.search(pattern):
+                wildcards.append(fnmatch.translate(pattern))
+            else:
+                exact.add(pattern)
+        self._exact = frozenset(exact)
+        self._regex = re.compile("|".join(wildcards)) if wildcards else None
+
+    def __call__(self, text) -> bool:
+        """Return True if text matches one of the patterns, False otherwise."""
+        text = str(text)
+        if self._ignore_case:
+            text = text.lower()
+        if text in self._exact:
+            return True
+        return self._regex is not None and self._regex.match(text) is not None
+
+
+def compile_acl(acl):
+    """Return a copy of the given ACL with its glob lists compiled."""
+    return {
+        key: GlobMatcher(value) if key in GLOB_RULES else value
+        for key, value in acl.items()
+    }
+
+
 class ACLS(BotPlugin):
     """
     This plugin implements access controls for commands, allowing them to be
     restricted via various rules.
+
+    The rules are compiled on first use and the decisions are cached per command, user and room.
+    Assigning new values to ACCESS_CONTROLS, ACCESS_CONTROLS_DEFAULT or BOT_ADMINS, like a reload
+    of the configuration does, invalidates them.
     """
 
+    # Maximum number of (command, user, room) decisions kept.
+    DECISIONS_CACHE_SIZE = 4096
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compiled_from = None
+        self._lock = Lock()
+
+    def _compile(self) -> None:
+        config = self.bot_config
+        sources = (
+            config.ACCESS_CONTROLS,
+            config.ACCESS_CONTROLS_DEFAULT,
+            config.BOT_ADMINS,
+        )
+        if self._compiled_from is not None and all(
+            new is old for new, old in zip(sources, self._compiled_from)
+        ):
+            return
+
+        rules = []
+        for pattern, acls in config.ACCESS_CONTROLS.items():
+            if ":" not in pattern:
+                pattern = f"*:{pattern}"
+            acl = compile_acl({**config.ACCESS_CONTROLS_DEFAULT, **acls})
+            rules.append((GlobMatcher(pattern, ignore_case=True), acl))
+        with self._lock:
+            self._rules = rules
+            self._default_acl = compile_acl(config.ACCESS_CONTROLS_DEFAULT)
+            self._admins = GlobMatcher(config.BOT_ADMINS)
+            self._acls_by_command = {}
+            self._decisions = OrderedDict()
+            self._compiled_from = sources
+        self.log.debug("Compiled %d ACL rules.", len(rules))
+
+    def _acl_for(self, cmd_str: str):
+        acl = self._acls_by_command.get(cmd_str)
+        if acl is None:
+            # the first matching rule wins.
+            acl = next(
+                (acl for matches, acl in self._rules if matches(cmd_str)),
+                self._default_acl,
+            )
+            self._acls_by_command[cmd_str] = acl
+        return acl
+
+    def _decide(self, acl, admin_only: bool, usr, room) -> Optional[str]:
+        """
+        Check the user and the room against the given ACL.
+
+        :param room: the room the command comes from, None for a private message.
+        :return: the reason of the denial or None if the command is allowed.
+        """
+        if "allowusers" in acl and not acl["allowusers"](usr):
+            return "You're not allowed to access this command from this user"
+        if "denyusers" in acl and acl["denyusers"](usr):
+            return "You're not allowed to access this command from this user"
+        if room is not None:
+            if "allowmuc" in acl and acl["allowmuc"] is False:
+                return "You're not allowed to access this command from a chatroom"
+            if "allowrooms" in acl and not acl["allowrooms"](room):
+                return "You're not allowed to access this command from this room"
+            if "denyrooms" in acl and acl["denyrooms"](room):
+                return "You're not allowed to access this command from this room"
+        elif "allowprivate" in acl and acl["allowprivate"] is False:
+            return "You're not allowed to access this command via private message to me"
+
+        if admin_only:
+            if not self._admins(usr):
+                return "This command requires bot-admin privileges"
+            # For security reasons, admin-only commands are direct-message only UNLESS
+            # specifically overridden by setting allowmuc to True for such commands.
+            if room is not None and not acl.get("allowmuc", False):
+                return "This command may only be issued through a direct message"
+        return None
+
     def access_denied(self, msg, reason, dry_run):
         if not dry_run and not self.bot_config.HIDE_RESTRICTED_ACCESS:
             self._bot.send_simple_reply(msg, reason)
@@ -67,89 +203,43 @@ class ACLS(BotPlugin):
         :param args: Arguments passed to the command.
         :param dry_run: True when this is a dry-run.
         """
-        self.log.debug("Check %s for ACLs.", cmd)
+        self._compile()
         f = self._bot.all_commands[cmd]
         cmd_str = f"{f.__self__.name}:{cmd}"
-
+        acl = self._acl_for(cmd_str)
         usr = get_acl_usr(msg)
-        acl = self.bot_config.ACCESS_CONTROLS_DEFAULT.copy()
-        for pattern, acls in self.bot_config.ACCESS_CONTROLS.items():
-            if ":" not in pattern:
-                pattern = f"*:{pattern}"
-            if ciglob(cmd_str, (pattern,)):
-                acl.update(acls)
-                break
-
-        self.log.info(
-            f"Matching ACL {acl} against username {usr} for command {cmd_str}."
+        self.log.debug(
+            "Matching ACL %s against username %s for command %s.", acl, usr, cmd_str
         )
-        if "allowargs" in acl and not glob(args, acl["allowargs"]):
-            return self.access_denied(
-                msg,
-                "You're not allowed to access this command using the provided arguments",
-                dry_run,
-            )
-        if "denyargs" in acl and glob(args, acl["denyargs"]):
-            return self.access_denied(
-                msg,
-                "You're not allowed to access this command using the provided arguments",
-                dry_run,
-            )
 
-        if "allowusers" in acl and not glob(usr, acl["allowusers"]):
-            return self.access_denied(
-                msg, "You're not allowed to access this command from this user", dry_run
-            )
-        if "denyusers" in acl and glob(usr, acl["denyusers"]):
-            return self.access_denied(
-                msg, "You're not allowed to access this command from this user", dry_run
-            )
+        # the arguments change with every call, they can't be part of the cached decision.
+        if "allowargs" in acl and not acl["allowargs"](args):
+            return self.access_denied(msg, ARGS_DENIED, dry_run)
+        if "denyargs" in acl and acl["denyargs"](args):
+            return self.access_denied(msg, ARGS_DENIED, dry_run)
+
+        room = None
         if msg.is_group:
             if not isinstance(msg.frm, RoomOccupant):
                 raise Exception(
                     f"msg.frm is not a RoomOccupant. Class of frm: {msg.frm.__class__}"
                 )
             room = get_acl_room(msg.frm.room)
-            if "allowmuc" in acl and acl["allowmuc"] is False:
-                return self.access_denied(
-                    msg,
-                    "You're not allowed to access this command from a chatroom",
-                    dry_run,
-                )
-
-            if "allowrooms" in acl and not glob(room, acl["allowrooms"]):
-                return self.access_denied(
-                    msg,
-                    "You're not allowed to access this command from this room",
-                    dry_run,
-                )
-
-            if "denyrooms" in acl and glob(room, acl["denyrooms"]):
-                return self.access_denied(
-                    msg,
-                    "You're not allowed to access this command from this room",
-                    dry_run,
-                )
-        elif "allowprivate" in acl and acl["allowprivate"] is False:
-            return self.access_denied(
-                msg,
-                "You're not allowed to access this command via private message to me",
-                dry_run,
-            )
-
-        self.log.debug(f"Check if {cmd} is admin only command.")
-        if f._err_command_admin_only:
-            if not glob(get_acl_usr(msg), self.bot_config.BOT_ADMINS):
-                return self.access_denied(
-                    msg, "This command requires bot-admin privileges", dry_run
-                )
-            # For security reasons, admin-only commands are direct-message only UNLESS
-            # specifically overridden by setting allowmuc to True for such commands.
-            if msg.is_group and not acl.get("allowmuc", False):
-                return self.access_denied(
-                    msg,
-                    "This command may only be issued through a direct message",
-                    dry_run,
-                )
 
+        admin_only = f._err_command_admin_only
+        key = (cmd_str, admin_only, str(usr), room)
+        with self._lock:
+            cached = key in self._decisions
+            if cached:
+                self._decisions.move_to_end(key)
+                reason = self._decisions[key]
+        if not cached:
+            reason = self._decide(acl, admin_only, usr, room)
+            with self._lock:
+                self._decisions[key] = reason
+                if len(self._decisions) > self.DECISIONS_CACHE_SIZE:
+                    self._decisions.popitem(last=False)
+
+        if reason is not None:
+            return self.access_denied(msg, reason, dry_run)
         return msg, cmd, args
@@ -1,18 +1,109 @@
 import textwrap
+from collections import OrderedDict, defaultdict
+from threading import Lock
 
 from dulwich import errors as dulwich_errors
 
 from errbot import BotPlugin, botcmd
+from errbot.backends.base import RoomOccupant
+from errbot.core_plugins.acls import get_acl_room, get_acl_usr
 from errbot.utils import git_tag_list
 from errbot.version import VERSION
 
 
+def trigrams(text):
+    """Return the set of the 3 characters substrings of text."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class HelpIndex:
+    """
+    The help of all the commands of the bot, grouped and rendered once for a given generation
+    of the commands.
+    """
+
+    def __init__(self, bot, generation, render):
+        """
+        :param bot: the bot.
+        :param generation: the commands generation of the bot this index is built from.
+        :param render: a function returning the help line of a command.
+        """
+        self.generation = generation
+        all_commands = bot.all_commands
+        # !help <command> also accepts the names with spaces instead of underscores.
+        self.commands = dict(all_commands)
+        self.commands.update({k.replace("_", " "): v for k, v in all_commands.items()})
+
+        sections = {}
+        apropos_sections = defaultdict(list)
+        self.apropos_documented = {}  # name -> lowercased doc
+        self.apropos_undocumented = set()  # commands without doc always match.
+        self._trigrams = defaultdict(set)
+        for name, command in all_commands.items():
+            cls = bot.get_plugin_class_from_method(command)
+            hidden = command._err_command_hidden
+            if cls not in sections:
+                obj = command.__self__
+                if getattr(cls.__errdoc__, "strip", None):
+                    errdoc = f"{cls.__errdoc__.strip()}\n\n"
+                else:
+                    errdoc = cls.__errdoc__ or "\n\n"
+                sections[cls] = (obj, f"\n**{obj.name}**\n\n{errdoc}", [])
+            sections[cls][2].append((name, hidden, render(name, command)))
+
+            if name == "help" or hidden:
+                continue
+            doc = command.__doc__
+            first_line = (doc or "(undocumented)").strip().split("\n", 1)[0]
+            name_with_spaces = name.replace("_", " ", 1)
+            apropos_sections[str.__module__ + "." + cls.__name__].append(
+                (name, f"\t{bot.prefix}{name_with_spaces}: {first_line}")
+            )
+            if doc is None:
+                self.apropos_undocumented.add(name)
+            else:
+                self.apropos_documented[name] = doc.lower()
+                for trigram in trigrams(doc.lower()):
+                    self._trigrams[trigram].add(name)
+
+        # (obj, header, [(name, hidden, help line)]) ordered like !help lists them.
+        self.sections = sorted(sections.values(), key=lambda section: section[0].name)
+        for _, _, lines in self.sections:
+            lines.sort()
+        # [(fully qualified class name, [(name, apropos line)])] ordered like !apropos lists them.
+        self.apropos_sections = sorted(apropos_sections.items())
+
+    def search(self, term):
+        """Return the names of the commands whose doc contains term, case insensitively."""
+        term = term.lower()
+        names = set(self.apropos_undocumented)
+        candidates = self.apropos_documented.keys()
+        if len(term) >= 3:
+            # only the docs having all the trigrams of the term can contain it.
+            for trigram in trigrams(term):
+                candidates = self._trigrams.get(trigram, set()).intersection(candidates)
+        names.update(
+            name for name in candidates if term in self.apropos_documented[name]
+        )
+        return names
+
+
 class Help(BotPlugin):
     MSG_HELP_TAIL = (
         "Type help <command name> to get more info " "about that specific command."
     )
     MSG_HELP_UNDEFINED_COMMAND = "That command is not defined."
 
+    # Maximum number of (user, room) command visibilities kept when HIDE_RESTRICTED_COMMANDS is set.
+    VISIBILITY_CACHE_SIZE = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = Lock()
+        self._index = None
+        self._visibility = OrderedDict()
+        self._visibility_sources = None
+
     def is_git_directory(self, path="."):
         try:
             tags = git_tag_list(path)
@@ -30,6 +121,61 @@ class Help(BotPlugin):
         )
         return m is not None
 
+    def help_index(self):
+        """
+        Get the help index of the current commands of the bot, it is rebuilt only after commands
+        or command filters have been added or removed.
+        """
+        generation = self._bot.commands_generation
+        with self._lock:
+            if self._index is None or self._index.generation != generation:
+                self.log.debug("Building the help index.")
+                self._index = HelpIndex(self._bot, generation, self._cmd_help_line)
+                self._visibility.clear()
+            return self._index
+
+    def visible_commands(self, msg, index):
+        """
+        Get the names of the commands the sender of msg may access or None if they can see all of them.
+
+        The dry runs of the command filters are cached per user and room until the commands, the
+        command filters or the access controls change.
+        """
+        if not self.bot_config.HIDE_RESTRICTED_COMMANDS:
+            return None
+        room = None
+        if msg.is_group and isinstance(msg.frm, RoomOccupant):
+            room = get_acl_room(msg.frm.room)
+        key = (str(get_acl_usr(msg)), room)
+        # the visibilities are also dropped when the index is rebuilt.
+        sources = (
+            self.bot_config.ACCESS_CONTROLS,
+            self.bot_config.ACCESS_CONTROLS_DEFAULT,
+            self.bot_config.BOT_ADMINS,
+        )
+        with self._lock:
+            if self._visibility_sources is None or any(
+                new is not old for new, old in zip(sources, self._visibility_sources)
+            ):
+                self._visibility.clear()
+                self._visibility_sources = sources
+            visible = self._visibility.get(key)
+            if visible is not None:
+                self._visibility.move_to_end(key)
+                return visible
+
+        visible = frozenset(
+            name
+            for _, _, lines in index.sections
+            for name, _, _ in lines
+            if self.may_access_command(msg, name)
+        )
+        with self._lock:
+            self._visibility[key] = visible
+            if len(self._visibility) > self.VISIBILITY_CACHE_SIZE:
+                self._visibility.popitem(last=False)
+        return visible
+
     # noinspection PyUnusedLocal
     @botcmd(template="about")
     def about(self, msg, args):
@@ -51,38 +197,17 @@ class Help(BotPlugin):
 
         description = "Available commands:\n"
 
-        cls_commands = {}
-        for name, command in self._bot.all_commands.items():
-            cls = self._bot.get_plugin_class_from_method(command)
-            cls = str.__module__ + "." + cls.__name__  # makes the fuul qualified name
-            commands = cls_commands.get(cls, [])
-            if (
-                not self.bot_config.HIDE_RESTRICTED_COMMANDS
-                or self.may_access_command(msg, name)
-            ):
-                commands.append((name, command))
-                cls_commands[cls] = commands
+        index = self.help_index()
+        visible = self.visible_commands(msg, index)
+        found = index.search(args)
 
         usage = ""
-        for cls in sorted(cls_commands):
-            commands = []
-            for name, command in cls_commands[cls]:
-                if name == "help":
-                    continue
-
-                if command._err_command_hidden:
-                    continue
-
-                doc = command.__doc__
-
-                if doc is not None and args.lower() not in doc.lower():
-                    continue
-
-                name_with_spaces = name.replace("_", " ", 1)
-                doc = (doc or "(undocumented)").strip().split("\n", 1)[0]
-                commands.append("\t" + self._bot.prefix + name_with_spaces + ": " + doc)
-
-            usage += "\n".join(commands)
+        for _, lines in index.apropos_sections:
+            usage += "\n".join(
+                line
+                for name, line in lines
+                if name in found and (visible is None or name in visible)
+            )
         usage += "\n\n"
 
         return "".join(filter(None, [description, usage])).strip()
@@ -97,78 +222,47 @@ class Help(BotPlugin):
         usage = ""
         description = "### All commands\n"
 
-        cls_obj_commands = {}
-        for name, command in self._bot.all_commands.items():
-            cls = self._bot.get_plugin_class_from_method(command)
-            obj = command.__self__
-            _, commands = cls_obj_commands.get(cls, (None, []))
-            if (
-                not self.bot_config.HIDE_RESTRICTED_COMMANDS
-                or self.may_access_command(msg, name)
-            ):
-                commands.append((name, command))
-                cls_obj_commands[cls] = (obj, commands)
+        index = self.help_index()
+        visible = self.visible_commands(msg, index)
+        # the plugin sections with at least one command visible by the sender.
+        sections = [
+            (obj, header, lines)
+            for obj, header, lines in index.sections
+            if visible is None or any(name in visible for name, _, _ in lines)
+        ]
 
         # show all
         if not args:
-            for cls in sorted(
-                cls_obj_commands.keys(), key=lambda c: cls_obj_commands[c][0].name
-            ):
-                obj, commands = cls_obj_commands[cls]
-                name = obj.name
+            for obj, header, lines in sections:
                 # shows class and description
-                usage += f"\n**{name}**\n\n"
-                if getattr(cls.__errdoc__, "strip", None):
-                    usage += f"{cls.__errdoc__.strip()}\n\n"
-                else:
-                    usage += cls.__errdoc__ or "\n\n"
-
-                for name, command in sorted(commands):
-                    if command._err_command_hidden:
+                usage += header
+                for name, hidden, line in lines:
+                    if hidden or (visible is not None and name not in visible):
                         continue
                     # show individual commands
-                    usage += self._cmd_help_line(name, command)
+                    usage += line
             usage += "\n\n"  # end cls section
         elif args:
-            for cls, (obj, cmds) in cls_obj_commands.items():
+            for obj, header, lines in sections:
                 if obj.name.lower() == args:
                     break
             else:
-                cls, obj, cmds = None, None, None
+                obj, header, lines = None, None, None
 
-            if cls is None:
+            if obj is None:
                 # Plugin not found.
                 description = ""
-                all_commands = dict(self._bot.all_commands)
-                all_commands.update(
-                    {k.replace("_", " "): v for k, v in all_commands.items()}
-                )
-                if args in all_commands:
-                    usage += self._cmd_help_line(args, all_commands[args], True)
+                if args in index.commands:
+                    usage += self._cmd_help_line(args, index.commands[args], True)
                 else:
                     usage += self.MSG_HELP_UNDEFINED_COMMAND
             else:
                 # filter out the commands related to this class
-                description = ""
-                description += f"\n**{obj.name}**\n\n"
-                if getattr(cls.__errdoc__, "strip", None):
-                    description += f"{cls.__errdoc__.strip()}\n\n"
-                else:
-                    description += cls.__errdoc__ or "\n\n"
-                pairs = []
-                for name, command in cmds:
-                    if self.bot_config.HIDE_RESTRICTED_COMMANDS:
-                        if command._err_command_hidden:
-                            continue
-
-                        if not self.may_access_command(msg, name):
-                            continue
-                    pairs.append((name, command))
-
-                pairs = sorted(pairs)
-
-                for name, command in pairs:
-                    usage += self._cmd_help_line(name, command)
+                description = header
+                for name, hidden, line in lines:
+                    if visible is not None and (hidden or name not in visible):
+                        continue
+                    usage += line
 
         return "".join(filter(None, [description, usage]))
 
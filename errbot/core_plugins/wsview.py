@@ -29,8 +29,12 @@ def reset_app():
     errbot.core_plugins.flask_app = Flask(__name__)
 
 
-def route(obj):
-    """Check for functions to route in obj and route them."""
+def route(obj, on_request=None):
+    """
+    Check for functions to route in obj and route them.
+
+    :param on_request: a function called before each request to those routes.
+    """
     flask_app = errbot.core_plugins.flask_app
     classname = obj.__class__.__name__
     log.info("Checking %s for webhooks", classname)
@@ -43,23 +47,30 @@ def route(obj):
             raw = func._err_webhook_raw
 
             callable_view = WebView.as_view(
-                func.__name__ + "_" + "_".join(verbs), func, form_param, raw
+                func.__name__ + "_" + "_".join(verbs),
+                func,
+                form_param,
+                raw,
+                on_request,
             )
 
             # Change existing rule.
             for rule in flask_app.url_map._rules:
                 if rule.rule == uri_rule:
                     flask_app.view_functions[rule.endpoint] = callable_view
-                    return
-
-            # Add a new rule
-            flask_app.add_url_rule(
-                uri_rule, view_func=callable_view, methods=verbs, strict_slashes=False
-            )
+                    break
+            else:
+                # Add a new rule
+                flask_app.add_url_rule(
+                    uri_rule,
+                    view_func=callable_view,
+                    methods=verbs,
+                    strict_slashes=False,
+                )
 
 
 class WebView(View):
-    def __init__(self, func, form_param, raw):
+    def __init__(self, func, form_param, raw, on_request=None):
         if form_param is not None and raw:
             raise Exception(
                 "Incompatible parameters: form_param cannot be set if raw is True"
@@ -67,11 +78,14 @@ class WebView(View):
         self.func = func
         self.raw = raw
         self.form_param = form_param
+        self.on_request = on_request
         self.method_filter = (
             lambda obj: ismethod(obj) and self.func.__name__ == obj.__name__
         )
 
     def dispatch_request(self, *args, **kwargs):
+        if self.on_request is not None:
+            self.on_request()
         if self.raw:  # override and gives the request directly
             response = self.func(request, **kwargs)
         elif self.form_param:
@@ -0,0 +1,136 @@
+import dataclasses
+import fnmatch
+import importlib.metadata
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from errbot.plugin_info import PluginInfo
+
+log = logging.getLogger(__name__)
+
+# the files the discovery is looking for.
+DISCOVERED_FILES = ("*.plug", "*.flow")
+
+
+class DiscoveryCache:
+    """
+    Remembers what the discovery of the plugins found so a restart doesn't crawl the plugin trees again.
+
+    A tree walk is reused as long as none of the directories it went through has been modified, the
+    plugin files are parsed again only if their modification time or size changed and the entry point
+    paths are resolved again only if the installed distributions providing them changed.
+
+    The manifest is a plain dictionary meant to be persisted between restarts, only the entries used
+    during the current discovery are kept in it.
+    """
+
+    def __init__(self, previous: Optional[Dict] = None) -> None:
+        """
+        :param previous: the manifest of a previous discovery.
+        """
+        self.previous = previous or {}
+        self.manifest = {"walks": {}, "plugin_infos": {}, "entry_points": {}}
+        self.changed = False
+
+    def _reuse(self, section: str, key: str, valid: Callable[[Dict], bool]):
+        # an entry found during the current discovery is up to date for the rest of it.
+        entry = self.manifest[section].get(key)
+        if entry is not None:
+            return entry
+        entry = self.previous.get(section, {}).get(key)
+        if entry is not None and valid(entry):
+            self.manifest[section][key] = entry
+            return entry
+        return None
+
+    def _store(self, section: str, key: str, entry) -> None:
+        self.manifest[section][key] = entry
+        self.changed = True
+
+    def walk(self, path: str) -> List[str]:
+        """
+        Lists the plugin and flow files under path, following the symlinks like os.walk does.
+
+        :param path: the directory to walk.
+        :return: the paths of the files found.
+        """
+        entry = self._reuse("walks", path, self._walk_is_current)
+        if entry is None:
+            mtimes = {}
+            files = []
+            for root, dirnames, filenames in os.walk(path, followlinks=True):
+                mtimes[root] = os.stat(root).st_mtime_ns
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if any(fnmatch.fnmatch(filename, sig) for sig in DISCOVERED_FILES):
+                        files.append(os.path.join(root, filename))
+            entry = {"mtimes": mtimes, "files": files}
+            self._store("walks", path, entry)
+        return entry["files"]
+
+    @staticmethod
+    def _walk_is_current(entry: Dict) -> bool:
+        # adding, removing or renaming anything in a directory changes its modification time.
+        try:
+            return all(
+                os.stat(directory).st_mtime_ns == mtime
+                for directory, mtime in entry["mtimes"].items()
+            )
+        except OSError:
+            return False
+
+    def plugin_info(self, plugfile: Path) -> PluginInfo:
+        """
+        Loads the given plugin file, from the manifest if it hasn't changed since.
+
+        :param plugfile: the path of the .plug or .flow file.
+        """
+        stat = plugfile.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        key = str(plugfile)
+        entry = self._reuse(
+            "plugin_infos", key, lambda entry: entry["signature"] == signature
+        )
+        if entry is None:
+            entry = {"signature": signature, "info": PluginInfo.load(plugfile)}
+            self._store("plugin_infos", key, entry)
+        # the plugin manager owns the info it gets.
+        return dataclasses.replace(entry["info"])
+
+    def entry_points(self, group: str, resolve: Callable[[], List[str]]) -> List[str]:
+        """
+        Gets the paths of the plugins declared as entry points of the given group.
+
+        :param group: the entry points group.
+        :param resolve: the function resolving the paths when they are unknown.
+        """
+        distributions = sorted(
+            (
+                ep.name,
+                ep.value,
+                ep.dist.name if ep.dist else None,
+                ep.dist.version if ep.dist else None,
+            )
+            for ep in importlib.metadata.entry_points(group=group)
+        )
+        entry = self._reuse(
+            "entry_points",
+            group,
+            lambda entry: (
+                entry["distributions"] == distributions
+                and all(os.path.isdir(path) for path in entry["paths"])
+            ),
+        )
+        if entry is None:
+            entry = {"distributions": distributions, "paths": resolve()}
+            self._store("entry_points", group, entry)
+        return entry["paths"]
+
+    def dropped_entries(self) -> bool:
+        """Tells if some entries of the previous manifest have not been used by this discovery."""
+        return any(
+            set(self.previous.get(section, {})) - set(entries)
+            for section, entries in self.manifest.items()
+        )
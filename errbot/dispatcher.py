@@ -0,0 +1,92 @@
+import logging
+import time
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from threading import Lock
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+
+class CallbackDispatcher:
+    """
+    Runs the plugin callbacks (callback_message, callback_presence...) on a bounded thread pool
+    so the backend receiving the events never waits for the plugins.
+
+    The callbacks of a given plugin are executed one at a time, in the order they have been
+    dispatched, but the plugins progress independently from each other: a slow plugin only
+    delays its own callbacks.
+    """
+
+    def __init__(self, pool_size: int, timeout: Optional[float] = None) -> None:
+        """
+        :param pool_size: the maximum number of plugin callbacks running at the same time.
+        :param timeout: in seconds, callbacks still waiting for their plugin after this delay are
+                        dropped and callbacks running longer than that are reported.
+        """
+        self._pool = ThreadPool(pool_size)
+        self._timeout = timeout
+        self._lanes = {}  # plugin name -> deque of (dispatch time, plugin, method, args, kwargs)
+        self._lock = Lock()
+        self._closed = False
+
+    def dispatch(self, plugin, method: str, *args, **kwargs) -> None:
+        """
+        Queues the call of `method` on `plugin` with the given parameters.
+
+        :param plugin: the plugin instance.
+        :param method: the name of the callback to call.
+        """
+        with self._lock:
+            if self._closed:
+                log.debug("Dispatcher closed, dropping %s on %s.", method, plugin.name)
+                return
+            lane = self._lanes.get(plugin.name)
+            if lane is None:
+                # nothing is running for this plugin, start draining its lane.
+                lane = self._lanes[plugin.name] = deque()
+                self._pool.apply_async(self._drain, (plugin.name,))
+            lane.append((time.monotonic(), plugin, method, args, kwargs))
+
+    def _drain(self, plugin_name: str) -> None:
+        while True:
+            with self._lock:
+                lane = self._lanes[plugin_name]
+                if not lane:
+                    del self._lanes[plugin_name]
+                    return
+                dispatched, plugin, method, args, kwargs = lane.popleft()
+
+            started = time.monotonic()
+            if self._timeout and started - dispatched > self._timeout:
+                log.warning(
+                    "%s on %s dropped, it waited for %.1fs behind slower callbacks.",
+                    method,
+                    plugin_name,
+                    started - dispatched,
+                )
+                continue
+
+            log.debug("Triggering %s on %s.", method, plugin_name)
+            # noinspection PyBroadException
+            try:
+                getattr(plugin, method)(*args, **kwargs)
+            except Exception:
+                log.exception("%s on %s crashed.", method, plugin_name)
+
+            elapsed = time.monotonic() - started
+            if self._timeout and elapsed > self._timeout:
+                log.warning(
+                    "%s on %s took %.1fs, more than the %ss callback timeout.",
+                    method,
+                    plugin_name,
+                    elapsed,
+                    self._timeout,
+                )
+
+    def close(self) -> None:
+        """Waits for the queued callbacks to complete and stops the pool."""
+        with self._lock:
+            self._closed = True
+        self._pool.close()
+        self._pool.join()
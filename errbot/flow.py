@@ -1,11 +1,16 @@
 import atexit
+import heapq
+import itertools
 import logging
-from multiprocessing.pool import ThreadPool
-from threading import RLock
-from typing import Any, Callable, List, Mapping, Optional, Tuple, Union
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Lock, RLock, Timer
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple, Union
 
 from errbot import Message
 from errbot.backends.base import Identifier, Room, RoomOccupant
+from errbot.storage import StoreMixin
 
 log = logging.getLogger(__name__)
 
@@ -15,6 +20,9 @@ EXECUTOR_THREADS = (
     5  # the maximum number of simultaneous flows in automatic mode at the same time.
 )
 
+# storage namespace of the checkpointed flows, it cannot collide with the one of a plugin.
+CHECKPOINTS_NAMESPACE = "core_flow_checkpoints"
+
 
 class FlowNode:
     """
@@ -82,18 +90,29 @@ class FlowRoot(FlowNode):
     This represent the entry point of a flow description.
     """
 
-    def __init__(self, name: str, description: str):
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        timeout: Optional[float] = None,
+        timeout_notify: bool = False,
+    ):
         """
 
         :param name: The name of the conversation/flow.
         :param description:  A human description of what this flow does.
         :param hints: Hints for the next steps when triggered.
+        :param timeout: in seconds, flows inactive for longer than that are stopped.
+                        None defers to the default timeout of the executor.
+        :param timeout_notify: tells the requestor when their flow has been stopped for inactivity.
         """
         super().__init__()
         self.name = name
         self.description = description
         self.auto_triggers = set()
         self.room_flow = False
+        self.timeout = timeout
+        self.timeout_notify = timeout_notify
 
     def connect(
         self,
@@ -156,6 +175,7 @@ class Flow:
         self._current_step = self._root
         self.ctx = dict(initial_context)
         self.requestor = requestor
+        self.last_activity = time.monotonic()
 
     def next_autosteps(self) -> List[FlowNode]:
         """
@@ -193,6 +213,7 @@ class Flow:
                 )
 
         self._current_step = next_step
+        self.last_activity = time.monotonic()
 
     @property
     def name(self) -> str:
@@ -267,17 +288,88 @@ class BotFlow:
         self._bot.all_commands.get(command_name, None)
 
 
+def _identity_key(identifier: Identifier) -> str:
+    """
+    Gets a key shared by all the identifiers a flow requestor can match.
+    Identifiers are not necessarily hashable and their equality is backend specific, so flows are
+    bucketed by person or room name and the exact match is left to Flow.check_identifier.
+    """
+    if isinstance(identifier, Room):
+        return f"room:{identifier}"
+    return f"person:{getattr(identifier, 'person', identifier)}"
+
+
+def _step_path(root: FlowRoot, step: FlowNode) -> Optional[Tuple[int, ...]]:
+    """
+    Gets the position of a step in the flow graph as the indexes of the children to follow from the root.
+    """
+    paths = {root: ()}
+    to_visit = deque([root])
+    while to_visit:
+        node = to_visit.popleft()
+        if node is step:
+            return paths[node]
+        for index, (_, child) in enumerate(node.children):
+            if child not in paths:
+                paths[child] = paths[node] + (index,)
+                to_visit.append(child)
+    return None
+
+
+def _step_at(root: FlowRoot, path: Tuple[int, ...]) -> Optional[FlowNode]:
+    """
+    Opposite of _step_path, returns None if the flow graph does not have this step anymore.
+    """
+    node = root
+    for index in path:
+        if index >= len(node.children):
+            return None
+        node = node.children[index][1]
+    return node
+
+
 class FlowExecutor:
     """
     This is a instance that can monitor and execute flow instances.
     """
 
-    def __init__(self, bot):
+    def __init__(self, bot, default_timeout: Optional[float] = None):
+        """
+        :param bot: the bot executing the flow commands.
+        :param default_timeout: in seconds, inactivity timeout of the flows not defining their own.
+        """
         self._lock = RLock()
+        self._lock_depth = 0  # nesting of _locked, only changed with the lock held.
         self.flow_roots = {}
         self.in_flight = []
+        # indexes of the flows above, the flows must be advanced with _advance to keep them in sync.
+        self._flows_by_identity: Dict[str, List[Flow]] = {}
+        self._flows_by_command: Dict[str, Dict[Flow, FlowNode]] = {}
+        self._roots_by_trigger: Dict[Any, List[FlowRoot]] = {}
+        # StoreMixin of the checkpointed flows, by identity key.
+        self._persistence = None
+        self._persistence_ttl = None
+        self._persistence_clock = time.time
+        # names of the checkpointed flows still to be rehydrated, by identity key.
+        self._persisted: Dict[str, Set[str]] = {}
+        # (storage, key, flow name, checkpoint or None to forget it) still to be written, in order.
+        self._pending_checkpoints = deque()
+        # serializes the writes to the storage, which are done without holding the executor lock.
+        self._persistence_lock = Lock()
+        self.default_timeout = default_timeout
+        # heap of (deadline, sequence, flow) of the flows with a timeout, the deadline is
+        # only a lower bound as flows can have advanced since.
+        self._deadlines = []
+        self._sequence = itertools.count()
+        self._reaper: Optional[Timer] = None
+        self._reaper_deadline = None
+        # multiprocessing is slow to import, it is only needed once there is a bot.
+        from multiprocessing.pool import ThreadPool
+
         self._pool = ThreadPool(EXECUTOR_THREADS)
         atexit.register(self._pool.close)
+        # runs the forked autosteps, created on the first fork.
+        self._branch_pool = None
         self._bot = bot
 
     def add_flow(self, flow: FlowRoot) -> None:
@@ -286,6 +378,314 @@ class FlowExecutor:
         """
         with self._lock:
             self.flow_roots[flow.name] = flow
+            self._roots_by_trigger = {}
+            for flow_root in self.flow_roots.values():
+                for auto_trigger in flow_root.auto_triggers:
+                    self._roots_by_trigger.setdefault(auto_trigger, []).append(
+                        flow_root
+                    )
+
+    def open_persistence(
+        self,
+        storage_plugin,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Checkpoints the flows in the given storage so they survive a restart of the bot.
+        The flows checkpointed by a previous run are rehydrated when their requestor comes back,
+        once their flow is registered.
+
+        :param storage_plugin: the storage plugin to use.
+        :param ttl: in seconds, the flows not advanced for longer than that are dropped.
+        :param clock: gives the current time in seconds since the epoch to timestamp the checkpoints.
+        """
+        with self._lock:
+            self._persistence = StoreMixin()
+            self._persistence.open_storage(storage_plugin, CHECKPOINTS_NAMESPACE)
+            self._persistence_ttl = ttl
+            self._persistence_clock = clock
+            now = clock()
+            for key in list(self._persistence.keys()):
+                checkpoints = {
+                    name: checkpoint
+                    for name, checkpoint in self._persistence[key].items()
+                    if not self._is_expired(checkpoint, now)
+                }
+                if checkpoints:
+                    self._persistence[key] = checkpoints
+                    self._persisted[key] = set(checkpoints)
+                else:
+                    del self._persistence[key]
+            log.debug("%d requestors have flows to resume.", len(self._persisted))
+
+    def close_persistence(self) -> None:
+        with self._lock, self._persistence_lock:
+            if self._persistence is not None:
+                self._drain_checkpoints()
+                self._persistence.close_storage()
+                self._persistence = None
+                self._persisted.clear()
+
+    def _is_expired(self, checkpoint: Mapping[str, Any], now: float) -> bool:
+        return bool(self._persistence_ttl) and (
+            now - checkpoint["timestamp"] > self._persistence_ttl
+        )
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the executor lock, the checkpoints queued meanwhile are written once the outermost
+        holder releases it so a slow storage doesn't stall the other flows.
+        """
+        with self._lock:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                outermost = not self._lock_depth
+        if outermost:
+            self._write_checkpoints()
+
+    def _write_checkpoints(self) -> None:
+        with self._persistence_lock:
+            self._drain_checkpoints()
+
+    def _drain_checkpoints(self) -> None:
+        while self._pending_checkpoints:
+            storage, key, name, checkpoint = self._pending_checkpoints.popleft()
+            try:
+                if checkpoint is not None:
+                    with storage.mutable(key, {}) as checkpoints:
+                        checkpoints[name] = checkpoint
+                    continue
+                try:
+                    checkpoints = storage[key]
+                except KeyError:
+                    continue
+                checkpoints.pop(name, None)
+                if checkpoints:
+                    storage[key] = checkpoints
+                else:
+                    del storage[key]
+            except Exception:
+                log.exception("Could not write the checkpoint of the flow %s.", name)
+
+    def _checkpoint(self, flow: Flow) -> None:
+        """
+        Saves the current step and context of an in flight flow.
+        """
+        with self._locked():
+            if self._persistence is None:
+                return
+            path = _step_path(flow.root, flow.current_step)
+            if path is None:
+                return
+            key = _identity_key(flow.requestor)
+            self._rehydrate_key(key)
+            checkpoint = {
+                "timestamp": self._persistence_clock(),
+                "requestor": str(flow.requestor),
+                "room": isinstance(flow.requestor, Room),
+                "path": path,
+                "ctx": dict(flow.ctx),
+            }
+            self._pending_checkpoints.append(
+                (self._persistence, key, flow.name, checkpoint)
+            )
+
+    def _forget(self, flow: Flow) -> None:
+        with self._locked():
+            if self._persistence is None:
+                return
+            key = _identity_key(flow.requestor)
+            self._pending_checkpoints.append((self._persistence, key, flow.name, None))
+
+    def _rehydrate_key(self, key: str) -> None:
+        """
+        Puts back in flight the flows checkpointed under this key by a previous run of the bot.
+
+        The flows which are not registered yet, as their plugin is activated later, are kept
+        for a next call.
+        """
+        # popped first as resuming a flow checkpoints it again under the same key.
+        names = self._persisted.pop(key, None)
+        if names is None:
+            return
+        try:
+            checkpoints = self._persistence[key]
+        except KeyError:
+            return
+        now = self._persistence_clock()
+        for name in [name for name in names if name in self.flow_roots]:
+            names.discard(name)
+            checkpoint = checkpoints.get(name)
+            if checkpoint is None:  # replaced or forgotten in the meantime.
+                continue
+            flow_root = self.flow_roots[name]
+            step = _step_at(flow_root, checkpoint["path"])
+            if step is None or self._is_expired(checkpoint, now):
+                log.info("Dropping the checkpointed flow %s.", name)
+                continue
+            if checkpoint["room"]:
+                requestor = self._bot.query_room(checkpoint["requestor"])
+            else:
+                requestor = self._bot.build_identifier(checkpoint["requestor"])
+            flow = Flow(flow_root, requestor, checkpoint["ctx"])
+            flow._current_step = step
+            log.debug("Resuming %s.", flow)
+            self._add_in_flight(flow)
+        if names:
+            self._persisted[key] = names
+
+    def _rehydrate(self, identifier: Identifier) -> None:
+        if self._persisted:
+            self._rehydrate_key(_identity_key(identifier))
+            if isinstance(identifier, RoomOccupant):
+                self._rehydrate_key(_identity_key(identifier.room))
+
+    def _flows_of(self, identifier: Identifier) -> List[Flow]:
+        """
+        Gets the in flight flows the given identifier takes part in.
+        """
+        self._rehydrate(identifier)
+        flows = self._flows_by_identity.get(_identity_key(identifier), [])
+        if isinstance(identifier, RoomOccupant):
+            flows = flows + self._flows_by_identity.get(
+                _identity_key(identifier.room), []
+            )
+        return [flow for flow in flows if flow.check_identifier(identifier)]
+
+    def _index_next_steps(self, flow: Flow) -> None:
+        for next_step in flow.next_steps():
+            self._flows_by_command.setdefault(next_step.command, {}).setdefault(
+                flow, next_step
+            )
+
+    def _unindex_next_steps(self, flow: Flow) -> None:
+        for next_step in flow.next_steps():
+            waiting = self._flows_by_command.get(next_step.command)
+            if waiting is not None:
+                waiting.pop(flow, None)
+                if not waiting:
+                    del self._flows_by_command[next_step.command]
+
+    def _add_in_flight(self, flow: Flow) -> None:
+        with self._locked():
+            flows = self._flows_by_identity.setdefault(
+                _identity_key(flow.requestor), []
+            )
+            if flow in flows:
+                return
+            flows.append(flow)
+            self.in_flight.append(flow)
+            self._index_next_steps(flow)
+            self._checkpoint(flow)
+            timeout = self._timeout_of(flow)
+            if timeout:
+                self._schedule_reaping(flow, flow.last_activity + timeout)
+
+    def _remove_in_flight(self, flow: Flow) -> None:
+        with self._locked():
+            key = _identity_key(flow.requestor)
+            flows = self._flows_by_identity.get(key, [])
+            if flow not in flows:
+                return
+            flows.remove(flow)
+            if not flows:
+                del self._flows_by_identity[key]
+            self.in_flight.remove(flow)
+            self._unindex_next_steps(flow)
+            self._forget(flow)
+
+    def _timeout_of(self, flow: Flow) -> Optional[float]:
+        if flow.root.timeout is not None:
+            return flow.root.timeout
+        return self.default_timeout
+
+    def _schedule_reaping(self, flow: Flow, deadline: float) -> None:
+        with self._locked():
+            heapq.heappush(self._deadlines, (deadline, next(self._sequence), flow))
+            self._arm_reaper()
+
+    def _arm_reaper(self) -> None:
+        """
+        Makes sure the reaper wakes up for the earliest deadline, a single timer serves all the flows.
+        """
+        if not self._deadlines:
+            return
+        deadline = self._deadlines[0][0]
+        if self._reaper is not None:
+            if self._reaper_deadline <= deadline:
+                return
+            self._reaper.cancel()
+        self._reaper = Timer(max(deadline - time.monotonic(), 0), self.reap)
+        self._reaper.name = "Flow reaper"
+        self._reaper.daemon = True
+        self._reaper_deadline = deadline
+        self._reaper.start()
+
+    def stop_reaper(self) -> None:
+        with self._locked():
+            if self._reaper is not None:
+                self._reaper.cancel()
+                self._reaper = None
+            self._deadlines = []
+
+    def reap(self) -> List[Flow]:
+        """
+        Stops the in flight flows inactive for longer than their timeout.
+
+        :returns: the stopped flows.
+        """
+        expired = []
+        with self._locked():
+            self._reaper = None
+            now = time.monotonic()
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, _, flow = heapq.heappop(self._deadlines)
+                key = _identity_key(flow.requestor)
+                if flow not in self._flows_by_identity.get(key, []):
+                    continue  # already ended or stopped.
+                deadline = flow.last_activity + self._timeout_of(flow)
+                if deadline > now:
+                    heapq.heappush(
+                        self._deadlines, (deadline, next(self._sequence), flow)
+                    )
+                    continue
+                log.info("Flow %s timed out.", flow)
+                self._remove_in_flight(flow)
+                expired.append(flow)
+            self._arm_reaper()
+
+        for flow in expired:
+            if flow.root.timeout_notify:
+                self._bot.send(
+                    flow.requestor,
+                    f"Your flow **{flow.name}** has been stopped after "
+                    f"{self._timeout_of(flow):.0f}s of inactivity.",
+                )
+        return expired
+
+    def _advance(
+        self, flow: Flow, next_step: FlowNode, enforce_predicate: bool = True
+    ) -> None:
+        """
+        Advances the flow, keeping the index of the commands it waits for up to date.
+        """
+        with self._locked():
+            tracked = flow in self._flows_by_identity.get(
+                _identity_key(flow.requestor), []
+            )
+            if tracked:
+                self._unindex_next_steps(flow)
+            try:
+                flow.advance(next_step, enforce_predicate=enforce_predicate)
+            finally:
+                if tracked:
+                    self._index_next_steps(flow)
+                    self._checkpoint(flow)
 
     def trigger(
         self, cmd: str, requestor: Identifier, extra_context=None
@@ -304,7 +704,7 @@ class FlowExecutor:
         if not flow:
             return None
 
-        flow.advance(next_step, enforce_predicate=False)
+        self._advance(flow, next_step, enforce_predicate=False)
         if extra_context:
             flow.ctx = dict(extra_context)
         self._enqueue_flow(flow)
@@ -315,8 +715,9 @@ class FlowExecutor:
         Check if user is already running a flow.
         :param user: the user
         """
-        with self._lock:
-            for flow in self.in_flight:
+        with self._locked():
+            self._rehydrate(user)
+            for flow in self._flows_by_identity.get(_identity_key(user), []):
                 if flow.requestor == user:
                     return True
         return False
@@ -331,16 +732,18 @@ class FlowExecutor:
         :returns: The name of the flow it triggered or None if none were matching."""
         log.debug("Test if the command %s is a trigger for an inflight flow ...", cmd)
         # TODO: What if 2 flows wait for the same command ?
-        with self._lock:
-            for flow in self.in_flight:
-                if flow.check_identifier(user):
+        with self._locked():
+            self._rehydrate(user)
+            waiting = self._flows_by_command.get(cmd)
+            if waiting:
+                for flow in self._flows_of(user):
                     log.debug("Requestor has a flow %s in flight", flow.name)
-                    for next_step in flow.next_steps():
-                        if next_step.command == cmd:
-                            log.debug(
-                                "Requestor has a flow in flight waiting for this command!"
-                            )
-                            return flow, next_step
+                    next_step = waiting.get(flow)
+                    if next_step is not None:
+                        log.debug(
+                            "Requestor has a flow in flight waiting for this command!"
+                        )
+                        return flow, next_step
         log.debug("No in flight flows matched.")
         return None, None
 
@@ -355,19 +758,17 @@ class FlowExecutor:
         :returns: The name of the flow it triggered or None if none were matching.
         """
         log.debug("Test if the command %s is an auto-trigger for any flow ...", cmd)
-        with self._lock:
-            for name, flow_root in self.flow_roots.items():
-                if (
-                    cmd in flow_root.auto_triggers
-                    and not self.check_inflight_already_running(user)
-                ):
-                    log.debug(
-                        "Flow %s has been auto-triggered by the command %s by user %s",
-                        name,
-                        cmd,
-                        user,
-                    )
-                    return self._create_new_flow(flow_root, user, cmd)
+        with self._locked():
+            flow_roots = self._roots_by_trigger.get(cmd)
+            if flow_roots and not self.check_inflight_already_running(user):
+                flow_root = flow_roots[0]
+                log.debug(
+                    "Flow %s has been auto-triggered by the command %s by user %s",
+                    flow_root.name,
+                    cmd,
+                    user,
+                )
+                return self._create_new_flow(flow_root, user, cmd)
         return None, None
 
     @staticmethod
@@ -410,20 +811,59 @@ class FlowExecutor:
         Stops a specific flow. It is a no op if the flow doesn't exist.
         Returns the stopped flow if found.
         """
-        with self._lock:
-            for flow in self.in_flight:
-                if flow.name == name and flow.check_identifier(requestor):
+        with self._locked():
+            for flow in self._flows_of(requestor):
+                if flow.name == name:
                     log.debug(f"Removing flow {str(flow)}.")
-                    self.in_flight.remove(flow)
+                    self._remove_in_flight(flow)
                     return flow
         return None
 
     def _enqueue_flow(self, flow: Flow) -> None:
-        with self._lock:
-            if flow not in self.in_flight:
-                self.in_flight.append(flow)
+        self._add_in_flight(flow)
         self._pool.apply_async(self.execute, (flow,))
 
+    def _execute_step(self, flow: Flow, step: FlowNode, ctx: Mapping[str, Any]) -> None:
+        log.debug("Proceeding automatically with step %s", step)
+        try:
+            msg = Message(frm=flow.requestor, flow=flow)
+            msg.ctx = ctx
+            result = self._bot.commands[step.command](msg, None)
+            log.debug("Step result %s: %s", flow.requestor, result)
+
+        except Exception as e:
+            log.exception("%s errored at %s", flow, step)
+            self._bot.send(flow.requestor, f'{flow} errored at {step} with "{e}"')
+
+    def _execute_branches(self, flow: Flow, branches: List[FlowNode]) -> None:
+        """
+        Executes concurrently the steps a flow forks to and merges back their contexts.
+        Each branch works on its own copy of the context, the keys they set or delete are applied to the flow
+        context in the order of the branches once they have all completed.
+        """
+        with self._locked():
+            if self._branch_pool is None:
+                from multiprocessing.pool import ThreadPool
+
+                self._branch_pool = ThreadPool(EXECUTOR_THREADS)
+                atexit.register(self._branch_pool.close)
+        original = dict(flow.ctx)
+        contexts = [dict(original) for _ in branches]
+        results = [
+            self._branch_pool.apply_async(self._execute_step, (flow, branch, ctx))
+            for branch, ctx in zip(branches[1:], contexts[1:])
+        ]
+        self._execute_step(flow, branches[0], contexts[0])
+        for result in results:
+            result.wait()
+
+        for ctx in contexts:
+            for key in original.keys() - ctx.keys():
+                flow.ctx.pop(key, None)
+            for key, value in ctx.items():
+                if key not in original or original[key] is not value:
+                    flow.ctx[key] = value
+
     def execute(self, flow: Flow) -> None:
         """
         This is where the flow execution happens from one of the thread of the pool.
@@ -434,29 +874,31 @@ class FlowExecutor:
 
             if not steps:
                 log.debug("Flow ended correctly.Nothing left to do.")
-                with self._lock:
-                    self.in_flight.remove(flow)
+                self._remove_in_flight(flow)
                 break
 
-            if not autosteps and flow.current_step.hints:
-                possible_next_steps = [
-                    f"You are in the flow **{flow.name}**, you can continue with:\n\n"
-                ]
-                for step in steps:
-                    cmd = step.command
-                    cmd_fnc = self._bot.all_commands[cmd]
-                    reg_cmd = cmd_fnc._err_re_command
-                    syntax_args = cmd_fnc._err_command_syntax
-                    reg_prefixed = (
-                        cmd_fnc._err_command_prefix_required if reg_cmd else True
-                    )
-                    syntax = self._bot.prefix if reg_prefixed else ""
-                    if not reg_cmd:
-                        syntax += cmd.replace("_", " ")
-                    if syntax_args:
-                        syntax += syntax_args
-                    possible_next_steps.append(f"- {syntax}")
-                self._bot.send(flow.requestor, "\n".join(possible_next_steps))
+            if not autosteps:
+                # the flow waits for its requestor, save the context the commands have built.
+                self._checkpoint(flow)
+                if flow.current_step.hints:
+                    possible_next_steps = [
+                        f"You are in the flow **{flow.name}**, you can continue with:\n\n"
+                    ]
+                    for step in steps:
+                        cmd = step.command
+                        cmd_fnc = self._bot.all_commands[cmd]
+                        reg_cmd = cmd_fnc._err_re_command
+                        syntax_args = cmd_fnc._err_command_syntax
+                        reg_prefixed = (
+                            cmd_fnc._err_command_prefix_required if reg_cmd else True
+                        )
+                        syntax = self._bot.prefix if reg_prefixed else ""
+                        if not reg_cmd:
+                            syntax += cmd.replace("_", " ")
+                        if syntax_args:
+                            syntax += syntax_args
+                        possible_next_steps.append(f"- {syntax}")
+                    self._bot.send(flow.requestor, "\n".join(possible_next_steps))
                 break
 
             log.debug(
@@ -467,24 +909,20 @@ class FlowExecutor:
                 "All possible next steps: %s.", ", ".join(str(node) for node in steps)
             )
 
-            for autostep in autosteps:
-                log.debug("Proceeding automatically with step %s", autostep)
-                if autostep == FLOW_END:
-                    log.debug("This flow ENDED.")
-                    with self._lock:
-                        self.in_flight.remove(flow)
-                    return
-                try:
-                    msg = Message(frm=flow.requestor, flow=flow)
-                    result = self._bot.commands[autostep.command](msg, None)
-                    log.debug("Step result %s: %s", flow.requestor, result)
-
-                except Exception as e:
-                    log.exception("%s errored at %s", flow, autostep)
-                    self._bot.send(
-                        flow.requestor, f'{flow} errored at {autostep} with "{e}"'
-                    )
-                flow.advance(
-                    autostep
-                )  # TODO: this is only true for a single step, make it forkable.
+            branches = list(
+                itertools.takewhile(lambda step: step != FLOW_END, autosteps)
+            )
+            if len(branches) == 1:
+                self._execute_step(flow, branches[0], flow.ctx)
+                self._advance(flow, branches[0])
+            elif branches:
+                self._execute_branches(flow, branches)
+                # the predicates have been checked before the fork, the flow continues from the last
+                # branch so the branches can join on a common child.
+                self._advance(flow, branches[-1], enforce_predicate=False)
+
+            if len(branches) < len(autosteps):
+                log.debug("This flow ENDED.")
+                self._remove_in_flight(flow)
+                return
         log.debug("Flow execution suspended/ended normally.")
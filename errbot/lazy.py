@@ -0,0 +1,131 @@
+import ast
+import logging
+from typing import List, Optional, Tuple, Type
+
+import errbot.core_plugins
+from errbot import botcmd, webhook
+from errbot.botplugin import BotPlugin
+from errbot.plugin_info import PluginInfo
+
+log = logging.getLogger(__name__)
+
+# the decorators of the commands that can be found without importing the plugin.
+COMMAND_DECORATORS = ("botcmd", "arg_botcmd")
+WEBHOOK_DECORATOR = "webhook"
+# the webhooks of a lazy plugin accept all of those until the plugin is woken up.
+WEBHOOK_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+
+
+class LazyPlugin(BotPlugin):
+    """
+    Stands for a plugin that is not imported yet: it only has the commands and webhooks of the plugin,
+    the plugin manager replaces it with the real plugin when one of them is used.
+    """
+
+    def activate(self) -> None:
+        # no storage nor scheduled jobs, those belong to the real plugin.
+        self._bot.inject_commands_from(self)
+        self.is_activated = True
+
+    def deactivate(self) -> None:
+        self._bot.remove_commands_from(self)
+        self.is_activated = False
+
+
+def _decorator_name(decorator: ast.expr) -> Optional[str]:
+    target = decorator.func if isinstance(decorator, ast.Call) else decorator
+    if isinstance(target, ast.Attribute):
+        return target.attr
+    if isinstance(target, ast.Name):
+        return target.id
+    return None
+
+
+def _constant(node: Optional[ast.expr], default: str) -> str:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return default
+
+
+def scan_plugin_module(plugin_info: PluginInfo) -> Tuple[List[str], List[str]]:
+    """
+    Finds the commands and webhooks of a plugin by parsing its module instead of importing it.
+
+    Only the commands and webhooks declared with the decorators of errbot can be found, the regex
+    commands can't be triggered before the plugin is woken up so they are ignored.
+
+    :param plugin_info: the plugin to scan.
+    :return: the names of the commands and the uri rules of the webhooks.
+    """
+    path = plugin_info.location.parent / (plugin_info.module + ".py")
+    tree = ast.parse(path.read_text(encoding="utf-8"), str(path))
+    commands, webhooks = [], []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for method in node.body:
+            if not isinstance(method, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            for decorator in method.decorator_list:
+                name = _decorator_name(decorator)
+                call = decorator if isinstance(decorator, ast.Call) else None
+                if name in COMMAND_DECORATORS:
+                    keywords = (
+                        {kw.arg: kw.value for kw in call.keywords} if call else {}
+                    )
+                    command = _constant(keywords.get("name"), method.name)
+                    if command not in commands:
+                        commands.append(command)
+                elif name == WEBHOOK_DECORATOR:
+                    uri_rule = f"/{method.name}"
+                    if call and call.args:
+                        uri_rule = _constant(call.args[0], uri_rule)
+                    if uri_rule != "/":
+                        uri_rule = uri_rule.rstrip("/")
+                    if uri_rule not in webhooks:
+                        webhooks.append(uri_rule)
+    return commands, webhooks
+
+
+def _command_stub(command: str):
+    def stub(self, msg, args):
+        # the bot wakes the plugin up before processing its commands, this is only a safety net.
+        self._bot.plugin_manager.wake_plugin(self.name)
+        return self._bot.commands[command](msg, args)
+
+    stub.__name__ = f"lazy_command_{command}"
+    stub.__doc__ = "This command loads its plugin on first use."
+    stub = botcmd(stub, name=command)
+    stub._err_command_lazy = True
+    return stub
+
+
+def _webhook_stub(uri_rule: str, endpoint: str):
+    def stub(self, request, **kwargs):
+        self._bot.plugin_manager.wake_plugin(self.name)
+        # the plugin routed its own view in place of this one.
+        view = errbot.core_plugins.flask_app.view_functions[request.url_rule.endpoint]
+        return view(**kwargs)
+
+    stub.__name__ = endpoint
+    return webhook(uri_rule, methods=WEBHOOK_METHODS, raw=True)(stub)
+
+
+def lazy_plugin_class(
+    plugin_info: PluginInfo, commands: List[str], webhooks: List[str]
+) -> Type[LazyPlugin]:
+    """
+    Makes the placeholder class of a lazy plugin.
+
+    :param plugin_info: the plugin the placeholder stands for.
+    :param commands: the names of the commands of the plugin.
+    :param webhooks: the uri rules of the webhooks of the plugin.
+    """
+    namespace = {"__doc__": plugin_info.doc, "__module__": __name__}
+    for command in commands:
+        stub = _command_stub(command)
+        namespace[stub.__name__] = stub
+    for index, uri_rule in enumerate(webhooks):
+        endpoint = f"lazy_{plugin_info.name}_webhook_{index}"
+        namespace[endpoint] = _webhook_stub(uri_rule, endpoint)
+    return type(plugin_info.name, (LazyPlugin,), namespace)
@@ -21,9 +21,12 @@ NO_COLORS = {
 
 
 def ispydevd():
-    for frame in inspect.stack():
-        if frame[1].endswith("pydevd.py"):
+    # walks the frames directly, inspect.stack() reads the source of every frame.
+    frame = inspect.currentframe()
+    while frame is not None:
+        if frame.f_code.co_filename.endswith("pydevd.py"):
             return True
+        frame = frame.f_back
     return False
 
 
@@ -6,7 +6,7 @@ from dataclasses import dataclass
 from importlib._bootstrap import module_from_spec
 from importlib._bootstrap_external import spec_from_file_location
 from pathlib import Path
-from typing import List, Tuple, Type
+from typing import List, Optional, Tuple, Type
 
 from errbot.utils import version2tuple
 
@@ -24,6 +24,10 @@ class PluginInfo:
     errbot_maxversion: VersionType
     dependencies: List[str]
     location: Path = None
+    lazy: bool = False
+    # the commands and webhooks declared in the [Lazy] section, None if the section doesn't declare them.
+    lazy_commands: Optional[Tuple[str, ...]] = None
+    lazy_webhooks: Optional[Tuple[str, ...]] = None
 
     @staticmethod
     def load(plugfile_path: Path) -> "PluginInfo":
@@ -86,8 +90,29 @@ class PluginInfo:
         depends_on = config.get("Core", "DependsOn", fallback=None)
         deps = [name.strip() for name in depends_on.split(",")] if depends_on else []
 
+        lazy = config.get("Core", "Lazy", fallback="false").lower() == "true"
+        lazy_commands = config.get("Lazy", "Commands", fallback=None)
+        lazy_webhooks = config.get("Lazy", "Webhooks", fallback=None)
+        if lazy_commands is not None or lazy_webhooks is not None:
+            lazy_commands = tuple(
+                cmd.strip() for cmd in (lazy_commands or "").split(",") if cmd.strip()
+            )
+            lazy_webhooks = tuple(
+                uri.strip() for uri in (lazy_webhooks or "").split(",") if uri.strip()
+            )
+
         return PluginInfo(
-            name, module, doc, core, python_version, min_version, max_version, deps
+            name,
+            module,
+            doc,
+            core,
+            python_version,
+            min_version,
+            max_version,
+            deps,
+            lazy=lazy,
+            lazy_commands=lazy_commands,
+            lazy_webhooks=lazy_webhooks,
         )
 
     def load_plugin_classes(self, base_module_name: str, baseclass: Type):
@@ -4,19 +4,24 @@ import logging
 import os
 import subprocess
 import sys
+import time
 import traceback
 from copy import deepcopy
+from functools import partial
 from graphlib import CycleError
 from graphlib import TopologicalSorter as BaseTopologicalSorter
+from multiprocessing.pool import ThreadPool
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type
+from threading import RLock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type
 
 from errbot.flow import BotFlow, Flow
 from errbot.repo_manager import check_dependencies
 from errbot.storage.base import StoragePluginBase
 
 from .botplugin import BotPlugin
-from .core_plugins.wsview import route
+from .discovery import DiscoveryCache
+from .lazy import LazyPlugin, lazy_plugin_class, scan_plugin_module
 from .plugin_info import PluginInfo
 from .storage import StoreMixin
 from .templating import add_plugin_templates_path, remove_plugin_templates_path
@@ -165,6 +170,7 @@ def check_errbot_version(plugin_info: PluginInfo):
 # Storage names
 CONFIGS = "configs"
 BL_PLUGINS = "bl_plugins"
+DISCOVERY = "discovery"
 
 
 class TopologicalSorter(BaseTopologicalSorter):
@@ -182,6 +188,11 @@ class BotPluginManager(StoreMixin):
         core_plugins: Tuple[str, ...],
         plugin_instance_callback: PluginInstanceCallback,
         plugins_callback_order: Tuple[Optional[str], ...],
+        precompile_templates: bool = False,
+        startup_pool_size: int = 1,
+        discovery_cache: bool = False,
+        lazy_plugins: Tuple[str, ...] = (),
+        lazy_idle_timeout: Optional[float] = None,
     ):
         """
         Creates a Plugin manager
@@ -191,6 +202,14 @@ class BotPluginManager(StoreMixin):
         :param core_plugins: the list of core plugin that will be started
         :param plugin_instance_callback: the callback to instantiate a plugin (to inject the dependency on the bot)
         :param plugins_callback_order: the order on which the plugins will be callbacked
+        :param precompile_templates: if True, the templates of the plugins are compiled at their activation
+        :param startup_pool_size: the number of plugins imported or activated at the same time at startup
+        :param discovery_cache: if True, what the discovery of the plugins found is persisted and reused
+                                as long as the plugin directories don't change
+        :param lazy_plugins: the names of the plugins to activate on first use, on top of the ones
+                             declared lazy in their .plug file
+        :param lazy_idle_timeout: in seconds, how long a lazy plugin can go unused before it is put back
+                                  to sleep, None to keep them activated once used
         """
         super().__init__()
         self.autoinstall_deps: bool = autoinstall_deps
@@ -199,6 +218,16 @@ class BotPluginManager(StoreMixin):
             plugin_instance_callback
         )
         self.core_plugins: Tuple[str, ...] = core_plugins
+        self.precompile_templates = precompile_templates
+        self.startup_pool_size = startup_pool_size
+        self.discovery_cache = discovery_cache
+        self._discovery: Optional[DiscoveryCache] = None
+        self.lazy_plugins = lazy_plugins
+        self.lazy_idle_timeout = lazy_idle_timeout
+        self._lazy_classes: Dict[str, Type[LazyPlugin]] = {}
+        self._last_used: Dict[str, float] = {}  # lazy plugin name -> last use
+        # serializes the activation of the dependencies and the registrations that are not thread safe.
+        self._activation_lock = RLock()
         # Make sure there is a 'None' entry in the callback order, to include
         # any plugin not explicitly ordered.
         self.plugins_callback_order = plugins_callback_order
@@ -209,6 +238,10 @@ class BotPluginManager(StoreMixin):
         self.flow_infos: Dict[str, PluginInfo] = {}
         self.flows: Dict[str, Flow] = {}
         self.plugin_places = []
+        # ordered active plugins, computed on demand and dropped on any (de)activation.
+        self._active_plugins: Optional[Tuple[BotPlugin, ...]] = None
+        self._subscribers: Dict[str, Tuple[BotPlugin, ...]] = {}
+        self._active_plugins_lock = RLock()
         self.open_storage(storage_plugin, "core")
         if CONFIGS not in self:
             self[CONFIGS] = {}
@@ -219,20 +252,41 @@ class BotPluginManager(StoreMixin):
     def reload_plugin_by_name(self, name: str) -> None:
         """
         Completely reload the given plugin, including reloading of the module's code
+
+        An activated plugin is reloaded in place: its storage stays open and its commands and command
+        filters are swapped at once with the new ones, so it stays available during the reload and the
+        other plugins are not touched.
+
         :throws PluginActivationException: needs to be taken care of by the callers.
         """
         plugin = self.plugins[name]
         plugin_info = self.plugin_infos[name]
 
-        if plugin.is_activated:
-            self.deactivate_plugin(name)
+        if isinstance(plugin, LazyPlugin):
+            # the module is not loaded yet, there is nothing to reload.
+            self.wake_plugin(name)
+            return
 
+        # the new code is loaded first, if it is broken the plugin is left as it was.
         base_name = ".".join(plugin.__module__.split(".")[:-1])
         classes = plugin_info.load_plugin_classes(base_name, BotPlugin)
         _, new_class = classes[0]
-        plugin.__class__ = new_class
 
-        self.activate_plugin(name)
+        if not plugin.is_activated:
+            plugin.__class__ = new_class
+            self.activate_plugin(name)
+            return
+
+        plugin._reloading = True
+        try:
+            self.deactivate_plugin(name)
+            plugin.__class__ = new_class
+            self.activate_plugin(name)
+        finally:
+            plugin._reloading = False
+            plugin._bot.swap_commands_from(plugin)
+            if not plugin.is_activated and plugin.is_open_storage():
+                plugin.close_storage()
 
     def _install_potential_package_dependencies(
         self, path: Path, feedback: Dict[Path, str]
@@ -264,21 +318,29 @@ class BotPluginManager(StoreMixin):
         else:
             return False
 
-    def _load_plugins_generic(
+    def _find_plugins_generic(
         self,
         path: Path,
         extension: str,
-        base_module_name,
-        baseclass: Type,
-        dest_dict: Dict[str, Any],
         dest_info_dict: Dict[str, Any],
         feedback: Dict[Path, str],
-    ):
+    ) -> List[PluginInfo]:
         self._install_potential_package_dependencies(path, feedback)
-        plugfiles = path.glob("**/*." + extension)
+        found = []
+        if self._discovery is None:
+            plugfiles = path.glob("**/*." + extension)
+        else:
+            plugfiles = (
+                Path(file)
+                for file in self._discovery.walk(str(path))
+                if file.endswith("." + extension)
+            )
         for plugfile in plugfiles:
             try:
-                plugin_info = PluginInfo.load(plugfile)
+                if self._discovery is None:
+                    plugin_info = PluginInfo.load(plugfile)
+                else:
+                    plugin_info = self._discovery.plugin_info(plugfile)
                 name = plugin_info.name
                 if name in dest_info_dict:
                     log.warning("Plugin %s already loaded.", name)
@@ -294,48 +356,215 @@ class BotPluginManager(StoreMixin):
                         name,
                     )
                     continue
+                found.append(plugin_info)
+            except Exception:
+                feedback[path] = traceback.format_exc()
+        return found
 
-                plugin_classes = plugin_info.load_plugin_classes(
-                    base_module_name, baseclass
+    def _startup_map(self, function: Callable, items: List) -> Iterable:
+        """Maps function on items, concurrently if startup_pool_size allows it."""
+        if self.startup_pool_size <= 1 or len(items) <= 1:
+            return map(function, items)
+        pool = ThreadPool(min(self.startup_pool_size, len(items)))
+        try:
+            return pool.map(function, items)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _load_plugins(self) -> Dict[Path, str]:
+        feedback = {}
+        to_load = []  # (path, plugin_info, base module name, base class, dest_dict)
+        for path in self.plugin_places:
+            for plugin_info in self._find_plugins_generic(
+                path, "plug", self.plugin_infos, feedback
+            ):
+                to_load.append(
+                    (path, plugin_info, "errbot.plugins", BotPlugin, self.plugins)
                 )
-                if not plugin_classes:
-                    feedback[path] = f"Did not find any plugin in {path}."
-                    continue
-                if len(plugin_classes) > 1:
-                    # TODO: This is something we can support as "subplugins" or something similar.
-                    feedback[path] = (
-                        "Contains more than one plugin, only one will be loaded."
-                    )
+            for plugin_info in self._find_plugins_generic(
+                path, "flow", self.flow_infos, feedback
+            ):
+                to_load.append((path, plugin_info, "errbot.flows", BotFlow, self.flows))
+
+        # the lazy plugins are only represented by a placeholder until their first use.
+        depended_on = {
+            dep for info in self.plugin_infos.values() for dep in info.dependencies
+        }
+        eager = []
+        for path, plugin_info, base_module_name, baseclass, dest_dict in to_load:
+            lazy_class = None
+            if dest_dict is self.plugins:
+                lazy_class = self._lazy_plugin_class(plugin_info, depended_on)
+            if lazy_class is None:
+                eager.append(
+                    (path, plugin_info, base_module_name, baseclass, dest_dict)
+                )
+                continue
+            try:
+                dest_dict[plugin_info.name] = self._plugin_instance_callback(
+                    plugin_info.name, lazy_class
+                )
+                self._lazy_classes[plugin_info.name] = lazy_class
+            except Exception:
+                feedback[path] = traceback.format_exc()
+        to_load = eager
 
-                # instantiate the plugin object.
-                _, clazz = plugin_classes[0]
-                dest_dict[name] = self._plugin_instance_callback(name, clazz)
+        def load_classes(entry):
+            _, plugin_info, base_module_name, baseclass, _ = entry
+            try:
+                classes = plugin_info.load_plugin_classes(base_module_name, baseclass)
+            except Exception:
+                return None, traceback.format_exc()
+            return classes, None
+
+        # the modules are imported concurrently, the plugins are instantiated in order.
+        loaded = self._startup_map(load_classes, to_load)
+        for (path, plugin_info, _, _, dest_dict), (plugin_classes, error) in zip(
+            to_load, loaded
+        ):
+            if error:
+                feedback[path] = error
+                continue
+            if not plugin_classes:
+                feedback[path] = f"Did not find any plugin in {path}."
+                continue
+            if len(plugin_classes) > 1:
+                # TODO: This is something we can support as "subplugins" or something similar.
+                feedback[path] = (
+                    "Contains more than one plugin, only one will be loaded."
+                )
 
+            # instantiate the plugin object.
+            _, clazz = plugin_classes[0]
+            try:
+                dest_dict[plugin_info.name] = self._plugin_instance_callback(
+                    plugin_info.name, clazz
+                )
             except Exception:
                 feedback[path] = traceback.format_exc()
+        return feedback
 
-    def _load_plugins(self) -> Dict[Path, str]:
-        feedback = {}
-        for path in self.plugin_places:
-            self._load_plugins_generic(
-                path,
-                "plug",
-                "errbot.plugins",
-                BotPlugin,
-                self.plugins,
-                self.plugin_infos,
-                feedback,
+    def _lazy_plugin_class(
+        self, plugin_info: PluginInfo, depended_on: Set[str]
+    ) -> Optional[Type[LazyPlugin]]:
+        """
+        Makes the placeholder class of a plugin if it has to be activated on first use.
+
+        :param depended_on: the names of the plugins other plugins depend on.
+        :return: the placeholder class or None if the plugin has to be loaded right away.
+        """
+        name = plugin_info.name
+        if not (plugin_info.lazy or name in self.lazy_plugins):
+            return None
+        if plugin_info.core or name in depended_on:
+            log.info(
+                "%s is a core plugin or a dependency, it can't be activated lazily.",
+                name,
             )
-            self._load_plugins_generic(
-                path,
-                "flow",
-                "errbot.flows",
-                BotFlow,
-                self.flows,
-                self.flow_infos,
-                feedback,
+            return None
+        commands, webhooks = plugin_info.lazy_commands, plugin_info.lazy_webhooks
+        if commands is None:
+            try:
+                commands, webhooks = scan_plugin_module(plugin_info)
+            except Exception:
+                log.exception("Could not find the commands of %s statically.", name)
+                return None
+        if not commands and not webhooks:
+            log.warning(
+                "%s has no command nor webhook to wake it up, it is activated at startup.",
+                name,
             )
-        return feedback
+            return None
+        log.debug("%s will be activated on first use of %s.", name, commands + webhooks)
+        return lazy_plugin_class(plugin_info, commands, webhooks)
+
+    def wake_plugin(self, name: str) -> BotPlugin:
+        """
+        Replaces the placeholder of a lazy plugin with the plugin itself and activates it.
+
+        :param name: the name of the plugin.
+        :return: the plugin.
+        :throws PluginActivationException: if the plugin can't be loaded or activated.
+        """
+        with self._activation_lock:
+            plugin = self.plugins[name]
+            if isinstance(plugin, LazyPlugin):
+                log.info("Waking up the lazy plugin %s.", name)
+                plugin_info = self.plugin_infos[name]
+                try:
+                    classes = plugin_info.load_plugin_classes(
+                        "errbot.plugins", BotPlugin
+                    )
+                except Exception as e:
+                    log.exception("Error loading %s.", name)
+                    raise PluginActivationException(f"{name} failed to load: {e}.")
+                if not classes:
+                    raise PluginActivationException(
+                        f"Did not find any plugin in {plugin_info.location.parent}."
+                    )
+                if plugin.is_activated:
+                    self.deactivate_plugin(name)
+                _, clazz = classes[0]
+                plugin = self._plugin_instance_callback(name, clazz)
+                self.plugins[name] = plugin
+                self._invalidate_active_plugins()
+                self.activate_plugin(name)
+                if self.lazy_idle_timeout:
+                    plugin.scheduler.schedule(
+                        self.lazy_idle_timeout, self._evict_if_idle, args=(name,)
+                    )
+            self._last_used[name] = time.monotonic()
+        return plugin
+
+    def touch_plugin(self, name: str) -> None:
+        """Records a use of a plugin, it only matters for the lazy plugins."""
+        if name in self._last_used:
+            self._last_used[name] = time.monotonic()
+
+    def _evict_if_idle(self, name: str) -> None:
+        plugin = self.plugins.get(name)
+        if (
+            plugin is None
+            or isinstance(plugin, LazyPlugin)
+            or name not in self._lazy_classes
+        ):
+            return
+        idle = time.monotonic() - self._last_used.get(name, 0)
+        if idle < self.lazy_idle_timeout:
+            # check again when it would have been idle long enough.
+            plugin.scheduler.schedule(
+                self.lazy_idle_timeout - idle, self._evict_if_idle, args=(name,)
+            )
+            return
+        try:
+            self.sleep_plugin(name)
+        except Exception:
+            log.exception("Error putting %s back to sleep.", name)
+
+    def sleep_plugin(self, name: str) -> None:
+        """
+        Deactivates a lazy plugin and puts its placeholder back so it is activated again on next use.
+
+        :param name: the name of the plugin.
+        """
+        with self._activation_lock:
+            plugin = self.plugins[name]
+            if isinstance(plugin, LazyPlugin) or name not in self._lazy_classes:
+                return
+            log.info("Putting the lazy plugin %s back to sleep.", name)
+            was_activated = plugin.is_activated
+            if was_activated:
+                self.deactivate_plugin(name)
+            self.plugins[name] = self._plugin_instance_callback(
+                name, self._lazy_classes[name]
+            )
+            self._invalidate_active_plugins()
+            self._last_used.pop(name, None)
+            # the module is imported again on the next use.
+            sys.modules.pop("errbot.plugins." + self.plugin_infos[name].module, None)
+            if was_activated:
+                self.activate_plugin(name)
 
     def update_plugin_places(self, path_list: str) -> Dict[Path, str]:
         """
@@ -343,10 +572,12 @@ class BotPluginManager(StoreMixin):
         :param path_list: the path list where to search for plugins.
         :return: the feedback for any specific path in case of error.
         """
-        ep = entry_point_plugins(group="errbot.plugins")
+        if self.discovery_cache:
+            self._discovery = DiscoveryCache(self.get(DISCOVERY, None))
+        ep = entry_point_plugins(group="errbot.plugins", discovery=self._discovery)
         repo_roots = (CORE_PLUGINS, self._extra_plugin_dir, path_list, ep)
 
-        all_roots = collect_roots(repo_roots)
+        all_roots = collect_roots(repo_roots, discovery=self._discovery)
 
         log.debug("New entries added to sys.path:")
         for entry in all_roots:
@@ -356,25 +587,71 @@ class BotPluginManager(StoreMixin):
         # so plugins can relatively import their repos
         _ensure_sys_path_contains(repo_roots)
         self.plugin_places = [Path(root) for root in all_roots]
-        return self._load_plugins()
-
-    def get_all_active_plugins(self) -> List[BotPlugin]:
-        """This returns the list of plugins in the callback ordered defined from the config."""
-
-        all_plugins = []
-        for name in self.plugins_callback_order:
-            # None is a placeholder for any plugin not having a defined order
-            if name is None:
-                all_plugins += [
-                    plugin
-                    for name, plugin in self.plugins.items()
-                    if name not in self.plugins_callback_order and plugin.is_activated
-                ]
-            else:
-                plugin = self.plugins[name]
-                if plugin.is_activated:
-                    all_plugins.append(plugin)
-        return all_plugins
+        try:
+            return self._load_plugins()
+        finally:
+            discovery, self._discovery = self._discovery, None
+            if discovery and (discovery.changed or discovery.dropped_entries()):
+                log.debug("Saving the plugins discovery manifest.")
+                self[DISCOVERY] = discovery.manifest
+
+    def get_all_active_plugins(self) -> Tuple[BotPlugin, ...]:
+        """This returns the plugins in the callback ordered defined from the config.
+
+        It is called for every event so the result is cached until a plugin is activated,
+        deactivated, reloaded or removed.
+        """
+        active_plugins = self._active_plugins
+        if active_plugins is not None:
+            return active_plugins
+
+        with self._active_plugins_lock:
+            if self._active_plugins is not None:
+                return self._active_plugins
+            all_plugins = []
+            for name in self.plugins_callback_order:
+                # None is a placeholder for any plugin not having a defined order
+                if name is None:
+                    all_plugins += [
+                        plugin
+                        for name, plugin in self.plugins.items()
+                        if name not in self.plugins_callback_order
+                        and plugin.is_activated
+                    ]
+                else:
+                    plugin = self.plugins[name]
+                    if plugin.is_activated:
+                        all_plugins.append(plugin)
+            self._active_plugins = tuple(all_plugins)
+            return self._active_plugins
+
+    def get_active_plugins_subscribed_to(self, callback: str) -> Tuple[BotPlugin, ...]:
+        """This returns the active plugins overriding the given callback, in callback order.
+
+        Plugins inheriting the no-op callback from BotPlugin are skipped so the events nobody
+        listens to are not dispatched at all. The result is cached like get_all_active_plugins.
+
+        :param callback: the name of the callback, for example "callback_presence".
+        """
+        subscribers = self._subscribers.get(callback)
+        if subscribers is not None:
+            return subscribers
+
+        with self._active_plugins_lock:
+            default = getattr(BotPlugin, callback, None)
+            subscribers = tuple(
+                plugin
+                for plugin in self.get_all_active_plugins()
+                if hasattr(plugin, callback)
+                and getattr(getattr(plugin, callback), "__func__", None) is not default
+            )
+            self._subscribers[callback] = subscribers
+            return subscribers
+
+    def _invalidate_active_plugins(self) -> None:
+        with self._active_plugins_lock:
+            self._active_plugins = None
+            self._subscribers = {}
 
     def get_all_active_plugin_names(self) -> List[str]:
         return [name for name, plugin in self.plugins.items() if plugin.is_activated]
@@ -442,31 +719,17 @@ class BotPluginManager(StoreMixin):
         """
         log.info("Activate bot plugins...")
         errors = ""
-        for name in self.get_plugins_activation_order():
-            # We need both the plugin and the corresponding PluginInfo to check if we need to skip an excluded core plugin
-            plugin_info = self.plugin_infos.get(name)
-            plugin = self.plugins.get(name)
-
-            try:
-                if self.is_plugin_blacklisted(name):
-                    errors += (
-                        f"Notice: {plugin.name} is blacklisted, "
-                        f'use "{self.plugins["Help"]._bot.prefix}plugin unblacklist {name}" to unblacklist it.\n'
-                    )
-                    continue
-                elif self._is_excluded_core_plugin(plugin_info):
-                    log.debug(
-                        "%s plugin will not be activated because it's excluded from CORE_PLUGINS",
-                        name,
-                    )
-                    continue
-
-                if not plugin.is_activated:
-                    log.info("Activate plugin: %s.", name)
-                    self.activate_plugin(name)
-            except Exception as e:
-                log.exception("Error loading %s.", name)
-                errors += f"Error: {name} failed to activate: {e}.\n"
+        plugins_graph, plugins_in_cycle = self._plugins_activation_graph()
+        plugins_sorter = TopologicalSorter(plugins_graph)
+        plugins_sorter.prepare()
+        # the plugins of a level only depend on the ones of the previous levels.
+        while plugins_sorter.is_active():
+            names = plugins_sorter.get_ready()
+            for name, error in zip(names, self._startup_map(self._start_plugin, names)):
+                errors += error
+                plugins_sorter.done(name)
+        for name in plugins_in_cycle:
+            errors += self._start_plugin(name)
 
         log.debug("Activate flow plugins ...")
         for name, flow in self.flows.items():
@@ -479,11 +742,42 @@ class BotPluginManager(StoreMixin):
                 errors += f"Error: flow {name} failed to start: {e}.\n"
         return errors
 
-    def get_plugins_activation_order(self) -> List[str]:
+    def _start_plugin(self, name: str) -> str:
         """
-        Calculate plugin activation order, based on their dependencies.
+        Activates a plugin at startup.
 
-        :return: list of plugin names, in the best order to start them.
+        :return: Empty string if no problem occurred or a string explaining what went wrong.
+        """
+        # We need both the plugin and the corresponding PluginInfo to check if we need to skip an excluded core plugin
+        plugin_info = self.plugin_infos.get(name)
+        plugin = self.plugins.get(name)
+
+        try:
+            if self.is_plugin_blacklisted(name):
+                return (
+                    f"Notice: {plugin.name} is blacklisted, "
+                    f'use "{self.plugins["Help"]._bot.prefix}plugin unblacklist {name}" to unblacklist it.\n'
+                )
+            elif self._is_excluded_core_plugin(plugin_info):
+                log.debug(
+                    "%s plugin will not be activated because it's excluded from CORE_PLUGINS",
+                    name,
+                )
+                return ""
+
+            if not plugin.is_activated:
+                log.info("Activate plugin: %s.", name)
+                self.activate_plugin(name)
+        except Exception as e:
+            log.exception("Error loading %s.", name)
+            return f"Error: {name} failed to activate: {e}.\n"
+        return ""
+
+    def _plugins_activation_graph(self) -> Tuple[Dict[str, Set[str]], Set[str]]:
+        """
+        Builds the dependency graph of the plugins.
+
+        :return: the graph without the plugins in circular dependencies, and those plugins.
         """
         plugins_graph = {
             name: set(info.dependencies) for name, info in self.plugin_infos.items()
@@ -492,9 +786,8 @@ class BotPluginManager(StoreMixin):
         while True:
             plugins_sorter = TopologicalSorter(plugins_graph)
             try:
-                # Return plugins which are part of a circular dependency at the end,
-                # the rest of the code expects to have all plugins returned
-                return list(plugins_sorter.static_order()) + list(plugins_in_cycle)
+                plugins_sorter.prepare()
+                return plugins_graph, plugins_in_cycle
             except CycleError:
                 # Remove cycle from the graph, and
                 cycle = set(plugins_sorter.find_cycle())
@@ -502,6 +795,19 @@ class BotPluginManager(StoreMixin):
                 for plugin_name in cycle:
                     plugins_graph.pop(plugin_name)
 
+    def get_plugins_activation_order(self) -> List[str]:
+        """
+        Calculate plugin activation order, based on their dependencies.
+
+        :return: list of plugin names, in the best order to start them.
+        """
+        plugins_graph, plugins_in_cycle = self._plugins_activation_graph()
+        # Return plugins which are part of a circular dependency at the end,
+        # the rest of the code expects to have all plugins returned
+        return list(TopologicalSorter(plugins_graph).static_order()) + list(
+            plugins_in_cycle
+        )
+
     def _activate_plugin(self, plugin: BotPlugin, plugin_info: PluginInfo) -> None:
         """
         Activate a specific plugin with no check.
@@ -525,10 +831,21 @@ class BotPluginManager(StoreMixin):
             raise PluginConfigurationException(str(ex))
 
         try:
-            add_plugin_templates_path(plugin_info)
+            with self._activation_lock:
+                add_plugin_templates_path(plugin_info, self.precompile_templates)
             populate_doc(plugin, plugin_info)
             plugin.activate()
-            route(plugin)
+            if not isinstance(plugin, LazyPlugin):
+                # only once the plugin is set up, the jobs that are due run right away.
+                plugin._restore_scheduled_jobs()
+            self._invalidate_active_plugins()
+            on_request = None
+            if name in self._lazy_classes:
+                on_request = partial(self.touch_plugin, name)
+            from .core_plugins.wsview import route
+
+            with self._activation_lock:
+                route(plugin, on_request)
             plugin.callback_connect()
         except Exception:
             log.error("Plugin %s failed at activation stage, deactivating it...", name)
@@ -572,7 +889,8 @@ class BotPluginManager(StoreMixin):
             check_errbot_version(plugin_info)
 
             dep_track = set()
-            depends_on = self._activate_plugin_dependencies(name, dep_track)
+            with self._activation_lock:
+                depends_on = self._activate_plugin_dependencies(name, dep_track)
             plugin.dependencies = depends_on
             self._activate_plugin(plugin, plugin_info)
 
@@ -618,8 +936,12 @@ class BotPluginManager(StoreMixin):
             log.warning("Plugin already deactivated, ignore.")
             return
         plugin_info = self.plugin_infos[name]
-        plugin.deactivate()
-        remove_plugin_templates_path(plugin_info)
+        try:
+            plugin.deactivate()
+        finally:
+            self._invalidate_active_plugins()
+        with self._activation_lock:
+            remove_plugin_templates_path(plugin_info)
 
     def remove_plugin(self, plugin: BotPlugin) -> None:
         """
@@ -633,6 +955,9 @@ class BotPluginManager(StoreMixin):
 
         del self.plugins[plugin.name]
         del self.plugin_infos[plugin.name]
+        self._lazy_classes.pop(plugin.name, None)
+        self._last_used.pop(plugin.name, None)
+        self._invalidate_active_plugins()
 
     def remove_plugins_from_path(self, root: str) -> None:
         """
@@ -1,9 +1,6 @@
 # vim: noai:ts=4:sw=4
 import re
 
-from markdown import Markdown
-from markdown.extensions.extra import ExtraExtension
-
 # Attribute regexp looks for extendend syntax: {: ... }
 ATTR_RE = re.compile(r"{:([^}]*)}")
 MD_ESCAPE_RE = re.compile(
@@ -42,6 +39,9 @@ def ansi():
 
     ansi_txt = md_converter.convert(md_txt)
     """
+    from markdown import Markdown
+    from markdown.extensions.extra import ExtraExtension
+
     from .ansiext import AnsiExtension
 
     md = Markdown(output_format="ansi", extensions=[ExtraExtension(), AnsiExtension()])
@@ -57,6 +57,9 @@ def text():
 
     pure_text = md_converter.convert(md_txt)
     """
+    from markdown import Markdown
+    from markdown.extensions.extra import ExtraExtension
+
     from .ansiext import AnsiExtension
 
     md = Markdown(output_format="text", extensions=[ExtraExtension(), AnsiExtension()])
@@ -74,6 +77,9 @@ def imtext():
 
     im_text = md_converter.convert(md_txt)
     """
+    from markdown import Markdown
+    from markdown.extensions.extra import ExtraExtension
+
     from .ansiext import AnsiExtension
 
     md = Markdown(
@@ -107,6 +113,9 @@ def xhtml():
 
     html = md_converter.convert(md_txt)
     """
+    from markdown import Markdown
+    from markdown.extensions.extra import ExtraExtension
+
     return Markdown(output_format="xhtml", extensions=[ExtraExtension()])
 
 
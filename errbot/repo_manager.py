@@ -4,11 +4,13 @@ import os
 import re
 import shutil
 import tarfile
+from bisect import bisect_left
 from collections import namedtuple
 from datetime import datetime, timedelta
 from importlib.metadata import distribution
 from os import path
 from pathlib import Path
+from threading import Lock, RLock, Thread
 from typing import Dict, Generator, List, Optional, Sequence, Tuple
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlparse
@@ -33,8 +35,13 @@ def human_name_for_git_url(url: str) -> str:
 INSTALLED_REPOS = "installed_repos"
 
 REPO_INDEXES_CHECK_INTERVAL = timedelta(hours=1)
+REPO_INDEXES_RETRY_DELAY = timedelta(minutes=1)  # doubled after each failed update.
+REPO_INDEXES_FETCH_TIMEOUT = 10  # seconds
+REPO_INDEXES_FETCH_THREADS = 8
 
 REPO_INDEX = "repo_index"
+REPO_SEARCH_INDEX = "repo_search_index"
+REPO_SOURCES = "repo_sources"
 LAST_UPDATE = "last_update"
 
 RepoEntry = namedtuple(
@@ -67,6 +74,29 @@ def tokenizeJsonEntry(json_dict: dict) -> set:
     return set(FIND_WORDS_RE.findall(search.lower()))
 
 
+def build_search_index(index: dict) -> dict:
+    """
+    Makes the inverted index of a repo index: every word of the plugin entries
+    points to the positions of the entries containing it.
+    """
+    entries = []
+    postings = {}
+    for repo_name, plugins in index.items():
+        if repo_name == LAST_UPDATE:
+            continue
+        for plugin_name, plugin in plugins.items():
+            for word in tokenizeJsonEntry(plugin):
+                postings.setdefault(word, []).append(len(entries))
+            # only the fields of the results, the whole entries are in the repo index.
+            entries.append(tuple(makeEntry(repo_name, plugin_name, plugin)))
+    return {
+        LAST_UPDATE: index[LAST_UPDATE],
+        "entries": entries,
+        "words": sorted(postings),  # sorted for the prefix lookups.
+        "postings": postings,
+    }
+
+
 def which(program: str) -> Optional[str]:
     if ON_WINDOWS:
         program += ".exe"
@@ -139,51 +169,204 @@ class BotRepoManager(StoreMixin):
         self.plugin_indexes = plugin_indexes
         self.storage_plugin = storage_plugin
         self.plugin_dir = plugin_dir
+        self._search_index = None  # in memory copy of the stored one.
+        self._update_lock = Lock()
+        # the index can be updated in the background, the storage is only accessed with this lock.
+        self._storage_lock = RLock()
+        self._background_update = None
+        self._retry_delay = REPO_INDEXES_RETRY_DELAY
+        self._next_attempt = None  # no update attempt before that after a failed one.
         self.open_storage(storage_plugin, "repomgr")
 
     def shutdown(self) -> None:
+        if self._background_update is not None:
+            self._background_update.join()
         self.close_storage()
 
     def check_for_index_update(self) -> None:
-        if REPO_INDEX not in self:
+        """
+        Creates the repo index if there is none yet, or updates it in the background if
+        it is too old so the callers can go on with the current one.
+
+        After a failed update, the next ones are only attempted after a delay growing up
+        to REPO_INDEXES_CHECK_INTERVAL.
+        """
+        if self._next_attempt is not None and datetime.now() < self._next_attempt:
+            return
+        search_index = self.get_search_index()
+        if search_index is None:
             log.info("No repo index, creating it.")
             self.index_update()
             return
 
         if (
-            datetime.fromtimestamp(self[REPO_INDEX][LAST_UPDATE])
+            datetime.fromtimestamp(search_index[LAST_UPDATE])
             < datetime.now() - REPO_INDEXES_CHECK_INTERVAL
         ):
-            log.info("Index is too old, update it.")
-            self.index_update()
+            if (
+                self._background_update is None
+                or not self._background_update.is_alive()
+            ):
+                log.info("Index is too old, update it.")
+                self._background_update = Thread(
+                    target=self.index_update, name="Repo index update", daemon=True
+                )
+                self._background_update.start()
+
+    def _fetch_source(self, source: str, cached: Optional[dict]) -> Optional[dict]:
+        """
+        Fetches a repo index source, revalidating the copy fetched previously if any.
+
+        :param source: the URL or path of the source.
+        :param cached: what the previous fetch of the source returned.
+        :return: the content of the source and its validators, cached itself if the
+            source didn't change or None if it couldn't be fetched.
+        """
+        try:
+            if urlparse(source).scheme in ("http", "https"):
+                headers = {"User-Agent": "Errbot"}
+                if cached and cached.get("etag"):
+                    headers["If-None-Match"] = cached["etag"]
+                if cached and cached.get("last_modified"):
+                    headers["If-Modified-Since"] = cached["last_modified"]
+                req = Request(source, headers=headers)
+                with urlopen(url=req, timeout=REPO_INDEXES_FETCH_TIMEOUT) as request:  # nosec
+                    log.debug("Update from remote source %s...", source)
+                    encoding = request.headers.get_content_charset()
+                    content = request.read().decode(encoding if encoding else "utf-8")
+                    validators = {
+                        "etag": request.headers.get("ETag"),
+                        "last_modified": request.headers.get("Last-Modified"),
+                    }
+            else:
+                stat = os.stat(source)
+                validators = {"signature": (stat.st_mtime_ns, stat.st_size)}
+                if cached and cached.get("signature") == validators["signature"]:
+                    return cached
+                with open(source, encoding="utf-8", mode="r") as src_file:
+                    log.debug("Update from local source %s...", source)
+                    content = src_file.read()
+            return {**validators, "index": json.loads(content)}
+        except HTTPError as error:
+            if error.code == 304 and cached:
+                log.debug("Remote source %s has not changed.", source)
+                return cached
+            log.exception("Could not update from source %s.", source)
+            return None
+        except (URLError, IOError, ValueError):
+            log.exception("Could not update from source %s.", source)
+            return None
 
     def index_update(self) -> None:
-        index = {LAST_UPDATE: datetime.now().timestamp()}
-        for source in reversed(self.plugin_indexes):
-            try:
-                if urlparse(source).scheme in ("http", "https"):
-                    req = Request(source, headers={"User-Agent": "Errbot"})
-                    with urlopen(url=req, timeout=10) as request:  # nosec
-                        log.debug("Update from remote source %s...", source)
-                        encoding = request.headers.get_content_charset()
-                        content = request.read().decode(
-                            encoding if encoding else "utf-8"
-                        )
-                else:
-                    with open(source, encoding="utf-8", mode="r") as src_file:
-                        log.debug("Update from local source %s...", source)
-                        content = src_file.read()
-                index.update(json.loads(content))
-            except (HTTPError, URLError, IOError):
-                log.exception(
-                    "Could not update from source %s, keep the index as it is.", source
+        """
+        Fetches all the repo index sources concurrently and stores their merge, the first
+        sources taking precedence.
+
+        A source that can't be fetched is replaced by its last fetched copy, if there is
+        none the index is kept as it is.
+        """
+        with self._update_lock:
+            cache = self._cached_sources()
+            fetches = [(source, cache.get(source)) for source in self.plugin_indexes]
+            if len(fetches) > 1:
+                from multiprocessing.pool import ThreadPool
+
+                with ThreadPool(min(len(fetches), REPO_INDEXES_FETCH_THREADS)) as pool:
+                    results = pool.starmap(self._fetch_source, fetches)
+            else:
+                results = [self._fetch_source(*fetch) for fetch in fetches]
+
+            index = {LAST_UPDATE: datetime.now().timestamp()}
+            sources = {}
+            complete = True
+            for (source, cached), result in reversed(list(zip(fetches, results))):
+                if result is None and cached is not None:
+                    log.warning("Use the last copy of the source %s.", source)
+                    result = cached
+                if result is None:
+                    complete = False
+                    continue
+                sources[source] = result
+                index.update(result["index"])
+            search_index = build_search_index(index) if complete else None
+            with self._storage_lock:
+                # the sources fetched successfully are kept for the next update even if another one failed.
+                self[REPO_SOURCES] = {
+                    source: self._source_to_store(
+                        result, index if search_index is not None else None
+                    )
+                    for source, result in sources.items()
+                }
+                if search_index is not None:
+                    self[REPO_INDEX] = index
+                    self._search_index = self[REPO_SEARCH_INDEX] = search_index
+            if not complete:
+                self._next_attempt = datetime.now() + self._retry_delay
+                self._retry_delay = min(
+                    self._retry_delay * 2, REPO_INDEXES_CHECK_INTERVAL
                 )
-                break
-        else:
-            # nothing failed so ok, we can store the index.
-            self[REPO_INDEX] = index
+                log.error(
+                    "Some sources could not be fetched, keep the index as it is until %s.",
+                    self._next_attempt,
+                )
+                return
+            self._next_attempt = None
+            self._retry_delay = REPO_INDEXES_RETRY_DELAY
             log.debug("Stored %d repo entries.", len(index) - 1)
 
+    def _cached_sources(self) -> Dict[str, dict]:
+        """
+        Gets what the previous fetches of the sources returned, the content of the sources
+        stored without it is taken back from the repo index.
+        """
+        with self._storage_lock:
+            stored = self.get(REPO_SOURCES, {})
+            index = self.get(REPO_INDEX, {})
+        cache = {}
+        for source, cached in stored.items():
+            if "repos" in cached:
+                repos = cached["repos"]
+                if any(repo not in index for repo in repos):
+                    continue  # fetched again from scratch.
+                cached = {key: value for key, value in cached.items() if key != "repos"}
+                cached["index"] = {repo: index[repo] for repo in repos}
+            cache[source] = cached
+        return cache
+
+    @staticmethod
+    def _source_to_store(fetched: dict, index: Optional[dict]) -> dict:
+        """
+        Makes what is stored of a fetched source: when all its repos are in the stored repo
+        index as they are, only their names are kept with the validators of the source.
+
+        :param fetched: what the fetch of the source returned.
+        :param index: the repo index stored along, None if it is kept as it was.
+        """
+        if index is None or any(
+            index.get(repo) is not plugins for repo, plugins in fetched["index"].items()
+        ):
+            return fetched
+        return {
+            **{key: value for key, value in fetched.items() if key != "index"},
+            "repos": list(fetched["index"]),
+        }
+
+    def get_search_index(self) -> Optional[dict]:
+        """
+        Gets the inverted index of the repo index, it is built from the repo index
+        if it has been stored by a version of errbot that didn't have it.
+
+        :return: the search index or None if there is no repo index yet.
+        """
+        with self._storage_lock:
+            if self._search_index is None:
+                if REPO_SEARCH_INDEX in self:
+                    self._search_index = self[REPO_SEARCH_INDEX]
+                elif REPO_INDEX in self:
+                    self._search_index = build_search_index(self[REPO_INDEX])
+                    self[REPO_SEARCH_INDEX] = self._search_index
+            return self._search_index
+
     def get_repo_from_index(self, repo_name: str) -> List[RepoEntry]:
         """
         Retrieve the list of plugins for the repo_name from the index.
@@ -191,7 +374,8 @@ class BotRepoManager(StoreMixin):
         :param repo_name: the name of the repo
         :return: a list of RepoEntry
         """
-        plugins = self[REPO_INDEX].get(repo_name, None)
+        with self._storage_lock:
+            plugins = self.get(REPO_INDEX, {}).get(repo_name, None)
         if plugins is None:
             return None
         result = []
@@ -201,39 +385,54 @@ class BotRepoManager(StoreMixin):
 
     def search_repos(self, query: str) -> Generator[RepoEntry, None, None]:
         """
-        A simple search feature, keywords are AND and case insensitive on all the fields.
+        A simple search feature, keywords are OR, case insensitive and match the
+        beginning of the words of all the fields.
+
+        The entries matching the most keywords come first, a keyword matching a whole
+        word counts more than one matching only its beginning.
 
         :param query: a string query
         :return: an iterator of RepoEntry
         """
         # first see if we are up to date.
         self.check_for_index_update()
-        if REPO_INDEX not in self:
+        search_index = self.get_search_index()
+        if search_index is None:
             log.error("No index.")
             return
-        query_work_set = set(FIND_WORDS_RE.findall(query.lower()))
-        for repo_name, plugins in self[REPO_INDEX].items():
-            if repo_name == LAST_UPDATE:
-                continue
-            for plugin_name, plugin in plugins.items():
-                if query_work_set.intersection(tokenizeJsonEntry(plugin)):
-                    yield makeEntry(repo_name, plugin_name, plugin)
+        words, postings = search_index["words"], search_index["postings"]
+        scores = {}
+        for query_word in set(FIND_WORDS_RE.findall(query.lower())):
+            # the words starting with query_word sort between it and its successor.
+            successor = query_word[:-1] + chr(ord(query_word[-1]) + 1)
+            start, end = bisect_left(words, query_word), bisect_left(words, successor)
+            weights = {}
+            for word in words[start:end]:
+                weight = 2 if word == query_word else 1
+                for position in postings[word]:
+                    weights[position] = max(weights.get(position, 0), weight)
+            for position, weight in weights.items():
+                scores[position] = scores.get(position, 0) + weight
+        for position in sorted(scores, key=lambda position: -scores[position]):
+            yield RepoEntry(*search_index["entries"][position])
 
     def get_installed_plugin_repos(self) -> Dict[str, str]:
-        return self.get(INSTALLED_REPOS, {})
+        with self._storage_lock:
+            return self.get(INSTALLED_REPOS, {})
 
     def add_plugin_repo(self, name: str, url: str) -> None:
-        with self.mutable(INSTALLED_REPOS, {}) as repos:
+        with self._storage_lock, self.mutable(INSTALLED_REPOS, {}) as repos:
             repos[name] = url
 
     def set_plugin_repos(self, repos: Dict[str, str]) -> None:
         """Used externally."""
-        self[INSTALLED_REPOS] = repos
+        with self._storage_lock:
+            self[INSTALLED_REPOS] = repos
 
     def get_all_repos_paths(self) -> List[str]:
         return [
             os.path.join(self.plugin_dir, d)
-            for d in self.get(INSTALLED_REPOS, {}).keys()
+            for d in self.get_installed_plugin_repos().keys()
         ]
 
     def install_repo(self, repo: str) -> str:
@@ -251,9 +450,11 @@ class BotRepoManager(StoreMixin):
 
         human_name = None
         # try to find if we have something with that name in our index
-        if repo in self[REPO_INDEX]:
+        with self._storage_lock:
+            plugins = self.get(REPO_INDEX, {}).get(repo)
+        if plugins is not None:
             human_name = repo
-            repo_url = next(iter(self[REPO_INDEX][repo].values()))["repo"]
+            repo_url = next(iter(plugins.values()))["repo"]
         elif not repo.endswith("tar.gz"):
             # This is a repo url, make up a plugin definition for it
             human_name = human_name_for_git_url(repo)
@@ -312,6 +513,7 @@ class BotRepoManager(StoreMixin):
         repo_path = path.join(self.plugin_dir, name)
         # ignore errors because the DB can be desync'ed from the file tree.
         shutil.rmtree(repo_path, ignore_errors=True)
-        repos = self.get_installed_plugin_repos()
-        del repos[name]
-        self.set_plugin_repos(repos)
+        with self._storage_lock:
+            repos = self.get_installed_plugin_repos()
+            del repos[name]
+            self.set_plugin_repos(repos)
@@ -0,0 +1,362 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from threading import Condition, Thread
+from typing import Any, Callable, List, Mapping, Optional, Set, Tuple
+
+log = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    A function scheduled on a :class:`Scheduler`, it can be cancelled at any time.
+    """
+
+    def __init__(
+        self,
+        scheduler: "Scheduler",
+        function: Callable[..., Any],
+        args: Tuple,
+        kwargs: Mapping,
+        interval: Optional[float] = None,
+        times: Optional[int] = None,
+        fixed_rate: bool = False,
+        jitter: float = 0,
+        overlap: bool = False,
+        max_runtime: Optional[float] = None,
+    ):
+        self._scheduler = scheduler
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.times = times
+        self.fixed_rate = fixed_rate
+        self.jitter = jitter
+        self.overlap = overlap
+        self.max_runtime = max_runtime
+        self.cancelled = False
+        self.running = 0  # number of runs in progress.
+        self._queued = False
+        self._inline = False  # run from the scheduler thread itself.
+        self._base = None  # the deadline of the current run before jitter.
+
+    def cancel(self) -> None:
+        """
+        Stops the job, a run already in progress completes but the job won't be run again.
+        """
+        self._scheduler.cancel(self)
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.jitter) if self.jitter else 0
+
+    def __str__(self):
+        return getattr(self.function, "__name__", str(self.function))
+
+
+class Scheduler:
+    """
+    Runs delayed and periodic jobs.
+
+    A single thread waits for the next deadline of a heap of jobs and hands the jobs over to a bounded
+    thread pool, so scheduling or cancelling a job is O(log n) and no thread is created per run.
+    """
+
+    def __init__(self, pool_size: int) -> None:
+        """
+        :param pool_size: the maximum number of jobs running at the same time.
+        """
+        self._pool_size = pool_size
+        self._pool = None
+        self._thread = None
+        self._queue = []  # heap of (deadline, sequence, job)
+        self._sequence = itertools.count()
+        self._cancelled = 0  # number of cancelled jobs still in the heap.
+        self._condition = Condition()
+        self._closed = False
+
+    def schedule(
+        self,
+        delay: float,
+        function: Callable[..., Any],
+        args: Tuple = (),
+        kwargs: Mapping = None,
+        interval: float = None,
+        times: int = None,
+        fixed_rate: bool = False,
+        jitter: float = 0,
+        overlap: bool = False,
+        max_runtime: float = None,
+    ) -> Job:
+        """
+        Schedules a function.
+
+        :param delay: in seconds, the delay before the first run.
+        :param function: the function to run.
+        :param args: args for the function.
+        :param kwargs: kwargs for the function.
+        :param interval: in seconds, runs the function again this long after each run completes.
+                         Defaults to None, the function runs only once.
+        :param times: the number of runs of a periodic job, defaults to None which runs it until it is cancelled.
+        :param fixed_rate: counts the interval from the start of the runs instead of their end, so the runs
+                           don't drift by the time they take.
+        :param jitter: in seconds, a random delay up to this value is added to every run so jobs with the same
+                       interval spread out instead of running all together.
+        :param overlap: with fixed_rate, starts a run even if the previous one is still in progress.
+                        By default such runs are skipped.
+        :param max_runtime: in seconds, reports the runs still in progress after this delay. Python threads
+                            can't be interrupted, the run itself continues.
+        :return: the scheduled job.
+        """
+        job = Job(
+            self,
+            function,
+            args,
+            kwargs or {},
+            interval,
+            times,
+            fixed_rate,
+            jitter,
+            overlap,
+            max_runtime,
+        )
+        if times is not None and times <= 0:
+            job.cancelled = True
+            return job
+        job._base = time.monotonic() + delay
+        self._push(job, job._base + job._jitter())
+        return job
+
+    def cancel(self, job: Job) -> None:
+        with self._condition:
+            if job.cancelled:
+                return
+            job.cancelled = True
+            if not job._queued:
+                return
+            self._cancelled += 1
+            if self._cancelled > len(self._queue) // 2:
+                # too many dead entries, compact the heap.
+                for entry in self._queue:
+                    entry[2]._queued = not entry[2].cancelled
+                self._queue = [entry for entry in self._queue if entry[2]._queued]
+                heapq.heapify(self._queue)
+                self._cancelled = 0
+
+    def _push(self, job: Job, deadline: float) -> None:
+        with self._condition:
+            if self._closed:
+                log.debug("Scheduler closed, dropping %s.", job)
+                return
+            if self._thread is None:
+                # multiprocessing is slow to import, only pay for it with the first job.
+                from multiprocessing.pool import ThreadPool
+
+                self._pool = ThreadPool(self._pool_size)
+                self._thread = Thread(target=self._run, name="Scheduler", daemon=True)
+                self._thread.start()
+            heapq.heappush(self._queue, (deadline, next(self._sequence), job))
+            job._queued = True
+            if self._queue[0][2] is job:
+                # the next deadline moved closer.
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    if self._queue and self._queue[0][2].cancelled:
+                        heapq.heappop(self._queue)[2]._queued = False
+                        self._cancelled -= 1
+                        continue
+                    timeout = (
+                        self._queue[0][0] - time.monotonic() if self._queue else None
+                    )
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                _, _, job = heapq.heappop(self._queue)
+                job._queued = False
+                if job._inline:
+                    job.function(*job.args, **job.kwargs)
+                    continue
+                if job.fixed_rate and job.interval is not None:
+                    self._reschedule_fixed_rate(job)
+                if job.running and not job.overlap:
+                    log.warning("%s is still running, skipping this run.", job)
+                    continue
+                job.running += 1
+                self._pool.apply_async(self._execute, (job,))
+
+    def _reschedule_fixed_rate(self, job: Job) -> None:
+        if job.times is not None:
+            job.times -= 1
+            if job.times <= 0:
+                return
+        # the runs are planned from the previous plan, not from the actual start, so they don't drift.
+        job._base += job.interval
+        now = time.monotonic()
+        if job._base <= now:
+            # we are late, don't try to catch up the missed runs.
+            job._base += ((now - job._base) // job.interval + 1) * job.interval
+        self._push(job, job._base + job._jitter())
+
+    @staticmethod
+    def _watch(job: Job, started: float) -> None:
+        log.warning(
+            "%s has been running for %.1fs, more than its %ss max runtime.",
+            job,
+            time.monotonic() - started,
+            job.max_runtime,
+        )
+
+    def _execute(self, job: Job) -> None:
+        log.debug("Running the scheduled job %s.", job)
+        watchdog = None
+        if job.max_runtime:
+            watchdog = Job(self, self._watch, (job, time.monotonic()), {})
+            watchdog._inline = True
+            self._push(watchdog, time.monotonic() + job.max_runtime)
+        # noinspection PyBroadException
+        try:
+            job.function(*job.args, **job.kwargs)
+        except Exception:
+            log.exception("The scheduled job %s crashed.", job)
+        finally:
+            with self._condition:
+                job.running -= 1
+            if watchdog:
+                watchdog.cancel()
+
+        if job.interval is None or job.fixed_rate:
+            return
+        if job.times is not None:
+            job.times -= 1
+            if job.times <= 0:
+                return
+        with self._condition:
+            if not job.cancelled:
+                job._base = time.monotonic() + job.interval
+                self._push(job, job._base + job._jitter())
+
+    def close(self) -> None:
+        """Stops the scheduler, the jobs in progress complete but no other job is started."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._pool is not None:
+            self._pool.close()
+
+
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = "jan feb mar apr may jun jul aug sep oct nov dec".split()
+DAY_NAMES = "sun mon tue wed thu fri sat".split()
+
+
+class CronExpression:
+    """
+    A classic 5 fields cron expression: minute, hour, day of month, month and day of week.
+
+    Fields accept ``*``, values, ranges ``1-5``, steps ``*/15`` or ``0-30/10``, lists ``1,15`` and the english
+    abbreviations of the months and days. When both the day of month and the day of week are restricted, a day
+    matching either of them matches, like in cron. The aliases like ``@daily`` or ``@hourly`` are supported too.
+    """
+
+    def __init__(self, expression: str) -> None:
+        """
+        :param expression: the cron expression.
+        :raises ValueError: if the expression is invalid.
+        """
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"{expression} is not a 5 fields cron expression.")
+        self.minutes = self._parse(fields[0], 0, 59)
+        self.hours = self._parse(fields[1], 0, 23)
+        self.days = self._parse(fields[2], 1, 31)
+        self.months = self._parse(fields[3], 1, 12, MONTH_NAMES, 1)
+        # 0 and 7 are both sunday.
+        self.weekdays = {day % 7 for day in self._parse(fields[4], 0, 7, DAY_NAMES)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(
+        field: str, low: int, high: int, names: List[str] = (), offset: int = 0
+    ) -> Set[int]:
+        def value(text: str) -> int:
+            text = text.lower()
+            if text in names:
+                return names.index(text) + offset
+            number = int(text)
+            if not low <= number <= high:
+                raise ValueError(f"{number} is out of the {low}-{high} range.")
+            return number
+
+        values = set()
+        for part in field.split(","):
+            interval, _, step = part.partition("/")
+            if interval == "*":
+                start, end = low, high
+            elif "-" in interval:
+                start, end = (value(bound) for bound in interval.split("-", 1))
+            else:
+                start = value(interval)
+                end = high if step else start
+            step = int(step) if step else 1
+            if step < 1 or start > end:
+                raise ValueError(f"Invalid cron field {field}.")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day:
+            return weekday
+        if self._any_weekday:
+            return day
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Gets the first time matching this expression strictly after the given one.
+
+        :param moment: a datetime, naive or not.
+        :return: the next matching datetime, in the same timezone as moment.
+        :raises ValueError: if the expression never matches, like on february 30th.
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate.year + 8  # enough to reach the next february 29th.
+        while candidate.year <= limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                year = candidate.year + (month == 1)
+                candidate = candidate.replace(
+                    year=year, month=month, day=1, hour=0, minute=0
+                )
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"{self.expression} never matches.")
+
+    def __str__(self):
+        return self.expression
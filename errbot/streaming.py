@@ -1,13 +1,15 @@
 import io
 import logging
-import os
+import mmap
+import tempfile
 from itertools import repeat, starmap
-from threading import Thread
-from typing import Callable, Optional
+from threading import Condition, Thread
+from typing import Callable, List, Optional
 
 from .backends.base import STREAM_TRANSFER_IN_PROGRESS, STREAM_WAITING_TO_START
 
-CHUNK_SIZE = 4096
+CHUNK_SIZE = 64 * 1024
+RING_CHUNKS = 4  # the ring buffer holds this many chunks.
 
 log = logging.getLogger(__name__)
 
@@ -28,13 +30,162 @@ def repeatfunc(
     return starmap(func, repeat(args, times))
 
 
+class RingBuffer:
+    """
+    A single writer / multiple readers ring buffer.
+
+    Every reader has its own cursor on the same buffer, the writer waits for the slowest reader before
+    overwriting data so the readers never miss anything.
+    """
+
+    def __init__(self, capacity: int, nb_readers: int) -> None:
+        self._view = memoryview(bytearray(capacity))
+        self._capacity = capacity
+        self._written = 0  # total number of bytes written.
+        # total number of bytes read by each reader, None once closed.
+        self._cursors = [0] * nb_readers
+        self._eof = False
+        self._condition = Condition()
+
+    def write_from(self, source: io.RawIOBase, size: int) -> int:
+        """
+        Reads up to size bytes from source directly into the buffer.
+
+        :return: the number of bytes read, 0 at the end of source.
+        """
+        with self._condition:
+            while True:
+                cursors = [cursor for cursor in self._cursors if cursor is not None]
+                oldest = min(cursors, default=self._written)
+                free = self._capacity - (self._written - oldest)
+                if free:
+                    break
+                self._condition.wait()
+            start = self._written % self._capacity
+            size = min(size, free, self._capacity - start)
+        # the region is free for all the readers and they can't read it before _written moves.
+        length = source.readinto(self._view[start : start + size]) or 0
+        with self._condition:
+            self._written += length
+            self._condition.notify_all()
+        return length
+
+    def close_writer(self) -> None:
+        with self._condition:
+            self._eof = True
+            self._condition.notify_all()
+
+    def readinto(self, reader: int, buffer) -> int:
+        with self._condition:
+            while self._cursors[reader] == self._written and not self._eof:
+                self._condition.wait()
+            cursor = self._cursors[reader]
+            start = cursor % self._capacity
+            length = min(len(buffer), self._written - cursor, self._capacity - start)
+            buffer[:length] = self._view[start : start + length]
+            self._cursors[reader] = cursor + length
+            self._condition.notify_all()
+            return length
+
+    def close_reader(self, reader: int) -> None:
+        with self._condition:
+            self._cursors[reader] = None
+            self._condition.notify_all()
+
+
+class RingReader(io.RawIOBase):
+    """A raw, read only file over one of the cursors of a RingBuffer."""
+
+    def __init__(self, ring: RingBuffer, reader: int) -> None:
+        super().__init__()
+        self._ring = ring
+        self._reader = reader
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        return self._ring.readinto(self._reader, memoryview(buffer).cast("B"))
+
+    def close(self) -> None:
+        if not self.closed:
+            self._ring.close_reader(self._reader)
+        super().close()
+
+
+class MappedReader(io.RawIOBase):
+    """A raw, read only and seekable file over a memory map."""
+
+    def __init__(self, mapping: Optional[mmap.mmap], size: int) -> None:
+        """
+        :param mapping: the memory map, None for an empty file as those can't be mapped.
+        :param size: the size of the file.
+        """
+        super().__init__()
+        self._mapping = mapping
+        self._size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        elif whence != io.SEEK_SET:
+            raise ValueError(f"Invalid whence {whence}.")
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}.")
+        self._position = offset
+        return offset
+
+    def tell(self) -> int:
+        return self.seek(0, io.SEEK_CUR)
+
+    def readinto(self, buffer) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        start = min(self._position, self._size)
+        length = min(len(buffer), self._size - start)
+        if length:
+            # a released view so the map can be closed once the transfer is over.
+            with memoryview(self._mapping) as view:
+                buffer[:length] = view[start : start + length]
+        self._position = start + length
+        return length
+
+
 class Tee:
     """Tee implements a multi reader / single writer"""
 
-    def __init__(self, incoming_stream, clients):
-        """clients is a list of objects implementing callback_stream"""
+    def __init__(
+        self,
+        incoming_stream,
+        clients,
+        chunk_size: int = CHUNK_SIZE,
+        spool: bool = False,
+    ):
+        """
+        :param incoming_stream: the stream to dispatch.
+        :param clients: a list of objects implementing callback_stream.
+        :param chunk_size: the maximum size of the reads from the incoming stream.
+        :param spool: if True, the incoming stream is first stored in a temporary file then every client
+                      gets its own seekable stream over a read only memory map of this file, instead of
+                      reading the transfer at the pace of the slowest client.
+        """
         self.incoming_stream = incoming_stream
         self.clients = clients
+        self.chunk_size = chunk_size
+        self.spool = spool
 
     def start(self) -> Thread:
         """starts the transfer asynchronously"""
@@ -42,59 +193,88 @@ class Tee:
         t.start()
         return t
 
-    def run(self):
-        """streams to all the clients synchronously"""
-        nb_clients = len(self.clients)
-        pipes = [
-            (io.open(r, "rb"), io.open(w, "wb"))
-            for r, w in repeatfunc(os.pipe, nb_clients)
-        ]
-        streams = [self.incoming_stream.clone(pipe[0]) for pipe in pipes]
-
-        def streamer(index):
-            try:
-                self.clients[index].callback_stream(streams[index])
-                if streams[index].status == STREAM_WAITING_TO_START:
-                    streams[index].reject()
-                    plugin = self.clients[index].name
-                    logging.warning(
-                        "%s did not accept nor reject the incoming file transfer",
-                        plugin,
-                    )
-                    logging.warning("I reject it as a fallback.")
-            except Exception as _:
-                # internal error, mark the error.
-                streams[index].error()
-            else:
-                if streams[index].status == STREAM_TRANSFER_IN_PROGRESS:
-                    # if the plugin didn't do it by itself, mark the transfer as a success.
-                    streams[index].success()
-            # stop the stream if the callback_stream returns
-            read, write = pipes[index]
-            pipes[index] = (None, None)  # signal the main thread to stop streaming
-            read.close()
-            write.close()
-
-        threads = [Thread(target=streamer, args=(i,)) for i in range(nb_clients)]
+    @staticmethod
+    def _streamer(client, stream) -> None:
+        try:
+            client.callback_stream(stream)
+            if stream.status == STREAM_WAITING_TO_START:
+                stream.reject()
+                plugin = client.name
+                logging.warning(
+                    "%s did not accept nor reject the incoming file transfer",
+                    plugin,
+                )
+                logging.warning("I reject it as a fallback.")
+        except Exception as _:
+            # internal error, mark the error.
+            stream.error()
+        else:
+            if stream.status == STREAM_TRANSFER_IN_PROGRESS:
+                # if the plugin didn't do it by itself, mark the transfer as a success.
+                stream.success()
+        # stop the stream if the callback_stream returns, nobody waits for this reader anymore.
+        stream.raw.close()
 
+    def _start_streamers(self, raws) -> List[Thread]:
+        threads = [
+            Thread(
+                target=self._streamer,
+                args=(client, self.incoming_stream.clone(raw)),
+            )
+            for client, raw in zip(self.clients, raws)
+        ]
         for thread in threads:
             thread.start()
+        return threads
+
+    def run(self):
+        """streams to all the clients synchronously"""
+        if self.spool:
+            self._run_spooled()
+            return
+        nb_clients = len(self.clients)
+        ring = RingBuffer(self.chunk_size * RING_CHUNKS, nb_clients)
+        threads = self._start_streamers(
+            RingReader(ring, index) for index in range(nb_clients)
+        )
 
         while True:
             if self.incoming_stream.closed:
                 break
-            chunk = self.incoming_stream.read(CHUNK_SIZE)
-            log.debug("dispatch %d bytes", len(chunk))
-            if not chunk:
+            length = ring.write_from(self.incoming_stream, self.chunk_size)
+            log.debug("dispatch %d bytes", length)
+            if not length:
                 break
-            for _, w in pipes:
-                if w:
-                    w.write(chunk)
         log.debug("EOF detected")
-        for r, w in pipes:
-            if w:
-                w.close()  # close should flush too
+        ring.close_writer()
         # we want to be sure that if we join on the main thread,
         # everything is either fully transfered or errored
         for thread in threads:
             thread.join()
+
+    def _run_spooled(self):
+        with tempfile.TemporaryFile() as spool:
+            size = 0
+            chunk = bytearray(self.chunk_size)
+            while not self.incoming_stream.closed:
+                length = self.incoming_stream.readinto(chunk)
+                if not length:
+                    break
+                spool.write(memoryview(chunk)[:length])
+                size += length
+            spool.flush()
+            log.debug("Spooled %d bytes", size)
+            mapping = (
+                mmap.mmap(spool.fileno(), size, access=mmap.ACCESS_READ)
+                if size
+                else None
+            )
+            try:
+                threads = self._start_streamers(
+                    MappedReader(mapping, size) for _ in self.clients
+                )
+                for thread in threads:
+                    thread.join()
+            finally:
+                if mapping is not None:
+                    mapping.close()
@@ -1,7 +1,16 @@
 import logging
+import os
 from pathlib import Path
+from typing import Optional
 
-from jinja2 import ChoiceLoader, Environment, FileSystemLoader, PrefixLoader
+from jinja2 import (
+    ChoiceLoader,
+    Environment,
+    FileSystemLoader,
+    PrefixLoader,
+    Template,
+    TemplateNotFound,
+)
 
 from errbot.plugin_info import PluginInfo
 
@@ -15,17 +24,18 @@ def make_templates_path(root: Path) -> Path:
 system_templates_path = str(make_templates_path(Path(__file__).parent))
 template_path = [system_templates_path]
 plugin_templates = {}  # plugin_name -> FileSystemLoader
+missing_templates = set()  # the template names known not to exist.
+
+# the loaders are updated in place when plugins come and go so the environment keeps its compiled templates.
+_plugins_loader = PrefixLoader(plugin_templates)
+_global_loader = FileSystemLoader(template_path)
+_loader = ChoiceLoader([_plugins_loader, _global_loader])
 
 
 def _recreate_env():
     global env
-    loaders = []
-    if plugin_templates:
-        loaders.append(PrefixLoader(plugin_templates))
-    loaders.append(FileSystemLoader(template_path))
-
     env = Environment(
-        loader=ChoiceLoader(loaders),
+        loader=_loader,
         trim_blocks=True,
         keep_trailing_newline=False,
         autoescape=True,
@@ -35,11 +45,79 @@ def _recreate_env():
 _recreate_env()
 
 
+def _loaders_changed() -> None:
+    _global_loader.searchpath = list(template_path)
+    missing_templates.clear()
+    if env.loader is not _loader:
+        # the environment has been replaced, start over from ours.
+        _recreate_env()
+
+
+def _evict_templates(plugin_name: str, tmpl_path: str) -> None:
+    """Drop the compiled templates coming from the templates path of a plugin."""
+    if env.cache is None:
+        return
+    for key, template in env.cache.items():
+        name = key[1]
+        if name.startswith(plugin_name + "/") or (
+            template.filename and template.filename.startswith(tmpl_path + os.sep)
+        ):
+            del env.cache[key]
+
+
 def tenv() -> Environment:
     return env
 
 
-def add_plugin_templates_path(plugin_info: PluginInfo) -> None:
+def get_template(template_name: str, plugin_name: Optional[str] = None) -> Template:
+    """
+    Get a template, from the namespace of the given plugin first then from the global search path.
+
+    The templates missing from the plugin namespace are remembered so the following lookups go straight
+    to the global search path.
+
+    :param template_name: the name of the template, with its extension.
+    :param plugin_name: the name of the plugin to use as a template namespace.
+    :raises TemplateNotFound: if the template can't be found.
+    """
+    if plugin_name:
+        name = f"{plugin_name}/{template_name}"
+        if name not in missing_templates:
+            try:
+                return env.get_template(name)
+            except TemplateNotFound:
+                missing_templates.add(name)
+            except Exception:
+                log.debug(
+                    "Template %s is broken in plugin %s namespace, falling back to global search.",
+                    template_name,
+                    plugin_name,
+                    exc_info=True,
+                )
+    return env.get_template(template_name)
+
+
+def precompile_plugin_templates(plugin_name: str) -> None:
+    """Compile all the templates of a plugin ahead of their first use, reporting the broken ones."""
+    loader = plugin_templates.get(plugin_name)
+    if loader is None:
+        return
+    for name in loader.list_templates():
+        try:
+            env.get_template(f"{plugin_name}/{name}")
+        except Exception:
+            log.exception(
+                "Template %s of plugin %s can't be compiled.", name, plugin_name
+            )
+
+
+def add_plugin_templates_path(
+    plugin_info: PluginInfo, precompile: bool = False
+) -> None:
+    """
+    :param plugin_info: the plugin to add the templates of.
+    :param precompile: if True, all the templates of the plugin are compiled right away.
+    """
     tmpl_path = make_templates_path(plugin_info.location.parent)
     if tmpl_path.exists():
         log.debug(
@@ -47,9 +125,9 @@ def add_plugin_templates_path(plugin_info: PluginInfo) -> None:
         )
         template_path.append(str(tmpl_path))  # for webhooks
         plugin_templates[plugin_info.name] = FileSystemLoader(str(tmpl_path))
-
-        # Ditch and recreate a new templating environment
-        _recreate_env()
+        _loaders_changed()
+        if precompile:
+            precompile_plugin_templates(plugin_info.name)
         return
     log.debug(
         "No templates directory found for %s plugin in [%s]",
@@ -70,5 +148,5 @@ def remove_plugin_templates_path(plugin_info: PluginInfo) -> None:
         changed = True
 
     if changed:
-        # Ditch and recreate a new templating environment
-        _recreate_env()
+        _evict_templates(plugin_info.name, tmpl_path)
+        _loaders_changed()
@@ -1,3 +1,4 @@
+import bisect
 import collections
 import fnmatch
 import importlib.metadata
@@ -9,12 +10,11 @@ import pathlib
 import re
 import sys
 import time
+import unicodedata
 from functools import wraps
 from platform import system
 from typing import List, Tuple, Union
 
-from dulwich import porcelain
-
 log = logging.getLogger(__name__)
 
 ON_WINDOWS = system() == "Windows"
@@ -150,36 +150,185 @@ def split_string_after(str_: str, n: int) -> str:
         yield str_[start : start + n]
 
 
-def find_roots(path: str, file_sig: str = "*.plug") -> List:
+# An opening or closing markdown code fence: ``` or ~~~ with an optional info string.
+MD_FENCE = re.compile(rb"^ {0,3}(`{3,}|~{3,})([^\n]*)$", re.MULTILINE)
+
+
+def _md_fences(data: bytes) -> List[Tuple[int, int, int, bytes, bytes]]:
+    """Locates the fenced code blocks of an utf-8 encoded markdown text.
+
+    :param data: the encoded markdown text.
+    :return: a sorted list of (opener start, opener end, closer start, opener line, fence marker).
+    """
+    fences = []
+    opener = None
+    for match in MD_FENCE.finditer(data):
+        marker = match.group(1)
+        if opener is None:
+            opener = match
+            continue
+        opening_marker = opener.group(1)
+        if (
+            marker[:1] == opening_marker[:1]
+            and len(marker) >= len(opening_marker)
+            and not match.group(2).strip()
+        ):
+            fences.append(
+                (
+                    opener.start(),
+                    opener.end(),
+                    match.start(),
+                    opener.group(0).lstrip(),
+                    opening_marker,
+                )
+            )
+            opener = None
+    if opener is not None:  # unterminated block, it runs until the end of the text.
+        fences.append(
+            (
+                opener.start(),
+                opener.end(),
+                len(data),
+                opener.group(0).lstrip(),
+                opener.group(1),
+            )
+        )
+    return fences
+
+
+def _char_boundary(view: memoryview, cut: int, floor: int) -> int:
+    """Moves `cut` back so it neither falls inside an utf-8 sequence nor detaches combining marks."""
+    while cut > floor:
+        byte = view[cut]
+        if byte & 0xC0 == 0x80:  # continuation byte
+            cut -= 1
+            continue
+        length = 1 if byte < 0x80 else 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+        char = str(view[cut : cut + length], "utf-8")
+        if not (
+            unicodedata.combining(char)
+            or char in "\u200d\ufe0e\ufe0f"
+            or "\U0001f3fb" <= char <= "\U0001f3ff"
+        ):
+            break
+        cut -= 1
+    return cut
+
+
+def _md_cut(data: bytes, view: memoryview, start: int, end: int) -> int:
+    """Finds the best place to cut data[start:end], from a block boundary down to a hard cut."""
+    paragraph = data.rfind(b"\n\n", start + (end - start) // 2, end)
+    if paragraph != -1:
+        return paragraph + 2
+    line = data.rfind(b"\n", start, end)
+    if line != -1:
+        return line + 1
+    space = data.rfind(b" ", start + (end - start) // 2, end)
+    if space != -1:
+        return space + 1
+    cut = _char_boundary(view, end, start)
+    if cut > start:
+        return cut
+    # a single grapheme bigger than the limit, let it overflow rather than loop forever.
+    cut = end
+    while cut < len(data) and view[cut] & 0xC0 == 0x80:
+        cut += 1
+    return cut
+
+
+def split_markdown_after(str_: str, n: int) -> str:
+    """Yield markdown chunks of at most `n` bytes once encoded in utf-8 from the given string.
+
+    Chunks are cut preferably on paragraph boundaries, then on line boundaries, then on
+    spaces and as a last resort between two graphemes. A fenced code block which does not fit
+    is moved to the next chunk or closed at the end of a chunk and reopened at the start of
+    the next one so every chunk renders on its own.
+
+    :param n: maximum size in bytes of the chunks.
+    :param str_: the given string.
+    """
+    data = str_.encode("utf-8")
+    if len(data) <= n:
+        yield str_
+        return
+
+    view = memoryview(data)
+    fences = _md_fences(data)
+    fence_starts = [fence[0] for fence in fences]
+    start = 0
+    reopen = b""
+    while start < len(data):
+        # always move forward, even if the limit is too small for the reopened fence.
+        end = max(start + n - len(reopen), start + 1)
+        if end >= len(data):
+            yield str(reopen, "utf-8") + str(view[start:], "utf-8")
+            return
+        cut = _md_cut(data, view, start, end)
+        close = b""
+
+        index = bisect.bisect_right(fence_starts, cut - 1) - 1
+        if index >= 0 and fences[index][0] < cut <= fences[index][2]:
+            fence_start, opener_end, closer_start, opener, marker = fences[index]
+            if fence_start > start:
+                # move the whole block to the next chunk.
+                cut = fence_start
+            elif cut > opener_end:
+                block_start = max(start, opener_end + 1)
+                close = marker if data[cut - 1 : cut] == b"\n" else b"\n" + marker
+                if cut <= block_start or cut + len(close) > end:
+                    # keep some of the block in this chunk, hard cutting a line too long.
+                    room = max(end - len(marker) - 1, block_start + 1)
+                    cut = _md_cut(data, view, block_start, room)
+                    close = marker if data[cut - 1 : cut] == b"\n" else b"\n" + marker
+
+        yield str(reopen, "utf-8") + str(view[start:cut], "utf-8") + str(
+            close, "utf-8"
+        )
+        reopen = opener + b"\n" if close else b""
+        start = cut
+
+
+def find_roots(path: str, file_sig: str = "*.plug", discovery=None) -> List:
     """Collects all the paths from path recursively that contains files of type `file_sig`.
 
     :param path:
          a base path to walk from
     :param file_sig:
          the file pattern to look for
+    :param discovery:
+         an optional :class:`~errbot.discovery.DiscoveryCache` to avoid walking the same tree again
     :return: a list of paths
     """
     roots = list()  # you can have several .plug per directory.
-    for root, dirnames, filenames in os.walk(path, followlinks=True):
-        for filename in fnmatch.filter(filenames, file_sig):
-            dir_to_add = os.path.dirname(os.path.join(root, filename))
-            relative = os.path.relpath(
-                os.path.realpath(dir_to_add), os.path.realpath(path)
-            )
-            for subelement in relative.split(os.path.sep):
-                # if one of the element is just a relative construct, it is ok to continue inspecting it.
-                if subelement in (".", ".."):
-                    continue
-                # if it is an hidden directory or a python temp directory, just ignore it.
-                if subelement.startswith(".") or subelement == "__pycache__":
-                    log.debug("Ignore %s.", dir_to_add)
-                    break
-            else:
-                roots.append(dir_to_add)
+    if discovery is None:
+        found = (
+            os.path.join(root, filename)
+            for root, _, filenames in os.walk(path, followlinks=True)
+            for filename in fnmatch.filter(filenames, file_sig)
+        )
+    else:
+        found = (
+            file
+            for file in discovery.walk(path)
+            if fnmatch.fnmatch(os.path.basename(file), file_sig)
+        )
+    for file in found:
+        dir_to_add = os.path.dirname(file)
+        relative = os.path.relpath(os.path.realpath(dir_to_add), os.path.realpath(path))
+        for subelement in relative.split(os.path.sep):
+            # if one of the element is just a relative construct, it is ok to continue inspecting it.
+            if subelement in (".", ".."):
+                continue
+            # if it is an hidden directory or a python temp directory, just ignore it.
+            if subelement.startswith(".") or subelement == "__pycache__":
+                log.debug("Ignore %s.", dir_to_add)
+                break
+        else:
+            roots.append(dir_to_add)
     return list(collections.OrderedDict.fromkeys(roots))
 
 
-def collect_roots(base_paths: List, file_sig: str = "*.plug") -> List:
+def collect_roots(base_paths: List, file_sig: str = "*.plug", discovery=None) -> List:
     """Collects all the paths from base_paths recursively that contains files of type `file_sig`.
 
     :param base_paths:
@@ -188,18 +337,26 @@ def collect_roots(base_paths: List, file_sig: str = "*.plug") -> List:
 
     :param file_sig:
          the file pattern to look for
+    :param discovery:
+         an optional :class:`~errbot.discovery.DiscoveryCache` to avoid walking the same trees again
     :return: a list of paths
     """
     result = list()
     for path_or_list in base_paths:
         if isinstance(path_or_list, (list, tuple)):
-            result.extend(collect_roots(base_paths=path_or_list, file_sig=file_sig))
+            result.extend(
+                collect_roots(
+                    base_paths=path_or_list, file_sig=file_sig, discovery=discovery
+                )
+            )
         elif path_or_list is not None:
-            result.extend(find_roots(path_or_list, file_sig))
+            result.extend(find_roots(path_or_list, file_sig, discovery))
     return list(collections.OrderedDict.fromkeys(result))
 
 
-def entry_point_plugins(group):
+def entry_point_plugins(group, discovery=None):
+    if discovery is not None:
+        return discovery.entry_points(group, lambda: entry_point_plugins(group))
     paths = set()
 
     for ep in importlib.metadata.entry_points(group=group):
@@ -230,6 +387,8 @@ def git_clone(url: str, path: str) -> None:
     """
     Clones a repository from git url to path
     """
+    from dulwich import porcelain  # only the repo management needs git.
+
     if not os.path.exists(path):
         os.makedirs(path)
 
@@ -244,6 +403,8 @@ def git_pull(repo_path: str) -> None:
     """
     Does a git pull on a repository
     """
+    from dulwich import porcelain
+
     porcelain.pull(repo_path)
 
 
@@ -251,4 +412,6 @@ def git_tag_list(repo_path: str) -> List[str]:
     """
     Lists git tags on a cloned repo
     """
+    from dulwich import porcelain
+
     porcelain.tag_list(repo_path)
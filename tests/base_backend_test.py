@@ -13,7 +13,7 @@ import pytest
 
 from errbot import arg_botcmd, botcmd, re_botcmd, templating  # noqa
 from errbot.backend_plugin_manager import BackendPluginManager
-from errbot.backends.base import ONLINE, Identifier, Message, Room
+from errbot.backends.base import ONLINE, Identifier, Message, Room, cached_identifier
 from errbot.backends.test import (
     ShallowConfig,
     TestOccupant,
@@ -23,7 +23,7 @@ from errbot.backends.test import (
 )
 from errbot.bootstrap import CORE_STORAGE, bot_config_defaults
 from errbot.core import ErrBot
-from errbot.core_plugins.acls import ACLS
+from errbot.core_plugins.acls import ACLS, GlobMatcher
 from errbot.plugin_manager import BotPluginManager
 from errbot.rendering import text
 from errbot.repo_manager import BotRepoManager
@@ -288,6 +288,86 @@ def test_buildreply_with_parent(dummy_backend):
     assert resp.parent is not None
 
 
+def test_message_is_slotted_but_accepts_backend_extras(dummy_backend):
+    m = dummy_backend.build_message("Content")
+    m.frm = dummy_backend.build_identifier("user")
+    assert "_body" in Message.__slots__
+    assert not m.__dict__
+    m.nick = "user"  # some backends attach extra attributes to the messages.
+    assert m.clone().body == "Content"
+    assert m.__dict__ == {"nick": "user"}
+
+
+def test_identifiers_are_slotted(dummy_backend):
+    person = dummy_backend.build_identifier("user")
+    assert not hasattr(person, "__dict__")
+    with pytest.raises(AttributeError):
+        person.undeclared = True
+
+
+class CachingDummyBackend(DummyBackend):
+    IDENTIFIERS_CACHE_SIZE = 2
+
+    def __init__(self, extra_config=None):
+        self.built = 0
+        super().__init__(extra_config)
+
+    @cached_identifier
+    def build_identifier(self, text_representation):
+        self.built += 1
+        if text_representation.startswith("#"):
+            return TestRoom(text_representation, bot=self)
+        return TestPerson(text_representation)
+
+
+def test_build_identifier_is_interned():
+    dummy = CachingDummyBackend()
+    built = dummy.built
+    assert dummy.build_identifier("user") is dummy.build_identifier("user")
+    assert dummy.built == built + 1
+
+
+def test_build_identifier_cache_is_bounded():
+    dummy = CachingDummyBackend()
+    user1 = dummy.build_identifier("user1")
+    dummy.build_identifier("user2")
+    dummy.build_identifier("user1")  # refreshes user1
+    dummy.build_identifier("user3")  # evicts user2
+    assert dummy.build_identifier("user1") is user1
+    built = dummy.built
+    dummy.build_identifier("user2")
+    assert dummy.built == built + 1
+
+
+def test_build_identifier_does_not_cache_rooms():
+    dummy = CachingDummyBackend()
+    assert dummy.build_identifier("#room") is not dummy.build_identifier("#room")
+
+
+def test_invalidate_identifiers():
+    dummy = CachingDummyBackend()
+    user = dummy.build_identifier("user")
+    dummy.invalidate_identifiers("user")
+    assert dummy.build_identifier("user") is not user
+
+    user = dummy.build_identifier("user")
+    dummy.invalidate_identifiers(identifier=user)
+    assert dummy.build_identifier("user") is not user
+
+    user = dummy.build_identifier("user")
+    dummy.invalidate_identifiers()
+    assert dummy.build_identifier("user") is not user
+
+
+def test_invalidate_identifiers_by_prefix():
+    dummy = CachingDummyBackend()
+    occupant = dummy.build_identifier("user\n#room")
+    other = dummy.build_identifier("username\n#room")
+    dummy.invalidate_identifiers(prefix="user\n")
+    assert dummy.build_identifier("username\n#room") is other
+    assert dummy.build_identifier("user\n#room") is not occupant
+
+
 def test_all_command_private():
     dummy_backend = DummyBackend(extra_config={"DIVERT_TO_PRIVATE": ("ALL_COMMANDS",)})
     m = dummy_backend.build_message("Content")
@@ -1019,3 +1099,31 @@ def test_access_controls(dummy_backend):
         )
         dummy_backend.callback_message(test["message"])
         assert test["expected_response"] == dummy_backend.pop_message().body
+
+
+def test_glob_matcher():
+    matches = GlobMatcher(("err", "*bot", "room_[0-9]", 1234))
+    assert matches("err")
+    assert matches("errbot")
+    assert matches("room_1")
+    assert matches(1234)
+    assert not matches("Err")
+    assert not matches("room_a")
+    assert GlobMatcher("ERR*", ignore_case=True)("errbot")
+    assert not GlobMatcher(())("err")
+
+
+def test_access_controls_are_recompiled_when_reassigned(dummy_backend):
+    dummy_backend.bot_config.ACCESS_CONTROLS_DEFAULT = {}
+    dummy_backend.bot_config.BOT_ADMINS = ()
+    dummy_backend.bot_config.ACCESS_CONTROLS = {"command": {"denyusers": ("noterr",)}}
+    for _ in range(2):  # the second time from the cached decision.
+        dummy_backend.callback_message(makemessage(dummy_backend, "!command"))
+        assert (
+            "You're not allowed to access this command from this user"
+            == dummy_backend.pop_message().body
+        )
+
+    dummy_backend.bot_config.ACCESS_CONTROLS = {"command": {"denyusers": ("err",)}}
+    dummy_backend.callback_message(makemessage(dummy_backend, "!command"))
+    assert "Regular command" == dummy_backend.pop_message().body
@@ -33,3 +33,13 @@ def test_dependency_commands(mock_before_bot_load, testbot):
     assert "Hello from Child1" in testbot.exec_command("!parent1 to child1")
     assert "Hello from Child2" in testbot.exec_command("!parent1 to child2")
     assert "Hello from Parent1" in testbot.exec_command("!parent2 to parent1")
+
+
+class TestConcurrentStartup:
+    extra_config = {"BOT_PLUGINS_STARTUP_POOLSIZE": 4}
+
+    def test_dependency_commands(self, mock_before_bot_load, testbot):
+        assert 4 == testbot.bot.plugin_manager.startup_pool_size
+        assert "Hello from Child1" in testbot.exec_command("!parent1 to child1")
+        assert "Hello from Child2" in testbot.exec_command("!parent1 to child2")
+        assert "Hello from Parent1" in testbot.exec_command("!parent2 to parent1")
@@ -28,6 +28,32 @@ def test_help(testbot):
     assert "runs re_foo" in testbot.exec_command("!help re foo")  # Part of Dummy
 
 
+def test_help_index_is_rebuilt_when_commands_change(testbot):
+    help_plugin = testbot.bot.plugin_manager.get_plugin_obj_by_name("Help")
+    assert "!uptime" in testbot.exec_command("!help")
+    index = help_plugin.help_index()
+    assert index is help_plugin.help_index()
+
+    testbot.push_message("!plugin deactivate Health")
+    assert "Plugin Health deactivated." == testbot.pop_message()
+    assert "!uptime" not in testbot.exec_command("!help")
+    assert index is not help_plugin.help_index()
+
+    testbot.push_message("!plugin activate Health")
+    assert "Plugin Health activated." in testbot.pop_message()
+    assert "!uptime" in testbot.exec_command("!help")
+
+
+def test_help_hides_restricted_commands(testbot):
+    testbot.bot.bot_config.HIDE_RESTRICTED_COMMANDS = True
+    testbot.bot.bot_config.ACCESS_CONTROLS = {"uptime": {"denyusers": ("*",)}}
+    assert "!uptime" not in testbot.exec_command("!help")
+    assert "!uptime" not in testbot.exec_command("!apropos the uptime")
+
+    testbot.bot.bot_config.ACCESS_CONTROLS = {}
+    assert "!uptime" in testbot.exec_command("!help")
+
+
 def test_about(testbot):
     assert "Errbot version" in testbot.exec_command("!about")
 
@@ -91,6 +117,10 @@ def test_config_cycle(testbot):
 
 def test_apropos(testbot):
     assert "!about: Return information about" in testbot.exec_command("!apropos about")
+    assert "!about: Return information about" in testbot.exec_command(
+        "!apropos NFORMATION"
+    )
+    assert "!about" not in testbot.exec_command("!apropos notinanydoc")
 
 
 def test_logtail(testbot):
@@ -294,6 +324,36 @@ def test_activate_reload_and_deactivate(testbot):
     testbot.pop_message()
 
 
+def test_active_plugins_are_cached_until_activation_changes(testbot):
+    pm = testbot.bot.plugin_manager
+    active = pm.get_all_active_plugins()
+    assert active is pm.get_all_active_plugins()
+    assert "ChatRoom" in [p.name for p in active]
+
+    testbot.push_message("!plugin deactivate ChatRoom")
+    assert "Plugin ChatRoom deactivated." == testbot.pop_message()
+    assert "ChatRoom" not in [p.name for p in pm.get_all_active_plugins()]
+
+    testbot.push_message("!plugin activate ChatRoom")
+    assert "Plugin ChatRoom activated." in testbot.pop_message()
+    assert "ChatRoom" in [p.name for p in pm.get_all_active_plugins()]
+
+
+def test_callbacks_are_only_dispatched_to_overriding_plugins(testbot):
+    pm = testbot.bot.plugin_manager
+    assert ["ChatRoom"] == [
+        p.name for p in pm.get_active_plugins_subscribed_to("callback_message")
+    ]
+    assert () == pm.get_active_plugins_subscribed_to("callback_presence")
+
+    testbot.push_message("!plugin deactivate ChatRoom")
+    assert "Plugin ChatRoom deactivated." == testbot.pop_message()
+    assert () == pm.get_active_plugins_subscribed_to("callback_message")
+
+    testbot.push_message("!plugin activate ChatRoom")
+    assert "Plugin ChatRoom activated." in testbot.pop_message()
+
+
 def test_unblacklist_and_blacklist(testbot):
     testbot.push_message("!plugin unblacklist nosuchplugin")
     m = testbot.pop_message()
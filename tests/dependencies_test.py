@@ -65,3 +65,12 @@ def test_chained_dependency(testbot):
     assert "Chained1" in plug_names
     assert "Chained2" in plug_names
     assert "Chained3" in plug_names
+
+
+class TestConcurrentStartup:
+    extra_config = {"BOT_PLUGINS_STARTUP_POOLSIZE": 4}
+
+    def test_if_all_loaded_by_default(self, testbot):
+        plug_names = testbot.bot.plugin_manager.get_all_active_plugin_names()
+        for name in ("Single", "Double", "Parent1", "Parent2"):
+            assert name in plug_names
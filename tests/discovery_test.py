@@ -0,0 +1,123 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from errbot.discovery import DiscoveryCache
+from errbot.plugin_manager import DISCOVERY
+from errbot.utils import collect_roots
+
+extra_plugin_dir = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "dummy_plugin"
+)
+
+PLUG = """[Core]
+Name = {name}
+Module = {name}
+
+[Documentation]
+Description = A test plugin.
+"""
+
+
+def write_plug(directory: Path, name: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    plugfile = directory / f"{name}.plug"
+    plugfile.write_text(PLUG.format(name=name))
+    return plugfile
+
+
+def forbid_walks(monkeypatch):
+    def walk(*args, **kwargs):
+        raise AssertionError("the directory should not have been walked again.")
+
+    monkeypatch.setattr(os, "walk", walk)
+
+
+def test_walk_is_reused_while_nothing_changes(tmp_path, monkeypatch):
+    write_plug(tmp_path / "a", "A")
+    write_plug(tmp_path / "b", "B")
+    first = DiscoveryCache()
+    files = first.walk(str(tmp_path))
+    assert files == [str(tmp_path / "a" / "A.plug"), str(tmp_path / "b" / "B.plug")]
+    assert first.changed
+
+    forbid_walks(monkeypatch)
+    second = DiscoveryCache(first.manifest)
+    assert second.walk(str(tmp_path)) == files
+    assert collect_roots([str(tmp_path)], discovery=second) == [
+        str(tmp_path / "a"),
+        str(tmp_path / "b"),
+    ]
+    assert not second.changed
+    assert not second.dropped_entries()
+
+
+def test_walk_is_reused_during_a_discovery(tmp_path, monkeypatch):
+    write_plug(tmp_path / "a", "A")
+    cache = DiscoveryCache()
+    files = cache.walk(str(tmp_path))
+
+    forbid_walks(monkeypatch)
+    assert cache.walk(str(tmp_path)) == files
+
+
+def test_walk_sees_a_new_plugin(tmp_path):
+    write_plug(tmp_path / "a", "A")
+    first = DiscoveryCache()
+    first.walk(str(tmp_path))
+
+    write_plug(tmp_path / "a", "C")
+    # make sure the change is visible even on a file system with a coarse mtime.
+    os.utime(tmp_path / "a", ns=(0, 0))
+    second = DiscoveryCache(first.manifest)
+    assert second.walk(str(tmp_path)) == [
+        str(tmp_path / "a" / "A.plug"),
+        str(tmp_path / "a" / "C.plug"),
+    ]
+    assert second.changed
+
+
+def test_plugin_info_is_parsed_again_only_when_changed(tmp_path, monkeypatch):
+    plugfile = write_plug(tmp_path, "A")
+    first = DiscoveryCache()
+    assert first.plugin_info(plugfile).name == "A"
+
+    second = DiscoveryCache(first.manifest)
+    with monkeypatch.context() as m:
+        m.setattr("errbot.plugin_info.PluginInfo.load", pytest.fail)
+        info = second.plugin_info(plugfile)
+    assert info.name == "A"
+    assert info is not second.plugin_info(plugfile)
+
+    plugfile.write_text(PLUG.format(name="Renamed"))
+    third = DiscoveryCache(second.manifest)
+    assert third.plugin_info(plugfile).name == "Renamed"
+    assert third.changed
+
+
+def test_unused_entries_are_dropped(tmp_path):
+    write_plug(tmp_path / "a", "A")
+    write_plug(tmp_path / "b", "B")
+    first = DiscoveryCache()
+    first.walk(str(tmp_path / "a"))
+    first.walk(str(tmp_path / "b"))
+
+    second = DiscoveryCache(first.manifest)
+    second.walk(str(tmp_path / "a"))
+    assert second.dropped_entries()
+    assert list(second.manifest["walks"]) == [str(tmp_path / "a")]
+
+
+class TestDiscoveryCacheBot:
+    extra_plugin_dir = extra_plugin_dir
+    extra_config = {"BOT_PLUGINS_DISCOVERY_CACHE": True}
+
+    def test_manifest_is_persisted(self, testbot):
+        manager = testbot.bot.plugin_manager
+        assert "Dummy" in manager.get_all_active_plugin_names()
+        manifest = manager[DISCOVERY]
+        assert extra_plugin_dir in manifest["walks"]
+
+        plug = os.path.join(extra_plugin_dir, "dummy.plug")
+        assert manifest["plugin_infos"][plug]["info"].name == "Dummy"
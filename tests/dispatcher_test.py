@@ -0,0 +1,74 @@
+from threading import Event
+
+from errbot.dispatcher import CallbackDispatcher
+
+
+class RecordingPlugin:
+    def __init__(self, name, gate=None):
+        self.name = name
+        self.gate = gate
+        self.received = []
+
+    def callback_message(self, msg):
+        if self.gate:
+            self.gate.wait(5)
+        self.received.append(msg)
+
+    def callback_presence(self, pres):
+        raise Exception("Kaboom!")
+
+
+def test_callbacks_are_called_in_order_per_plugin():
+    dispatcher = CallbackDispatcher(4)
+    plugin = RecordingPlugin("Recording")
+    for i in range(100):
+        dispatcher.dispatch(plugin, "callback_message", i)
+    dispatcher.close()
+    assert list(range(100)) == plugin.received
+
+
+def test_slow_plugin_does_not_delay_the_others():
+    dispatcher = CallbackDispatcher(2)
+    gate = Event()
+    slow = RecordingPlugin("Slow", gate)
+    fast = RecordingPlugin("Fast")
+    dispatcher.dispatch(slow, "callback_message", "hello")
+    dispatcher.dispatch(fast, "callback_message", "hello")
+    for _ in range(50):
+        if fast.received:
+            break
+        Event().wait(0.1)
+    assert ["hello"] == fast.received
+    assert [] == slow.received
+    gate.set()
+    dispatcher.close()
+    assert ["hello"] == slow.received
+
+
+def test_crashing_callback_does_not_stop_the_plugin_lane():
+    dispatcher = CallbackDispatcher(1)
+    plugin = RecordingPlugin("Recording")
+    dispatcher.dispatch(plugin, "callback_presence", "online")
+    dispatcher.dispatch(plugin, "callback_message", "hello")
+    dispatcher.close()
+    assert ["hello"] == plugin.received
+
+
+def test_callbacks_waiting_longer_than_the_timeout_are_dropped():
+    dispatcher = CallbackDispatcher(1, timeout=0.2)
+    gate = Event()
+    plugin = RecordingPlugin("Recording", gate)
+    dispatcher.dispatch(plugin, "callback_message", "first")
+    dispatcher.dispatch(plugin, "callback_message", "stale")
+    Event().wait(0.4)
+    gate.set()
+    dispatcher.close()
+    assert ["first"] == plugin.received
+
+
+def test_dispatch_after_close_is_ignored():
+    dispatcher = CallbackDispatcher(1)
+    plugin = RecordingPlugin("Recording")
+    dispatcher.close()
+    dispatcher.dispatch(plugin, "callback_message", "hello")
+    assert [] == plugin.received
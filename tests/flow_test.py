@@ -1,9 +1,20 @@
 import logging
+import threading
+import time
+from types import SimpleNamespace
 
 import pytest
 
-from errbot.backends.test import TestPerson
-from errbot.flow import Flow, FlowRoot, InvalidState
+from errbot.backends.test import TestOccupant, TestPerson, TestRoom
+from errbot.flow import (
+    CHECKPOINTS_NAMESPACE,
+    Flow,
+    FlowExecutor,
+    FlowNode,
+    FlowRoot,
+    InvalidState,
+)
+from errbot.storage.memory import ROOTS, MemoryStorage, MemoryStoragePlugin
 
 log = logging.getLogger(__name__)
 
@@ -45,3 +56,242 @@ def test_autotrigger():
         "a", lambda ctx: "toto" in ctx and ctx["toto"] == "titui", auto_trigger=True
     )
     assert node.command in root.auto_triggers
+
+
+def test_executor_indexes_in_flight_flows():
+    executor = FlowExecutor(None)
+    root = FlowRoot("test", "This is my flowroot")
+    node_a = root.connect("a", auto_trigger=True)
+    node_b = node_a.connect("b")
+    executor.add_flow(root)
+    somebody = TestPerson("me")
+
+    flow, next_step = executor._check_if_new_flow_is_triggered("a", somebody)
+    assert next_step == node_a
+    assert executor._check_if_new_flow_is_triggered("b", somebody) == (None, None)
+
+    executor._advance(flow, node_a, enforce_predicate=False)
+    executor._add_in_flight(flow)
+    assert executor.check_inflight_already_running(somebody)
+    assert not executor.check_inflight_already_running(TestPerson("other"))
+    assert (flow, node_b) == executor.check_inflight_flow_triggered("b", somebody)
+    assert (None, None) == executor.check_inflight_flow_triggered("a", somebody)
+    assert (None, None) == executor.check_inflight_flow_triggered(
+        "b", TestPerson("other")
+    )
+
+    executor._advance(flow, node_b, enforce_predicate=False)
+    assert (None, None) == executor.check_inflight_flow_triggered("b", somebody)
+
+    assert flow is executor.stop_flow("test", somebody)
+    assert not executor.in_flight
+    assert not executor.check_inflight_already_running(somebody)
+
+
+def test_executor_finds_room_flows_from_occupants():
+    executor = FlowExecutor(None)
+    root = FlowRoot("test", "This is my flowroot")
+    node_a = root.connect("a", room_flow=True)
+    bot = SimpleNamespace(bot_config=SimpleNamespace(BOT_IDENTITY={"username": "err"}))
+    room = TestRoom("#room", bot=bot)
+    flow = Flow(root, room, {})
+    executor._add_in_flight(flow)
+
+    assert (flow, node_a) == executor.check_inflight_flow_triggered(
+        "a", TestOccupant("me", room)
+    )
+    assert (None, None) == executor.check_inflight_flow_triggered(
+        "a", TestOccupant("me", TestRoom("#other", bot=bot))
+    )
+
+
+def test_executor_resumes_checkpointed_flows():
+    ROOTS.pop(CHECKPOINTS_NAMESPACE, None)
+    bot = SimpleNamespace(build_identifier=TestPerson)
+    root = FlowRoot("test", "This is my flowroot")
+    node_a = root.connect("a", auto_trigger=True)
+    node_b = node_a.connect("b")
+    node_b.connect("c")
+    somebody = TestPerson("me")
+
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None))
+    flow = Flow(root, somebody, {"answer": 42})
+    executor._add_in_flight(flow)
+    executor._advance(flow, node_a, enforce_predicate=False)
+    executor.close_persistence()
+
+    # as if the bot had restarted
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None))
+    assert not executor.in_flight
+    resumed, next_step = executor.check_inflight_flow_triggered("b", somebody)
+    assert next_step == node_b
+    assert resumed.requestor == somebody
+    assert resumed.ctx == {"answer": 42}
+    assert [resumed] == executor.in_flight
+
+    executor.stop_flow("test", somebody)
+    executor.close_persistence()
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None))
+    assert (None, None) == executor.check_inflight_flow_triggered("b", somebody)
+
+
+def test_executor_drops_expired_checkpoints():
+    ROOTS.pop(CHECKPOINTS_NAMESPACE, None)
+    bot = SimpleNamespace(build_identifier=TestPerson)
+    root = FlowRoot("test", "This is my flowroot")
+    root.connect("a").connect("b")
+    somebody = TestPerson("me")
+
+    now = 1000.0
+
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None), ttl=60, clock=lambda: now)
+    executor._add_in_flight(Flow(root, somebody, {}))
+    executor.close_persistence()
+
+    now += 61
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None), ttl=60, clock=lambda: now)
+    assert not executor.check_inflight_already_running(somebody)
+    assert not ROOTS.get(CHECKPOINTS_NAMESPACE)
+
+
+def test_executor_resumes_flows_registered_late():
+    ROOTS.pop(CHECKPOINTS_NAMESPACE, None)
+    bot = SimpleNamespace(build_identifier=TestPerson)
+    root = FlowRoot("test", "This is my flowroot")
+    node_a = root.connect("a", auto_trigger=True)
+    node_b = node_a.connect("b")
+    somebody = TestPerson("me")
+
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None))
+    flow = Flow(root, somebody, {"answer": 42})
+    executor._add_in_flight(flow)
+    executor._advance(flow, node_a, enforce_predicate=False)
+    executor.close_persistence()
+
+    # as if the plugin of the flow was activated after the requestor came back.
+    executor = FlowExecutor(bot)
+    executor.open_persistence(MemoryStoragePlugin(None))
+    assert (None, None) == executor.check_inflight_flow_triggered("b", somebody)
+    executor.add_flow(root)
+    resumed, next_step = executor.check_inflight_flow_triggered("b", somebody)
+    assert next_step == node_b
+    assert resumed.ctx == {"answer": 42}
+
+
+def test_executor_checkpoints_without_holding_its_lock(monkeypatch):
+    ROOTS.pop(CHECKPOINTS_NAMESPACE, None)
+    root = FlowRoot("test", "This is my flowroot")
+    node_a = root.connect("a", auto_trigger=True)
+    node_a.connect("b")
+    somebody = TestPerson("me")
+
+    executor = FlowExecutor(SimpleNamespace(build_identifier=TestPerson))
+    executor.add_flow(root)
+    executor.open_persistence(MemoryStoragePlugin(None))
+
+    locked = []
+    set_ = MemoryStorage.set
+
+    def set_and_check(self, key, value):
+        # a slow storage must not stall the other threads using the executor.
+        def try_lock():
+            acquired = executor._lock.acquire(timeout=1)
+            locked.append(not acquired)
+            if acquired:
+                executor._lock.release()
+
+        other = threading.Thread(target=try_lock)
+        other.start()
+        other.join()
+        set_(self, key, value)
+
+    monkeypatch.setattr(MemoryStorage, "set", set_and_check)
+    flow = Flow(root, somebody, {})
+    executor._add_in_flight(flow)
+    executor._advance(flow, node_a, enforce_predicate=False)
+    executor.stop_flow("test", somebody)
+
+    assert locked == [False, False]
+    executor.close_persistence()
+    assert not ROOTS.get(CHECKPOINTS_NAMESPACE)
+
+
+def test_executor_reaps_inactive_flows():
+    sent = []
+    bot = SimpleNamespace(send=lambda identifier, text: sent.append((identifier, text)))
+    root = FlowRoot("test", "This is my flowroot", timeout=60, timeout_notify=True)
+    root.connect("a").connect("b")
+    somebody = TestPerson("me")
+
+    executor = FlowExecutor(bot)
+    executor.add_flow(root)
+    flow = Flow(root, somebody, {})
+    executor._add_in_flight(flow)
+    assert [] == executor.reap()
+
+    # the deadline is pushed back by the flow activity.
+    executor._deadlines[0] = (0, *executor._deadlines[0][1:])
+    assert [] == executor.reap()
+    assert [flow] == executor.in_flight
+
+    flow.last_activity -= 61
+    executor._deadlines[0] = (0, *executor._deadlines[0][1:])
+    assert [flow] == executor.reap()
+    assert not executor.in_flight
+    assert (None, None) == executor.check_inflight_flow_triggered("a", somebody)
+    assert [somebody] == [identifier for identifier, _ in sent]
+    executor.stop_reaper()
+
+
+def test_executor_reaper_runs_on_its_own():
+    root = FlowRoot("test", "This is my flowroot")
+    root.connect("a")
+    executor = FlowExecutor(None, default_timeout=0.05)
+    executor.add_flow(root)
+    executor._add_in_flight(Flow(root, TestPerson("me"), {}))
+    for _ in range(50):
+        if not executor.in_flight:
+            break
+        time.sleep(0.1)
+    assert not executor.in_flight
+
+
+def test_executor_runs_forked_autosteps_concurrently():
+    def slow_command(key):
+        def command(msg, args):
+            time.sleep(0.3)
+            msg.ctx[key] = True
+            del msg.ctx["started"]
+
+        return command
+
+    bot = SimpleNamespace(
+        commands={name: slow_command(name) for name in ("a", "b", "c")},
+        send=lambda identifier, text: None,
+    )
+    root = FlowRoot("test", "This is my flowroot")
+    join = FlowNode("d")
+    for name in ("a", "b", "c"):
+        branch = root.connect(name, lambda ctx: True)
+        branch.hints = False
+        branch.connect(join)
+    executor = FlowExecutor(bot)
+    flow = Flow(root, TestPerson("me"), {"started": True, "kept": True})
+
+    start = time.monotonic()
+    executor.execute(flow)
+    assert time.monotonic() - start < 0.8
+    assert {"a": True, "b": True, "c": True, "kept": True} == flow.ctx
+    assert [join] == flow.next_steps()
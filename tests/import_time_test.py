@@ -0,0 +1,74 @@
+import subprocess
+import sys
+
+import pytest
+
+# the packages only some features need, they must not be imported by the modules below.
+HEAVY_PACKAGES = (
+    "colorlog",
+    "dulwich",
+    "flask",
+    "jinja2",
+    "markdown",
+    "multiprocessing",
+    "pygments",
+    "werkzeug",
+)
+
+
+def import_times(module: str) -> dict:
+    """
+    Imports module in a fresh interpreter with -X importtime.
+
+    :return: the cumulative import time in microseconds of every module imported, by name.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+@pytest.mark.parametrize("module", ["errbot", "errbot.cli"])
+def test_heavy_packages_are_not_imported(module):
+    times = import_times(module)
+    assert module in times
+    heavy = sorted(name for name in times if name.split(".")[0] in HEAVY_PACKAGES)
+    assert heavy == []
+
+
+def test_webroute_is_still_exported():
+    from errbot import webroute
+    from errbot.core_plugins.wsview import route
+
+    assert webroute is route
+
+
+def test_flask_app_is_created_once():
+    # in a fresh interpreter, so the app doesn't exist yet.
+    code = """
+import threading
+import errbot.core_plugins
+
+barrier = threading.Barrier(8)
+apps = []
+
+def get_app():
+    barrier.wait()
+    apps.append(errbot.core_plugins.flask_app)
+
+threads = [threading.Thread(target=get_app) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert len(apps) == 8 and all(app is apps[0] for app in apps)
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,27 @@
+from errbot import BotPlugin, arg_botcmd, botcmd, re_botcmd, webhook
+
+
+class Sleepy(BotPlugin):
+    """A plugin only activated on first use."""
+
+    def activate(self):
+        super().activate()
+        self["wakeups"] = self.get("wakeups", 0) + 1
+
+    @botcmd
+    def sleepy_hello(self, msg, args):
+        """Say hello."""
+        return f"Hello after {self['wakeups']} wakeup(s)."
+
+    @arg_botcmd("name", type=str, name="sleepy_greet")
+    def greet(self, msg, name=None):
+        """Greet someone."""
+        return f"Hi {name}."
+
+    @re_botcmd(pattern=r"^zzz$")
+    def snore(self, msg, match):
+        return "Snoring."
+
+    @webhook
+    def sleepy_hook(self, payload):
+        return f"Hooked {payload['value']}."
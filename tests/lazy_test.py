@@ -0,0 +1,72 @@
+import sys
+import time
+from os import path
+from pathlib import Path
+
+import errbot.core_plugins
+from errbot.lazy import LazyPlugin, scan_plugin_module
+from errbot.plugin_info import PluginInfo
+
+extra_plugin_dir = path.join(path.dirname(path.realpath(__file__)), "lazy_plugin")
+SLEEPY_MODULE = "errbot.plugins.sleepy"
+
+
+def is_asleep(testbot):
+    return isinstance(testbot.bot.plugin_manager.plugins["Sleepy"], LazyPlugin)
+
+
+def test_scan_plugin_module():
+    plugin_info = PluginInfo.load(Path(extra_plugin_dir) / "sleepy.plug")
+    assert scan_plugin_module(plugin_info) == (
+        ["sleepy_hello", "sleepy_greet"],
+        ["/sleepy_hook"],
+    )
+
+
+def test_not_imported_at_startup(testbot):
+    assert is_asleep(testbot)
+    assert SLEEPY_MODULE not in sys.modules
+    assert "Sleepy" in testbot.bot.plugin_manager.get_all_active_plugin_names()
+    assert "sleepy hello" in testbot.exec_command("!help Sleepy")
+
+
+def test_woken_up_by_a_command(testbot):
+    assert "Hello after 1 wakeup(s)." == testbot.exec_command("!sleepy hello")
+    assert not is_asleep(testbot)
+    assert "Hello after 1 wakeup(s)." == testbot.exec_command("!sleepy hello")
+    # the regex commands are there once the plugin is awake.
+    assert "Snoring." == testbot.exec_command("!zzz")
+
+
+def test_arguments_are_parsed_on_first_use(testbot):
+    assert "Hi Bob." == testbot.exec_command("!sleepy greet Bob")
+
+
+def test_woken_up_by_a_webhook(testbot):
+    client = errbot.core_plugins.flask_app.test_client()
+    response = client.post("/sleepy_hook", json={"value": 42})
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == "Hooked 42."
+    assert not is_asleep(testbot)
+
+
+def test_put_back_to_sleep(testbot):
+    manager = testbot.bot.plugin_manager
+    testbot.exec_command("!sleepy hello")
+    manager.sleep_plugin("Sleepy")
+    assert is_asleep(testbot)
+    assert SLEEPY_MODULE not in sys.modules
+    assert "Hello after 2 wakeup(s)." == testbot.exec_command("!sleepy hello")
+
+
+class TestIdleEviction:
+    extra_plugin_dir = extra_plugin_dir
+    extra_config = {"BOT_PLUGINS_LAZY_IDLE": 0.2}
+
+    def test_idle_plugin_goes_back_to_sleep(self, testbot):
+        testbot.exec_command("!sleepy hello")
+        deadline = time.monotonic() + 5
+        while not is_asleep(testbot) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert is_asleep(testbot)
+        assert "Hello after 2 wakeup(s)." == testbot.exec_command("!sleepy hello")
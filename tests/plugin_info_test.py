@@ -75,3 +75,21 @@ def test_errbot_version():
     info = PluginInfo.load_file(f, None)
     assert info.errbot_minversion == (1, 2, 3, sys.maxsize)
     assert info.errbot_maxversion == (4, 5, 6, 0)
+
+
+def test_lazy():
+    f = StringIO(
+        """
+    [Core]
+    Name = Config
+    Module = config
+    Lazy = True
+    [Lazy]
+    Commands = config_show, config_set
+    """
+    )
+    info = PluginInfo.load_file(f, None)
+    assert info.lazy
+    assert info.lazy_commands == ("config_show", "config_set")
+    assert info.lazy_webhooks == ()
+    assert PluginInfo.load(plugfile_path).lazy_commands is None
@@ -22,3 +22,10 @@ class PollerPlugin(BotPlugin):
         """Say hello to the world."""
         self.start_poller(0.1, self.delayed_hello_loop, args=(msg.frm,))
         return "Hello, world!"
+
+    def record(self, value):
+        self.recorded.append(value)
+
+    def activate(self):
+        super().activate()
+        self.recorded = []
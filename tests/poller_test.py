@@ -21,3 +21,52 @@ def test_delayed_hello_loop(testbot):
     assert delayed_msg in testbot.pop_message(timeout=1)
     # Assert that only one message has been enqueued
     assert testbot.bot.outgoing_message_queue.empty()
+
+
+def test_stop_poller_by_handle(testbot):
+    plugin = testbot.bot.plugin_manager.get_plugin_obj_by_name("PollerPlugin")
+    calls = []
+    handle = plugin.start_poller(60, calls.append, args=("tick",))
+    assert handle in plugin.current_timers
+    assert (calls.append, ("tick",), {}) in plugin.current_pollers
+    plugin.stop_poller(handle)
+    assert handle not in plugin.current_timers
+    assert (calls.append, ("tick",), {}) not in plugin.current_pollers
+    assert handle.cancelled
+    # stopping it again is harmless.
+    plugin.stop_poller(handle)
+
+
+def test_run_at_in_the_past_runs_right_away(testbot):
+    plugin = testbot.bot.plugin_manager.get_plugin_obj_by_name("PollerPlugin")
+    plugin.run_at(time.time() - 10, plugin.record, args=("late",))
+    for _ in range(50):
+        if plugin.recorded:
+            break
+        time.sleep(0.1)
+    assert ["late"] == plugin.recorded
+    assert "record" not in plugin.scheduled_jobs
+
+
+def test_cron_jobs_are_persisted_and_caught_up(testbot):
+    plugin = testbot.bot.plugin_manager.get_plugin_obj_by_name("PollerPlugin")
+    assert "hourly" == plugin.schedule_cron(
+        "@hourly", plugin.record, args=("tick",), name="hourly"
+    )
+    assert "@hourly" == plugin.scheduled_jobs["hourly"]["cron"]
+    assert [] == plugin.recorded
+
+    # as if the bot had been down for a few hours.
+    with testbot.bot.scheduled_jobs_storage.mutable(plugin.name) as records:
+        records["hourly"]["created"] -= 5 * 3600
+    testbot.exec_command("!plugin deactivate PollerPlugin")
+    testbot.exec_command("!plugin activate PollerPlugin")
+    for _ in range(50):
+        if plugin.recorded:
+            break
+        time.sleep(0.1)
+    assert ["tick"] == plugin.recorded
+    assert plugin.scheduled_jobs["hourly"]["last_run"]
+
+    plugin.cancel_scheduled_job("hourly")
+    assert "hourly" not in plugin.scheduled_jobs
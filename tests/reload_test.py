@@ -0,0 +1,117 @@
+from os import path
+
+import pytest
+
+from errbot import botcmd, cmdfilter
+from errbot.plugin_manager import PluginActivationException
+from errbot.plugin_info import PluginInfo
+
+extra_plugin_dir = path.join(path.dirname(path.realpath(__file__)), "dummy_plugin")
+
+
+def owned_by(plugin, table):
+    return {name for name, f in table.items() if getattr(f, "__self__", None) is plugin}
+
+
+@pytest.fixture
+def new_version(monkeypatch):
+    """Makes the next reload of the Dummy plugin load a version with different commands."""
+    load_plugin_classes = PluginInfo.load_plugin_classes
+
+    def load_new_version(self, base_module_name, baseclass):
+        classes = load_plugin_classes(self, base_module_name, baseclass)
+        if self.name != "Dummy":
+            return classes
+        _, old_class = classes[0]
+
+        class DummyTest(old_class):
+            bar = None  # removed
+
+            @botcmd
+            def qux(self, msg, args):
+                return "quux"
+
+            @cmdfilter
+            def dummy_filter(self, msg, cmd, args, dry_run):
+                return msg, cmd, args
+
+        return [("DummyTest", DummyTest)]
+
+    monkeypatch.setattr(PluginInfo, "load_plugin_classes", load_new_version)
+
+
+def test_reload_keeps_the_storage(testbot):
+    plugin = testbot.bot.plugin_manager.plugins["Dummy"]
+    plugin["answer"] = 42
+    store = plugin._store
+    testbot.exec_command("!plugin reload Dummy")
+    assert plugin.is_activated
+    assert plugin._store is store
+    assert plugin["answer"] == 42
+
+
+def test_reload_swaps_only_the_commands_of_the_plugin(testbot, new_version):
+    bot = testbot.bot
+    plugin = bot.plugin_manager.plugins["Dummy"]
+    others = {
+        name: f
+        for name, f in bot.commands.items()
+        if getattr(f, "__self__", None) is not plugin
+    }
+    filters = list(bot.command_filters)
+
+    assert "Plugin Dummy reloaded." == testbot.exec_command("!plugin reload Dummy")
+
+    assert owned_by(plugin, bot.commands) >= {"foo", "qux"}
+    assert "bar" not in bot.commands
+    assert owned_by(plugin, bot.re_commands) == {"re_foo", "re_bar"}
+    for name, f in others.items():
+        assert bot.commands[name] is f
+    assert bot.command_filters[:-1] == filters
+    assert bot.command_filters[-1].__self__ is plugin
+    assert "quux" == testbot.exec_command("!qux")
+    assert "bar" == testbot.exec_command("!foo")
+
+
+def test_deactivated_plugin_has_no_commands_left(testbot):
+    bot = testbot.bot
+    manager = bot.plugin_manager
+    plugin = manager.plugins["Dummy"]
+    manager.deactivate_plugin("Dummy")
+    manager.reload_plugin_by_name("Dummy")
+    assert plugin.is_activated
+    manager.deactivate_plugin("Dummy")
+    assert not owned_by(plugin, bot.commands)
+    assert not owned_by(plugin, bot.re_commands)
+    assert not plugin.is_open_storage()
+
+
+def test_failed_reload_leaves_nothing_behind(testbot, new_version, monkeypatch):
+    bot = testbot.bot
+    manager = bot.plugin_manager
+    plugin = manager.plugins["Dummy"]
+    manager.reload_plugin_by_name("Dummy")  # registers a command filter too.
+    assert [f for f in bot.command_filters if f.__self__ is plugin]
+    load_plugin_classes = PluginInfo.load_plugin_classes
+
+    def load_broken_version(self, base_module_name, baseclass):
+        classes = load_plugin_classes(self, base_module_name, baseclass)
+        if self.name != "Dummy":
+            return classes
+        _, old_class = classes[0]
+
+        class DummyTest(old_class):
+            def activate(self):
+                raise RuntimeError("broken")
+
+        return [("DummyTest", DummyTest)]
+
+    monkeypatch.setattr(PluginInfo, "load_plugin_classes", load_broken_version)
+    with pytest.raises(PluginActivationException):
+        manager.reload_plugin_by_name("Dummy")
+
+    assert not plugin.is_activated
+    assert not owned_by(plugin, bot.commands)
+    assert not owned_by(plugin, bot.re_commands)
+    assert not [f for f in bot.command_filters if f.__self__ is plugin]
+    assert not plugin.is_open_storage()
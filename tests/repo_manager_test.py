@@ -1,11 +1,13 @@
 import os
 import shutil
 import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
 
 from errbot import repo_manager
-from errbot.storage.memory import MemoryStoragePlugin
+from errbot.storage.memory import ROOTS, MemoryStoragePlugin
 
 assets = os.path.join(os.path.dirname(__file__), "assets")
 
@@ -93,6 +95,148 @@ def test_no_update_if_one_fails(plugdir_and_storage):
     assert repo_manager.REPO_INDEX not in manager
 
 
+class IndexServer(ThreadingHTTPServer):
+    """Serves the repo indexes of the assets, with an ETag, on a local port."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), IndexHandler)
+        self.requests = []
+        self.failing = False
+        self.barrier = None
+
+    def url(self, name):
+        return f"http://127.0.0.1:{self.server_address[1]}/{name}"
+
+
+class IndexHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.server.barrier is not None:
+            # only passes if the other sources are fetched at the same time.
+            self.server.barrier.wait(timeout=5)
+        if self.server.failing:
+            self.send_error(500)
+            return
+        etag = f'"{self.path}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        with open(os.path.join(assets, "repos", self.path[1:]), "rb") as f:
+            content = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def index_server(request):
+    server = IndexServer()
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+
+    def on_finish():
+        server.shutdown()
+        server.server_close()
+
+    request.addfinalizer(on_finish)
+    return server
+
+
+def test_remote_index_is_revalidated(plugdir_and_storage, index_server):
+    plugdir, storage = plugdir_and_storage
+    manager = repo_manager.BotRepoManager(
+        storage, plugdir, (index_server.url("simple.json"),)
+    )
+    manager.index_update()
+    first_update = manager[repo_manager.REPO_INDEX][repo_manager.LAST_UPDATE]
+    manager.index_update()
+
+    assert index_server.requests == [
+        ("/simple.json", None),
+        ("/simple.json", '"/simple.json"'),
+    ]
+    index_entry = manager[repo_manager.REPO_INDEX]
+    assert index_entry[repo_manager.LAST_UPDATE] >= first_update
+    assert "pluginname2" in index_entry["name2/err-reponame2"]
+
+
+def test_sources_are_fetched_concurrently(plugdir_and_storage, index_server):
+    plugdir, storage = plugdir_and_storage
+    index_server.barrier = threading.Barrier(2)
+    manager = repo_manager.BotRepoManager(
+        storage,
+        plugdir,
+        (index_server.url("b.json"), index_server.url("a.json")),
+    )
+    manager.index_update()
+
+    index_entry = manager[repo_manager.REPO_INDEX]
+    assert index_entry["name2/err-reponame2"]["pluginname2"]["name"] == "NewPluginName2"
+    assert "pluginname3" in index_entry["name3/err-reponame3"]
+
+
+def test_failed_source_uses_its_last_copy(plugdir_and_storage, index_server):
+    plugdir, storage = plugdir_and_storage
+    manager = repo_manager.BotRepoManager(
+        storage,
+        plugdir,
+        (index_server.url("b.json"), os.path.join(assets, "repos", "a.json")),
+    )
+    manager.index_update()
+    sources = manager[repo_manager.REPO_SOURCES]
+    # b.json is all in the repo index, a.json has an entry overridden by it.
+    assert sources[index_server.url("b.json")]["repos"] == [
+        "name2/err-reponame2",
+        "name3/err-reponame3",
+    ]
+    assert "index" not in sources[index_server.url("b.json")]
+    assert "index" in sources[os.path.join(assets, "repos", "a.json")]
+    index_server.failing = True
+    manager.index_update()
+
+    index_entry = manager[repo_manager.REPO_INDEX]
+    assert index_entry["name2/err-reponame2"]["pluginname2"]["name"] == "NewPluginName2"
+    assert "pluginname3" in index_entry["name3/err-reponame3"]
+
+
+def test_old_index_is_updated_in_the_background(plugdir_and_storage):
+    plugdir, storage = plugdir_and_storage
+    manager = repo_manager.BotRepoManager(
+        storage, plugdir, (os.path.join(assets, "repos", "simple.json"),)
+    )
+    manager.index_update()
+    manager.get_search_index()[repo_manager.LAST_UPDATE] = 0
+
+    assert [p.name for p in manager.search_repos("docs1")] == ["pluginname1"]
+    manager.shutdown()
+    assert manager.get_search_index()[repo_manager.LAST_UPDATE] > 0
+
+
+def test_failed_update_is_not_retried_right_away(plugdir_and_storage, index_server):
+    ROOTS.pop("repomgr", None)
+    plugdir, storage = plugdir_and_storage
+    index_server.failing = True
+    manager = repo_manager.BotRepoManager(
+        storage, plugdir, (index_server.url("simple.json"),)
+    )
+    assert [] == list(manager.search_repos("docs1"))
+    assert [] == list(manager.search_repos("docs1"))
+    assert len(index_server.requests) == 1
+    assert repo_manager.REPO_INDEX not in manager
+
+    # an explicit update is still attempted and a success resets the delay.
+    index_server.failing = False
+    manager.index_update()
+    assert [p.name for p in manager.search_repos("docs1")] == ["pluginname1"]
+
+
 def test_tokenization():
     e = {
         "python": "2+",
@@ -141,6 +285,48 @@ def test_search(plugdir_and_storage):
     assert len(a) == 2
 
 
+def test_search_prefix_and_ranking(plugdir_and_storage):
+    plugdir, storage = plugdir_and_storage
+    manager = repo_manager.BotRepoManager(
+        storage, plugdir, (os.path.join(assets, "repos", "simple.json"),)
+    )
+
+    a = [p.name for p in manager.search_repos("reponame")]
+    assert a == ["pluginname1", "pluginname2"]
+
+    a = [p.name for p in manager.search_repos("doc reponame2")]
+    assert a == ["pluginname2", "pluginname1"]
+
+
+def test_search_index_is_persisted(plugdir_and_storage):
+    plugdir, storage = plugdir_and_storage
+    manager = repo_manager.BotRepoManager(
+        storage, plugdir, (os.path.join(assets, "repos", "simple.json"),)
+    )
+    manager.index_update()
+    manager.shutdown()
+
+    manager = repo_manager.BotRepoManager(storage, plugdir, ())
+    search_index = manager[repo_manager.REPO_SEARCH_INDEX]
+    assert search_index["postings"]["docs2"] == [1]
+    assert search_index["entries"][1][:2] == ("name2/err-reponame2", "pluginname2")
+    assert [p.name for p in manager.search_repos("docs2")] == ["pluginname2"]
+
+
+def test_search_index_is_built_from_an_older_index(plugdir_and_storage):
+    plugdir, storage = plugdir_and_storage
+    manager = repo_manager.BotRepoManager(
+        storage, plugdir, (os.path.join(assets, "repos", "simple.json"),)
+    )
+    manager.index_update()
+    del manager[repo_manager.REPO_SEARCH_INDEX]
+    manager.shutdown()
+
+    manager = repo_manager.BotRepoManager(storage, plugdir, ())
+    assert [p.name for p in manager.search_repos("docs1")] == ["pluginname1"]
+    assert repo_manager.REPO_SEARCH_INDEX in manager
+
+
 def test_git_url_name_guessing():
     assert (
         repo_manager.human_name_for_git_url(
@@ -0,0 +1,158 @@
+import time
+from datetime import datetime
+from threading import Event
+
+import pytest
+
+from errbot.scheduler import CronExpression, Scheduler
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_jobs_run_in_deadline_order():
+    scheduler = Scheduler(1)
+    runs = []
+    scheduler.schedule(0.2, runs.append, ("late",))
+    scheduler.schedule(0.1, runs.append, ("early",))
+    assert wait_for(lambda: len(runs) == 2)
+    assert ["early", "late"] == runs
+    scheduler.close()
+
+
+def test_periodic_job_runs_the_given_number_of_times():
+    scheduler = Scheduler(2)
+    runs = []
+    scheduler.schedule(0.01, runs.append, ("tick",), interval=0.01, times=3)
+    assert wait_for(lambda: len(runs) == 3)
+    time.sleep(0.1)
+    assert ["tick"] * 3 == runs
+    scheduler.close()
+
+
+def test_cancelled_job_stops_running():
+    scheduler = Scheduler(2)
+    runs = []
+    job = scheduler.schedule(0.01, runs.append, ("tick",), interval=0.01)
+    assert wait_for(lambda: runs)
+    job.cancel()
+    time.sleep(0.05)
+    count = len(runs)
+    time.sleep(0.1)
+    assert count == len(runs)
+    never = scheduler.schedule(60, runs.append, ("never",))
+    never.cancel()
+    assert [] == scheduler._queue
+    scheduler.close()
+
+
+def test_jobs_do_not_wait_for_each_other():
+    scheduler = Scheduler(2)
+    gate = Event()
+    runs = []
+    scheduler.schedule(0, gate.wait, (5,))
+    scheduler.schedule(0.01, runs.append, ("fast",))
+    assert wait_for(lambda: runs)
+    gate.set()
+    scheduler.close()
+
+
+def test_crashing_job_is_rescheduled():
+    scheduler = Scheduler(1)
+    runs = []
+
+    def crash():
+        runs.append("crash")
+        raise Exception("Kaboom!")
+
+    scheduler.schedule(0, crash, interval=0.01, times=2)
+    assert wait_for(lambda: len(runs) == 2)
+    scheduler.close()
+
+
+def test_fixed_rate_job_does_not_drift():
+    scheduler = Scheduler(2)
+    starts = []
+
+    def slow():
+        starts.append(time.monotonic())
+        time.sleep(0.05)
+
+    scheduler.schedule(0.1, slow, interval=0.1, times=4, fixed_rate=True)
+    assert wait_for(lambda: len(starts) == 4)
+    # with a fixed delay, the runs would be 0.15s apart.
+    assert starts[-1] - starts[0] < 0.4
+    scheduler.close()
+
+
+def test_fixed_rate_job_skips_runs_overlapping_a_slow_one():
+    scheduler = Scheduler(2)
+    gate = Event()
+    runs = []
+
+    def slow():
+        runs.append("run")
+        gate.wait(5)
+
+    job = scheduler.schedule(0, slow, interval=0.02, fixed_rate=True)
+    time.sleep(0.2)
+    assert ["run"] == runs
+    assert 1 == job.running
+    gate.set()
+    assert wait_for(lambda: len(runs) > 1)
+    job.cancel()
+    scheduler.close()
+
+
+def test_jitter_spreads_the_runs():
+    scheduler = Scheduler(1)
+    start = time.monotonic()
+    for _ in range(10):
+        scheduler.schedule(10, print, jitter=5)
+    deadlines = [deadline - start for deadline, _, _ in scheduler._queue]
+    assert all(10 <= deadline <= 15.5 for deadline in deadlines)
+    assert len(set(deadlines)) > 1
+    scheduler.close()
+
+
+def test_max_runtime_reports_slow_runs(caplog):
+    scheduler = Scheduler(1)
+    gate = Event()
+    scheduler.schedule(0, gate.wait, (5,), max_runtime=0.05)
+    assert wait_for(lambda: "more than its 0.05s max runtime" in caplog.text)
+    gate.set()
+    scheduler.close()
+
+
+@pytest.mark.parametrize(
+    "expression,expected",
+    [
+        ("*/15 * * * *", datetime(2026, 10, 16, 10, 45)),
+        ("0 9 * * mon-fri", datetime(2026, 10, 19, 9, 0)),
+        ("30 10 * * *", datetime(2026, 10, 17, 10, 30)),
+        ("0 0 1 jan,jul *", datetime(2027, 1, 1, 0, 0)),
+        ("0 12 13 * fri", datetime(2026, 10, 16, 12, 0)),
+        ("0 0 29 2 *", datetime(2028, 2, 29, 0, 0)),
+        ("@monthly", datetime(2026, 11, 1, 0, 0)),
+    ],
+)
+def test_cron_expression_next_after(expression, expected):
+    friday = datetime(2026, 10, 16, 10, 30)
+    assert expected == CronExpression(expression).next_after(friday)
+
+
+@pytest.mark.parametrize(
+    "expression", ["* * * *", "60 * * * *", "* * * foo *", "5-1 * * * *"]
+)
+def test_invalid_cron_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+
+def test_cron_expression_never_matching():
+    with pytest.raises(ValueError):
+        CronExpression("0 0 30 2 *").next_after(datetime(2026, 10, 16))
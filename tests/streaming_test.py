@@ -17,3 +17,63 @@ def test_streaming():
     Tee(source, clients).run()
     for client in clients:
         assert client.response == canary
+
+
+class RejectingClient(object):
+    def callback_stream(self, stream):
+        stream.reject()
+
+
+class IdleClient(object):
+    name = "Idle"
+
+    def callback_stream(self, stream):
+        pass
+
+
+def test_streaming_with_chunks_smaller_than_the_payload():
+    canary = bytes(range(256)) * 1000
+    source = Stream(TestPerson("gbin@gootz.net"), BytesIO(canary))
+    clients = [StreamingClient() for _ in range(5)]
+    Tee(source, clients, chunk_size=1000).run()
+    for client in clients:
+        assert client.response == canary
+
+
+def test_streaming_is_not_blocked_by_clients_leaving_early():
+    canary = b"this is my test" * 10000
+    source = Stream(TestPerson("gbin@gootz.net"), BytesIO(canary))
+    reader = StreamingClient()
+    rejecting = RejectingClient()
+    idle = IdleClient()
+    Tee(source, [rejecting, reader, idle], chunk_size=100).run()
+    assert reader.response == canary
+
+
+class SeekingClient(object):
+    def callback_stream(self, stream):
+        stream.accept()
+        stream.seek(-5, 2)
+        self.tail = stream.read()
+        stream.seek(0)
+        self.response = stream.read()
+
+
+def test_spooled_streaming():
+    canary = b"this is my test" * 10000
+    source = Stream(TestPerson("gbin@gootz.net"), BytesIO(canary))
+    seeking = SeekingClient()
+    rejecting = RejectingClient()
+    clients = [StreamingClient() for _ in range(5)]
+    Tee(source, clients + [seeking, rejecting], chunk_size=1000, spool=True).run()
+    for client in clients:
+        assert client.response == canary
+    assert seeking.tail == b" test"
+    assert seeking.response == canary
+
+
+def test_spooled_empty_stream():
+    source = Stream(TestPerson("gbin@gootz.net"), BytesIO(b""))
+    client = StreamingClient()
+    Tee(source, [client], spool=True).run()
+    assert client.response == b""
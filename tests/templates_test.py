@@ -1,5 +1,7 @@
 from os import path
 
+from errbot import templating
+
 # This is to test end2end i18n behavior.
 
 extra_plugin_dir = path.join(path.dirname(path.realpath(__file__)), "template_plugin")
@@ -42,3 +44,41 @@ def test_template_collision(testbot):
     testbot.push_message("!test_manual")
     response = testbot.pop_message()
     assert "Template from PluginA" in response
+
+
+def cached_templates():
+    return {key[1] for key in templating.tenv().cache.keys()}
+
+
+def test_missing_plugin_templates_are_remembered(testbot):
+    # not in the TPlug namespace, found in the global search path.
+    card = templating.get_template("card.md", "TPlug")
+    assert "TPlug/card.md" in templating.missing_templates
+    assert card is templating.get_template("card.md", "TPlug")
+    assert "ok" in testbot.exec_command("!test template1")
+    assert "TPlug/test.md" not in templating.missing_templates
+
+
+def test_templates_are_kept_across_plugin_deactivation(testbot):
+    assert "ok" in testbot.exec_command("!test template2")
+    assert "Template from PluginB (B)" in testbot.exec_command("!test_b")
+    assert {"TPlug/test.md", "CollisionB/collision.md"} <= cached_templates()
+
+    testbot.push_message("!plugin deactivate CollisionB")
+    assert "Plugin CollisionB deactivated." == testbot.pop_message()
+    assert "TPlug/test.md" in cached_templates()
+    assert "CollisionB/collision.md" not in cached_templates()
+
+    testbot.push_message("!plugin activate CollisionB")
+    assert "Plugin CollisionB activated." in testbot.pop_message()
+    assert "Template from PluginB (B)" in testbot.exec_command("!test_b")
+
+
+def test_precompile_plugin_templates(testbot):
+    testbot.push_message("!plugin deactivate CollisionA")
+    assert "Plugin CollisionA deactivated." == testbot.pop_message()
+    assert "CollisionA/collision.md" not in cached_templates()
+    testbot.bot.plugin_manager.precompile_templates = True
+    testbot.push_message("!plugin activate CollisionA")
+    assert "Plugin CollisionA activated." in testbot.pop_message()
+    assert "CollisionA/collision.md" in cached_templates()
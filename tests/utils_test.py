@@ -1,5 +1,7 @@
 # coding=utf-8
 import logging
+import random
+import re
 import sys
 from datetime import timedelta
 
@@ -12,6 +14,7 @@ from errbot.storage import StoreMixin
 from errbot.storage.base import StoragePluginBase
 from errbot.utils import (
     format_timedelta,
+    split_markdown_after,
     split_string_after,
     version2tuple,
 )
@@ -106,3 +109,112 @@ def test_split_string_after_returns_two_chunks_when_chunksize_equals_half_length
     splitter = split_string_after(str_, int(len(str_) / 2))
     split = [chunk for chunk in splitter]
     assert ["foobar2000", "foobar2000"] == split
+
+
+def test_split_markdown_after_returns_original_string_when_it_fits():
+    assert [""] == list(split_markdown_after("", 10))
+    assert ["foobar2000"] == list(split_markdown_after("foobar2000", 10))
+
+
+def test_split_markdown_after_cuts_on_line_boundaries():
+    str_ = "foo bar\n" * 3
+    assert ["foo bar\n"] * 3 == list(split_markdown_after(str_, len("foo bar\n")))
+
+
+def test_split_markdown_after_prefers_paragraph_boundaries():
+    str_ = "first line\nsecond line\n\nthird line\nfourth"
+    split = list(split_markdown_after(str_, 30))
+    assert ["first line\nsecond line\n\n", "third line\nfourth"] == split
+
+
+def test_split_markdown_after_limits_bytes_not_chars():
+    str_ = "é" * 10
+    split = list(split_markdown_after(str_, 5))
+    assert "".join(split) == str_
+    assert all(len(chunk.encode("utf-8")) <= 5 for chunk in split)
+    assert ["éé"] * 5 == split
+
+
+def test_split_markdown_after_keeps_combining_marks_with_their_base():
+    str_ = "e\u0301" * 4
+    split = list(split_markdown_after(str_, 4))
+    assert ["e\u0301"] * 4 == split
+
+
+def test_split_markdown_after_reopens_code_blocks():
+    code = "".join(f"line {i}\n" for i in range(20))
+    str_ = f"```python\n{code}```\n"
+    split = list(split_markdown_after(str_, 50))
+    assert len(split) > 1
+    for chunk in split:
+        assert len(chunk.encode("utf-8")) <= 50
+        assert chunk.startswith("```python\n")
+        assert chunk.rstrip("\n").endswith("```")
+    assert code == "".join(
+        chunk[len("```python\n") :].rstrip("\n")[: -len("```")] for chunk in split
+    )
+
+
+def test_split_markdown_after_moves_forward_in_reopened_code_blocks():
+    str_ = "```\nshort line\n" + "a" * 100 + "\n```"
+    split = list(split_markdown_after(str_, 40))
+    assert split[0] == "```\nshort line\n```"
+    assert all(len(chunk.encode("utf-8")) <= 40 for chunk in split)
+    assert unsplit_markdown(str_, split) == str_
+
+    str_ = "```\n" + "line\n" * 3 + "x" * 20000 + "\n```"
+    split = list(split_markdown_after(str_, 10000))
+    assert all(len(chunk.encode("utf-8")) <= 10000 for chunk in split)
+    assert unsplit_markdown(str_, split) == str_
+
+
+def test_split_markdown_after_hard_cuts_a_long_first_code_line():
+    str_ = "```python\n" + "y" * 60 + "\n```"
+    split = list(split_markdown_after(str_, 30))
+    assert "```python\n```" not in split
+    assert all(len(chunk.encode("utf-8")) <= 30 for chunk in split)
+    assert unsplit_markdown(str_, split) == str_
+
+
+OPENER = re.compile(r"(`{3,}|~{3,})[^\n]*\n")
+CLOSER = re.compile(r"\n?(`{3,}|~{3,})$")
+
+
+def unsplit_markdown(str_, chunks, joined=""):
+    """Joins the chunks back, without the fences split_markdown_after added to them."""
+    if not chunks:
+        return joined
+    chunk = chunks[0]
+    opener, closer = OPENER.match(chunk), CLOSER.search(chunk)
+    prefixes = [0] + ([opener.end()] if opener else [])
+    suffixes = [len(chunk)]
+    if closer:  # the added fence may or may not come with a line break.
+        suffixes += [len(chunk) - len(closer.group(1)), closer.start()]
+    for suffix in suffixes:
+        for prefix in prefixes:
+            content = chunk[prefix:suffix]
+            if content and str_.startswith(content, len(joined)):
+                # a fence in the content can look like an added one, try them all.
+                result = unsplit_markdown(str_, chunks[1:], joined + content)
+                if result == str_:
+                    return result
+    return None
+
+
+def test_split_markdown_after_fuzz():
+    rand = random.Random(42)
+    pieces = ["word", "a", " ", "\n", "\n\n", "```\n", "```python\n", "~~~\n"]
+    pieces += ["é", "e\u0301", "x" * 45]
+    for _ in range(300):
+        str_ = "".join(rand.choice(pieces) for _ in range(rand.randint(1, 60)))
+        n = rand.randint(30, 80)
+        split = list(split_markdown_after(str_, n))
+        assert all(len(chunk.encode("utf-8")) <= n for chunk in split), str_
+        assert unsplit_markdown(str_, split) == str_
+
+
+def test_split_markdown_after_moves_code_blocks_to_next_chunk():
+    str_ = "intro\n\n```\nsome code\n```\n"
+    assert ["intro\n\n", "```\nsome code\n```\n"] == list(
+        split_markdown_after(str_, 22)
+    )